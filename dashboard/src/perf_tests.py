@@ -71,11 +71,17 @@ class PerfTests:
         avg_val = [None] * columns
         max_val = [float("-inf")] * columns
         min_val = [float("inf")] * columns
+        # number of non-empty cells in each column
+        count = [0] * columns
 
         # compute min, max, and sum
         for result in results:
             for column in range(columns):
+                # empty cells (timings of rounds without successful call) are skipped
+                if result[column] == "":
+                    continue
                 r = float(result[column])
+                count[column] += 1
                 sum_val[column] += r
                 if r < min_val[column]:
                     min_val[column] = r
@@ -85,7 +91,14 @@ class PerfTests:
         # really don't wanna to divide by zero
         if n > 0:
             for column in range(columns):
-                avg_val[column] = sum_val[column] / n
+                if count[column] > 0:
+                    avg_val[column] = sum_val[column] / count[column]
+
+        # columns with empty cells only (all rounds failed) have no statistic
+        for column in range(columns):
+            if count[column] == 0:
+                min_val[column] = None
+                max_val[column] = None
 
         if columns == 1:
             return {
@@ -7,6 +7,8 @@ export AWS_ACCESS_KEY_ID=""
 export AWS_SECRET_ACCESS_KEY=""
 export S3_REGION_NAME=""
 export DEPLOYMENT_PREFIX=""
+# optional, S3 compatible service to be used instead of AWS S3
+export S3_ENDPOINT_URL=""
 
 function prepare_venv() {
 	virtualenv -p python3 venv && source venv/bin/activate && python3 `which pip3` install -r requirements.txt
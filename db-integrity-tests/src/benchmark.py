@@ -0,0 +1,142 @@
+"""Offline throughput benchmark of the integrity checks.
+
+The synthetic corpus (see corpus.py) is generated into the local directory, unless the same
+corpus is already there, and all packages and package versions are checked exactly as by
+the main module, just the objects are read by LocalS3Interface instead of from AWS S3.
+Numbers of read objects and bytes per second, CPU time, and peak RSS are written into
+s3_benchmark.json. The benchmark fails when the checks do not find exactly the defects
+injected into the corpus, so the optimized checks can't silently skip anything.
+
+Usage:
+    python3 src/benchmark.py --corpus /tmp/corpus --packages 1000 --versions 5
+"""
+
+import csv
+import json
+import logging
+import os
+import resource
+import shutil
+import time
+
+from cliargs import benchmark_cli_parser
+from component_versions_checker import ComponentVersionsChecker
+from core_package_checker import CorePackageChecker
+from corpus import CorpusGenerator, read_manifest, CORE_ANALYSIS
+from local_s3 import LocalS3Interface
+from main import check_packages_in_s3, set_log_level, CORE_PACKAGES_REPORT, \
+    PACKAGE_VERSIONS_REPORT, CORE_PACKAGE_CHECKS, COMPONENT_VERSION_CHECKS
+from validation_pool import ValidationPool
+
+RESULTS = "s3_benchmark.json"
+
+
+def prepare_corpus(directory, generator):
+    """Generate the corpus into the directory, the existing corpus is reused if it's the same."""
+    manifest = read_manifest(directory)
+    if manifest is not None and manifest["settings"] == generator.settings():
+        logging.info("Corpus with {n} objects found in {d}".format(n=manifest["objects"],
+                                                                   d=directory))
+        return manifest
+    if manifest is not None:
+        # objects of the previous corpus must not be mixed with the new ones
+        for name in os.listdir(directory):
+            if name.startswith(manifest["deployment_prefix"] + "-"):
+                shutil.rmtree(os.path.join(directory, name))
+    os.makedirs(directory, exist_ok=True)
+    return generator.write(directory)
+
+
+def count_failures(report, checker_class, check_names, first_column):
+    """Count failed checks in the report per analysis, checks start at the first_column."""
+    analyses = [getattr(checker_class, check_name).metadata_key or CORE_ANALYSIS
+                for check_name in check_names]
+    failures = {}
+    with open(report) as fin:
+        reader = csv.reader(fin)
+        next(reader)
+        for row in reader:
+            for analysis, verdict in zip(analyses, row[first_column:]):
+                if verdict not in ("OK", "N/A"):
+                    failures[analysis] = failures.get(analysis, 0) + 1
+    return failures
+
+
+def peak_rss_mb(who):
+    """Return the peak resident set size in MB (the maximum of children for RUSAGE_CHILDREN)."""
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def run_benchmark(directory, manifest, max_in_flight, validation_pool=None):
+    """Check all objects in the corpus, return measured throughput and found defects."""
+    s3interface = LocalS3Interface(directory, manifest["deployment_prefix"])
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    try:
+        check_packages_in_s3(s3interface, max_in_flight, None, validation_pool,
+                             [manifest["settings"]["ecosystem"]])
+    finally:
+        # worker processes need to finish to be counted in children resource usage
+        if validation_pool is not None:
+            validation_pool.close()
+    seconds = time.perf_counter() - start_time
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    defects = {
+        CorePackageChecker.BUCKET_NAME: count_failures(CORE_PACKAGES_REPORT,
+                                                       CorePackageChecker,
+                                                       CORE_PACKAGE_CHECKS, 4),
+        ComponentVersionsChecker.BUCKET_NAME: count_failures(PACKAGE_VERSIONS_REPORT,
+                                                             ComponentVersionsChecker,
+                                                             COMPONENT_VERSION_CHECKS, 5),
+    }
+    return {"corpus": manifest["settings"],
+            "max_in_flight": max_in_flight,
+            "validation_processes": None if validation_pool is None else
+            validation_pool.processes,
+            "objects": s3interface.get_requests,
+            "bytes": s3interface.bytes_read,
+            "seconds": seconds,
+            "objects_per_second": s3interface.get_requests / seconds,
+            "bytes_per_second": s3interface.bytes_read / seconds,
+            "cpu_seconds": time.process_time() - start_cpu_time,
+            "children_cpu_seconds": children.ru_utime + children.ru_stime,
+            "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+            "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+            "injected_defects": manifest["defects"],
+            "found_defects": defects}
+
+
+def main():
+    """Entry point to the benchmark."""
+    cli_arguments = benchmark_cli_parser.parse_args()
+    set_log_level(cli_arguments.log_level)
+
+    generator = CorpusGenerator(cli_arguments.packages, cli_arguments.versions,
+                                cli_arguments.defect_rate, cli_arguments.payload,
+                                cli_arguments.seed)
+    manifest = prepare_corpus(cli_arguments.corpus, generator)
+
+    validation_pool = None
+    if cli_arguments.validation_pool:
+        validation_pool = ValidationPool(cli_arguments.validation_processes,
+                                         cli_arguments.validation_batch)
+    results = run_benchmark(cli_arguments.corpus, manifest, cli_arguments.max_in_flight,
+                            validation_pool)
+    with open(RESULTS, "w") as fout:
+        json.dump(results, fout, indent=4)
+
+    logging.info("{n} objects checked in {t:.1f} s: {o:.0f} objects/s, {b:.2f} MB/s, "
+                 "peak RSS {r:.0f} MB".format(n=results["objects"], t=results["seconds"],
+                                              o=results["objects_per_second"],
+                                              b=results["bytes_per_second"] / 1024 / 1024,
+                                              r=results["peak_rss_mb"]))
+    assert results["found_defects"] == results["injected_defects"], \
+        "Defects found by the checks {f} differ from the injected defects {i}".format(
+            f=results["found_defects"], i=results["injected_defects"])
+
+
+if __name__ == "__main__":
+    # execute only if run as a script
+    main()
@@ -0,0 +1,208 @@
+"""Census of objects stored in S3 that does not read whole objects.
+
+Two kinds of census are supported:
+
+existence - objects stored for package versions in core-data bucket are found by one
+            listing that provides their sizes too; package toplevel files and package
+            analyses in core-package-data bucket are looked up by HEAD requests for all
+            packages with versions. Missing and empty objects, version directories
+            without version.json and version.json without the directory are reported.
+
+schema    - schema name and version and the _release attribute of all analyses are read
+            by ranged GETs from the beginning and the end of objects (see
+            S3Interface.read_object_fields). Number of objects per analysis and schema
+            version is reported together with analyses stored for a wrong release. The
+            schema that is not found in large objects is reported as unknown, because it
+            might be stored in the middle of the object.
+"""
+
+from checker import Checker
+from component_versions_checker import ComponentVersionsChecker
+from core_package_checker import CorePackageChecker
+from key_index import KeyIndex
+from pipeline import ordered_map, DEFAULT_MAX_IN_FLIGHT
+from s3interface import S3Interface
+from sampling import CORE_STRATUM
+
+DEFAULT_RANGE_SIZE = 16 * 1024
+
+# top-level fields read by the schema census
+SCHEMA_FIELDS = {"schema", "_release"}
+
+
+class CensusCounts:
+    """Number and total size of objects of one kind."""
+
+    def __init__(self):
+        """Initialize all counters to zero."""
+        self.objects = 0
+        self.bytes = 0
+        self.empty = 0
+        self.missing = 0
+        self.wrong_release = 0
+
+    def add(self, size):
+        """Count one existing object."""
+        self.objects += 1
+        self.bytes += size
+        if size == 0:
+            self.empty += 1
+
+
+class Census:
+    """Counts of objects stored for one ecosystem and problems found in the buckets."""
+
+    def __init__(self, s3interface, ecosystem, shard=None):
+        """Initialize the census, only packages from the shard are counted if it's given."""
+        self.s3interface = s3interface
+        self.ecosystem = ecosystem
+        self.shard = shard
+        # (bucket, analysis, schema name, schema version) -> CensusCounts
+        self.counts = {}
+        # bucket, key, and problem for all problems found
+        self.problems = []
+        # size of the objects and number of bytes actually transferred
+        self.bytes_stored = 0
+        self.bytes_read = 0
+
+    def counts_for(self, bucket_name, analysis, schema_name="", schema_version=""):
+        """Return counts for the bucket, analysis, and (for the schema census) schema."""
+        key = (bucket_name, analysis or CORE_STRATUM, schema_name, schema_version)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = CensusCounts()
+        return counts
+
+    def add_problem(self, bucket_name, key, problem):
+        """Remember the problem found for the key."""
+        self.problems.append((bucket_name, key, problem))
+
+    def add_object(self, bucket_name, key, analysis, size):
+        """Count one existing object, empty objects are reported."""
+        self.counts_for(bucket_name, analysis).add(size)
+        self.bytes_stored += size
+        if size == 0:
+            self.add_problem(bucket_name, key, "empty")
+
+    def existence(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """Count objects in both buckets by one listing and HEAD requests, no GETs."""
+        bucket_name = ComponentVersionsChecker.BUCKET_NAME
+        index = KeyIndex.build(self.s3interface, bucket_name, self.ecosystem, self.shard)
+        for package in index.packages():
+            self.count_versions(index, package)
+
+        # the listing of core-package-data is not needed, only expected objects are looked up
+        packages = index.packages()
+        found = ordered_map(self.package_object_sizes, packages, max_in_flight)
+        for package, sizes in zip(packages, found):
+            for analysis, size in sizes:
+                key = self.package_object_key(package, analysis)
+                if size is not None:
+                    self.add_object(CorePackageChecker.BUCKET_NAME, key, analysis, size)
+                    continue
+                self.counts_for(CorePackageChecker.BUCKET_NAME, analysis).missing += 1
+                # package analyses are optional
+                if analysis is None:
+                    self.add_problem(CorePackageChecker.BUCKET_NAME, key, "missing")
+
+    def count_versions(self, index, package):
+        """Count objects stored for versions of the package, check version directories."""
+        bucket_name = ComponentVersionsChecker.BUCKET_NAME
+        directories = set()
+        version_jsons = set()
+        for relative_key in index.keys_for_package(package):
+            key = S3Interface.package_key_to_metadata(self.ecosystem, package) + "/" + \
+                relative_key
+            parsed = S3Interface.parse_key(key, self.ecosystem, versioned=True)
+            if parsed is None:
+                self.add_problem(bucket_name, key, "unexpected key")
+                continue
+            _, version, analysis = parsed
+            if analysis is None:
+                version_jsons.add(version)
+            else:
+                directories.add(version)
+            self.add_object(bucket_name, key, analysis, index.metadata(key)[1] or 0)
+
+        for version in sorted(directories - version_jsons):
+            self.counts_for(bucket_name, None).missing += 1
+            self.add_problem(bucket_name, S3Interface.component_key(self.ecosystem, package,
+                                                                    version), "missing")
+        for version in sorted(version_jsons - directories):
+            self.add_problem(bucket_name, S3Interface.component_key(self.ecosystem, package,
+                                                                    version),
+                             "no analyses")
+
+    def package_object_key(self, package, analysis):
+        """Return key of the package toplevel file or package analysis."""
+        if analysis is None:
+            return S3Interface.package_key(self.ecosystem, package)
+        return S3Interface.package_analysis_key(self.ecosystem, package, analysis)
+
+    def package_object_sizes(self, package):
+        """Return analysis and size (None for missing objects) of all package objects."""
+        return [(analysis, self.s3interface.read_object_size(
+                    CorePackageChecker.BUCKET_NAME, self.package_object_key(package, analysis)))
+                for analysis in [None] + CorePackageChecker.ANALYSES]
+
+    def read_schema(self, bucket_name, key, size, range_size):
+        """Read the schema and release of one analysis by ranged GETs.
+
+        Return the fields found, number of read bytes, flag whether the whole object has
+        been read, and the error (None is returned instead of fields in this case). Empty
+        objects (by the size from the listing) are not read, S3 rejects ranges of them.
+        """
+        if size == 0:
+            return {}, 0, True, None
+        try:
+            return self.s3interface.read_object_fields(bucket_name, key, SCHEMA_FIELDS,
+                                                       range_size) + (None,)
+        except Exception as e:
+            return None, 0, True, str(e)
+
+    def analyses(self, bucket_name, versioned):
+        """Yield package, version, analysis, key, and size of all analyses in the bucket."""
+        for o in self.s3interface.iterate_objects(bucket_name, self.ecosystem + "/"):
+            parsed = S3Interface.parse_key(o["Key"], self.ecosystem, versioned)
+            # toplevel files have no schema
+            if parsed is None or parsed[2] is None:
+                continue
+            if self.shard is not None and parsed[0] not in self.shard:
+                continue
+            yield parsed + (o["Key"], o["Size"])
+
+    def schemas(self, bucket_name, versioned, range_size=DEFAULT_RANGE_SIZE,
+                max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """Count analyses stored in the bucket by their schema versions."""
+        analyses = self.analyses(bucket_name, versioned)
+        results = ordered_map(lambda analysis: (analysis, self.read_schema(
+            bucket_name, analysis[3], analysis[4], range_size)), analyses, max_in_flight)
+
+        for (package, version, analysis, key, size), (fields, read_bytes, whole, error) in \
+                results:
+            self.bytes_stored += size
+            self.bytes_read += read_bytes
+            if size == 0:
+                self.counts_for(bucket_name, analysis, "N/A", "N/A").add(size)
+                self.add_problem(bucket_name, key, "empty")
+                continue
+            if fields is None:
+                self.counts_for(bucket_name, analysis, "N/A", "N/A").add(size)
+                self.add_problem(bucket_name, key, error)
+                continue
+            schema = fields.get("schema")
+            if isinstance(schema, dict):
+                counts = self.counts_for(bucket_name, analysis, schema.get("name", "missing"),
+                                         schema.get("version", "missing"))
+            elif schema is None and not whole:
+                counts = self.counts_for(bucket_name, analysis, "unknown", "unknown")
+            else:
+                counts = self.counts_for(bucket_name, analysis, "missing", "missing")
+            counts.add(size)
+            if "_release" not in fields and not whole:
+                continue
+            if fields.get("_release") != Checker.release_string(self.ecosystem, package,
+                                                                version):
+                counts.wrong_release += 1
+                self.add_problem(bucket_name, key, "wrong _release {r}".format(
+                    r=fields.get("_release")))
@@ -1,16 +1,98 @@
 """Class to check attributes read from the AWS S3."""
 
 import datetime
+import functools
 import re
 
 
+def cached_verdict(metadata_key):
+    """Reuse the verdict of the decorated check method when the checked object is unchanged.
+
+    The object is identified by the key returned by the checker's object_key() method
+    for the given metadata. The verdict is cached only when both the state store and the
+    key index (with ETags) are available.
+    """
+    def decorator(check_method):
+        @functools.wraps(check_method)
+        def wrapper(self):
+            verdict = self.read_cached_verdict(check_method.__name__, metadata_key)
+            if verdict is None:
+                verdict = check_method(self)
+                self.store_verdict(check_method.__name__, metadata_key, verdict)
+            return verdict
+        # needed to find the checked object when the check is performed elsewhere
+        wrapper.metadata_key = metadata_key
+        return wrapper
+    return decorator
+
+
 class Checker:
     """Class to check attributes read from the AWS S3."""
 
+    # top-level attributes that are checked for all analyses
+    COMMON_FIELDS = {"_audit", "_release", "status", "schema"}
+
+    # index of keys stored in the bucket, objects missing in the index are not read at all
+    key_index = None
+
+    # store with verdicts from previous runs
+    state_store = None
+
     def __init__(self):
         """Initialize the checker."""
         pass
 
+    def read_object(self, bucket_name, key, fields=None):
+        """Read the object from the S3, objects not found in the key index are not read.
+
+        The same exception as for missing objects in S3 is raised in this case. When fields
+        are specified, only values of these top-level fields are parsed.
+        """
+        if self.key_index is not None and key not in self.key_index:
+            raise self.key_index.no_such_key(key)
+        return self.s3interface.read_object(bucket_name, key, fields)
+
+    def read_raw_object(self, bucket_name, key):
+        """Read the object from the S3 as bytes, objects not found in the key index are not read."""
+        if self.key_index is not None and key not in self.key_index:
+            raise self.key_index.no_such_key(key)
+        return self.s3interface.read_raw_object(bucket_name, key)
+
+    def cached_object(self, metadata_key):
+        """Return bucket, key, ETag, and last modification time of the checked object.
+
+        None is returned when verdicts for the object can't be cached.
+        """
+        if self.state_store is None or self.key_index is None:
+            return None
+        key = self.object_key(metadata_key)
+        # missing objects are not read at all, so there's nothing to cache
+        if key not in self.key_index:
+            return None
+        etag, _, last_modified = self.key_index.metadata(key)
+        return self.s3interface.full_bucket_name(self.BUCKET_NAME), key, etag, last_modified
+
+    def read_cached_verdict(self, check_name, metadata_key):
+        """Return the verdict from the state store if the checked object is unchanged."""
+        cached_object = self.cached_object(metadata_key)
+        if cached_object is None:
+            return None
+        bucket, key, etag, _ = cached_object
+        return self.state_store.read_verdict(bucket, key, check_name, etag)
+
+    def store_verdict(self, check_name, metadata_key, verdict):
+        """Store the verdict into the state store, if any."""
+        cached_object = self.cached_object(metadata_key)
+        if cached_object is not None:
+            bucket, key, etag, last_modified = cached_object
+            self.state_store.store_verdict(bucket, key, check_name, etag, last_modified,
+                                           verdict)
+
+    @staticmethod
+    def is_list(node):
+        """Check if the node is list, the node might not be parsed (see json_stream.py)."""
+        return isinstance(node, list) or getattr(node, "kind", None) == "array"
+
     def check_attribute_presence(self, node, attribute_name):
         """Check the attribute presence in the given dictionary or list.
 
@@ -0,0 +1,120 @@
+"""Durable progress of the integrity scan, so the interrupted scan can be resumed.
+
+Packages are checked in a fixed order (ecosystems in the given order, packages sorted in
+the listing order, see merge_join.py), so the position in the scan is given by the report
+being written, the ecosystem, and the last package whose rows are all written. The
+position is stored periodically together with the size of the report at that moment.
+When the scan is resumed, rows written after the last checkpoint are removed from the
+report and the scan continues with the next package, so no row is written twice.
+"""
+
+import json
+import logging
+import os
+
+from merge_join import listing_order
+
+# number of packages checked between two checkpoints
+DEFAULT_INTERVAL = 100
+
+
+class Checkpoint:
+    """Progress of the scan persisted periodically into the JSON file."""
+
+    def __init__(self, filename, ecosystems, shard=None, interval=DEFAULT_INTERVAL):
+        """Initialize the progress of a new scan."""
+        self.filename = filename
+        self.interval = interval
+        self.state = {"ecosystems": ecosystems,
+                      "shard": str(shard) if shard is not None else None,
+                      # reports that have been written completely
+                      "completed": [],
+                      # report being written, its size, and the last checked package
+                      "report": None,
+                      "offset": None,
+                      "ecosystem": None,
+                      "package": None}
+        # package which rows are being written now
+        self._current = None
+        self._packages_since_save = 0
+
+    @staticmethod
+    def load(filename, ecosystems, shard=None, interval=DEFAULT_INTERVAL):
+        """Load the progress of the interrupted scan, the scan settings need to be the same."""
+        checkpoint = Checkpoint(filename, ecosystems, shard, interval)
+        if not os.path.exists(filename):
+            logging.info("No checkpoint {f} found, the scan starts from beginning".format(
+                f=filename))
+            return checkpoint
+        with open(filename) as fin:
+            state = json.load(fin)
+        if state["ecosystems"] != checkpoint.state["ecosystems"] or \
+                state["shard"] != checkpoint.state["shard"]:
+            raise Exception("Checkpoint {f} was written for ecosystems {e} and shard {s}, "
+                            "the scan can't be resumed with different settings".format(
+                                f=filename, e=state["ecosystems"], s=state["shard"]))
+        checkpoint.state = state
+        logging.info("Scan is resumed after the package {p} from the ecosystem {e} "
+                     "in the report {r}".format(p=state["package"], e=state["ecosystem"],
+                                                r=state["report"]))
+        return checkpoint
+
+    def is_completed(self, report):
+        """Check if the report has been written completely."""
+        return report in self.state["completed"]
+
+    def resume_offset(self, report):
+        """Return the size of the partially written report, None if it needs to be created."""
+        if self.state["report"] == report:
+            return self.state["offset"]
+        return None
+
+    def is_checked(self, report, ecosystem, package):
+        """Check if all rows for the package have been written before the last checkpoint."""
+        if self.is_completed(report):
+            return True
+        if self.state["report"] != report:
+            return False
+        ecosystems = self.state["ecosystems"]
+        last_ecosystem = ecosystems.index(self.state["ecosystem"])
+        if ecosystems.index(ecosystem) != last_ecosystem:
+            return ecosystems.index(ecosystem) < last_ecosystem
+        return self.state["package"] is not None and \
+            listing_order(package) <= listing_order(self.state["package"])
+
+    def before_row(self, csvReporter, report, ecosystem, package):
+        """Register the row to be written, all rows for previous package have been written."""
+        if self._current is not None and self._current != (report, ecosystem, package):
+            self.package_done(csvReporter)
+        self._current = (report, ecosystem, package)
+
+    def package_done(self, csvReporter, force=False):
+        """Mark the current package as checked, store the progress from time to time."""
+        report, ecosystem, package = self._current
+        self._packages_since_save += 1
+        if force or self._packages_since_save >= self.interval:
+            self.state.update(report=report, offset=csvReporter.durable_size(),
+                              ecosystem=ecosystem, package=package)
+            self.save()
+            self._packages_since_save = 0
+
+    def ecosystem_done(self, csvReporter):
+        """Store the progress when all packages from the ecosystem have been checked."""
+        if self._current is not None:
+            self.package_done(csvReporter, force=True)
+            self._current = None
+
+    def report_done(self, report):
+        """Mark the report as completely written."""
+        self.state["completed"].append(report)
+        self.state.update(report=None, offset=None, ecosystem=None, package=None)
+        self.save()
+
+    def save(self):
+        """Atomically replace the checkpoint file, the old or new progress is always readable."""
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w") as fout:
+            json.dump(self.state, fout, indent=4)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(temporary, self.filename)
@@ -2,6 +2,8 @@
 
 import argparse
 
+from sharding import Shard
+
 cli_parser = argparse.ArgumentParser()
 
 cli_parser.add_argument('--log-level',
@@ -20,3 +22,199 @@ cli_parser.add_argument('-d3', '--disable-s3-tests',
 cli_parser.add_argument('-dg', '--disable-gremlin-tests',
                         help='disable Gremlin tests',
                         action='store_true')
+
+cli_parser.add_argument('--max-in-flight',
+                        help='maximal number of objects that are read and checked '
+                             'concurrently (default=16)',
+                        type=int, default=16)
+
+cli_parser.add_argument('--adaptive-concurrency',
+                        help='adapt the number of concurrent S3 requests per bucket and key '
+                             'prefix: it grows while latency and errors stay low and it is '
+                             'cut on throttling (SlowDown); --max-in-flight is the upper '
+                             'bound',
+                        action='store_true')
+
+cli_parser.add_argument('--initial-in-flight',
+                        help='initial number of concurrent S3 requests per bucket and prefix '
+                             'with --adaptive-concurrency (default=4)',
+                        type=int, default=4)
+
+cli_parser.add_argument('--s3-connect-timeout',
+                        help='timeout for connecting to the S3 in seconds (default=10)',
+                        type=int, default=10)
+
+cli_parser.add_argument('--s3-read-timeout',
+                        help='timeout for reading the response from the S3 in seconds '
+                             '(default=60)',
+                        type=int, default=60)
+
+cli_parser.add_argument('--s3-max-attempts',
+                        help='maximal number of attempts of one S3 request, requests are '
+                             'retried with backoff and rate limiting (default=10)',
+                        type=int, default=10)
+
+cli_parser.add_argument('--state-db',
+                        help='SQLite database with verdicts from previous runs, only new '
+                             'and changed objects (by ETag) are read and checked',
+                        type=str)
+
+cli_parser.add_argument('--refresh',
+                        help='check all objects again, but update verdicts in the state '
+                             'database (needed when checks have been changed)',
+                        action='store_true')
+
+cli_parser.add_argument('--no-key-index',
+                        help='do not list all keys of both buckets into memory, packages are '
+                             'joined from paginated listings and objects of each package are '
+                             'listed separately; the graph check is skipped and the state '
+                             'database is not used',
+                        action='store_true')
+
+cli_parser.add_argument('--max-object-size',
+                        help='maximal size of checked objects in MB, larger objects are '
+                             'reported as too large (default=50)',
+                        type=int, default=50)
+
+cli_parser.add_argument('--validation-pool',
+                        help='parse and check objects in a process pool, I/O threads only '
+                             'read the objects',
+                        action='store_true')
+
+cli_parser.add_argument('--validation-processes',
+                        help='number of processes that parse and check objects '
+                             '(default=number of CPU cores)',
+                        type=int)
+
+cli_parser.add_argument('--validation-batch',
+                        help='number of packages (or package versions) whose objects are '
+                             'sent to the checking process at once (default=32)',
+                        type=int, default=32)
+
+cli_parser.add_argument('--gremlin-batch',
+                        help='number of packages looked up in the graph database by one '
+                             'query (default=200)',
+                        type=int, default=200)
+
+cli_parser.add_argument('--gremlin-timeout',
+                        help='timeout for one query to the graph database in seconds '
+                             '(default=60)',
+                        type=int, default=60)
+
+cli_parser.add_argument('--gremlin-max-delay',
+                        help='maximal delay in hours between the analysis stored in S3 and '
+                             'the update of the graph database (default=24)',
+                        type=int, default=24)
+
+cli_parser.add_argument('--ecosystem',
+                        help='ecosystem to be checked, can be used more times (default=pypi)',
+                        action='append')
+
+cli_parser.add_argument('--shard',
+                        help='check only packages from the shard i/N (0 <= i < N), N processes '
+                             'or hosts check disjoint sets of packages; reports get the '
+                             '.shard-i-of-N suffix',
+                        type=Shard.parse)
+
+cli_parser.add_argument('--merge',
+                        help='merge reports and summaries written by N shards, nothing is '
+                             'checked',
+                        type=int, metavar='N')
+
+cli_parser.add_argument('--resume',
+                        help='continue the interrupted scan from the last checkpoint, rows are '
+                             'appended to existing reports',
+                        action='store_true')
+
+cli_parser.add_argument('--checkpoint-interval',
+                        help='number of packages checked between two checkpoints '
+                             '(default=100)',
+                        type=int, default=100)
+
+cli_parser.add_argument('--sample',
+                        help='check only random sample of N objects per ecosystem and '
+                             'analysis type, failure rates are estimated with confidence '
+                             'intervals',
+                        type=int, metavar='N')
+
+cli_parser.add_argument('--sample-confidence',
+                        help='confidence level of intervals estimated from the sample '
+                             '(default=0.95)',
+                        type=float, default=0.95)
+
+cli_parser.add_argument('--sample-seed',
+                        help='seed of the random sample, the same seed gives the same sample '
+                             '(default=random seed, it is logged)',
+                        type=int)
+
+cli_parser.add_argument('--census',
+                        help='count objects without reading them whole: existence (listing '
+                             'and HEAD requests only) or schema (schema versions read by '
+                             'ranged GETs)',
+                        choices=['existence', 'schema'])
+
+cli_parser.add_argument('--range-size',
+                        help='number of KB read from the beginning (and if needed from the '
+                             'end) of each object by the schema census (default=16)',
+                        type=int, default=16)
+
+cli_parser.add_argument('--local-s3',
+                        help='read objects from buckets stored in the local directory (e.g. '
+                             'the corpus generated by benchmark.py) instead of from AWS S3',
+                        type=str, metavar='DIRECTORY')
+
+benchmark_cli_parser = argparse.ArgumentParser(
+    description='Offline benchmark of the integrity checks on the synthetic corpus')
+
+benchmark_cli_parser.add_argument('--log-level',
+                                  help='log level as defined in ' +
+                                       'https://docs.python.org/3/library/logging.html'
+                                       '#logging-levels',
+                                  type=int, default=20)
+
+benchmark_cli_parser.add_argument('--corpus',
+                                  help='directory with the corpus, it is generated when it '
+                                       'does not exist or has different settings '
+                                       '(default=corpus)',
+                                  type=str, default='corpus')
+
+benchmark_cli_parser.add_argument('--packages',
+                                  help='number of packages in the corpus (default=100)',
+                                  type=int, default=100)
+
+benchmark_cli_parser.add_argument('--versions',
+                                  help='number of versions per package (default=5)',
+                                  type=int, default=5)
+
+benchmark_cli_parser.add_argument('--defect-rate',
+                                  help='fraction of defective objects (default=0.05)',
+                                  type=float, default=0.05)
+
+benchmark_cli_parser.add_argument('--payload',
+                                  help='number of items in details of each analysis, '
+                                       'determines the size of objects (default=20)',
+                                  type=int, default=20)
+
+benchmark_cli_parser.add_argument('--seed',
+                                  help='seed of the corpus generator (default=0)',
+                                  type=int, default=0)
+
+benchmark_cli_parser.add_argument('--max-in-flight',
+                                  help='maximal number of objects that are read and checked '
+                                       'concurrently (default=16)',
+                                  type=int, default=16)
+
+benchmark_cli_parser.add_argument('--validation-pool',
+                                  help='parse and check objects in a process pool',
+                                  action='store_true')
+
+benchmark_cli_parser.add_argument('--validation-processes',
+                                  help='number of processes that parse and check objects '
+                                       '(default=number of CPU cores)',
+                                  type=int)
+
+benchmark_cli_parser.add_argument('--validation-batch',
+                                  help='number of packages (or package versions) whose '
+                                       'objects are sent to the checking process at once '
+                                       '(default=32)',
+                                  type=int, default=32)
@@ -1,7 +1,8 @@
 """Checker for JSON files stored for component versions in core-data bucket."""
 
-from checker import Checker
+from checker import Checker, cached_verdict
 from botocore.exceptions import ClientError
+from validators import COMPONENT_VALIDATORS
 
 
 class ComponentVersionsChecker(Checker):
@@ -9,11 +10,14 @@ class ComponentVersionsChecker(Checker):
 
     BUCKET_NAME = "bayesian-core-data"
 
-    def __init__(self, s3interface, ecosystem, package_name):
+    def __init__(self, s3interface, ecosystem, package_name, key_index=None,
+                 state_store=None):
         """Initialize the core package checker."""
         self.s3interface = s3interface
         self.ecosystem = ecosystem
         self.package_name = package_name
+        self.key_index = key_index
+        self.state_store = state_store
 
     @property
     def version(self):
@@ -25,6 +29,14 @@ class ComponentVersionsChecker(Checker):
         """Set the value of the version property."""
         self._version = version
 
+    def validation_context(self):
+        """Return values expected in the validated metadata."""
+        return {"ecosystem": self.ecosystem,
+                "package": self.package_name,
+                "version": self._version,
+                "release": self.release_string(self.ecosystem, self.package_name,
+                                               self._version)}
+
     def check_release_attribute(self, data):
         """Check the content of _release attribute.
 
@@ -35,19 +47,29 @@ class ComponentVersionsChecker(Checker):
         assert data["_release"] == self.release_string(self.ecosystem, self.package_name,
                                                        self._version)
 
+    def object_key(self, metadata_key):
+        """Return key of the component core data or of the selected component metadata."""
+        if metadata_key is None:
+            return self.s3interface.component_key(self.ecosystem, self.package_name,
+                                                  self._version)
+        return self.s3interface.component_analysis_key(self.ecosystem, self.package_name,
+                                                       self._version, metadata_key)
+
     def read_core_metadata(self):
         """Read JSON metadata for the given key."""
         key = self.s3interface.component_key(self.ecosystem, self.package_name, self._version)
-        return self.s3interface.read_object(ComponentVersionsChecker.BUCKET_NAME, key)
+        return self.read_object(ComponentVersionsChecker.BUCKET_NAME, key)
 
-    def read_metadata(self, metadata_key):
-        """Read JSON metadata for the given key."""
+    def read_metadata(self, metadata_key, fields=None):
+        """Read JSON metadata for the given key, parse only selected fields if specified."""
         key = self.s3interface.component_analysis_key(self.ecosystem, self.package_name,
                                                       self._version, metadata_key)
-        return self.s3interface.read_object(ComponentVersionsChecker.BUCKET_NAME, key)
+        return self.read_object(ComponentVersionsChecker.BUCKET_NAME, key, fields)
 
     def read_metadata_list(self):
         """Read list of all metadata for given E+P."""
+        if self.key_index is not None:
+            return self.key_index.keys_for_package(self.package_name)
         try:
             jsons = self.s3interface.read_object_list(ComponentVersionsChecker.BUCKET_NAME,
                                                       self.ecosystem, self.package_name,
@@ -87,6 +109,7 @@ class ComponentVersionsChecker(Checker):
         versions = directories | version_jsons
         return directories, version_jsons, versions, metadata_list
 
+    @cached_verdict(None)
     def check_core_data(self):
         """Check the component core data read from the AWS S3 database.
 
@@ -120,119 +143,60 @@ class ComponentVersionsChecker(Checker):
         try:
             data = self.read_core_metadata()
             assert data, "N/A"
-            started_at = self.check_and_get_attribute(data, "started_at")
-            self.check_timestamp(started_at)
-
-            finished_at = self.check_and_get_attribute(data, "finished_at")
-            self.check_timestamp(finished_at)
-
-            actual_ecosystem = self.check_and_get_attribute(data, "ecosystem")
-
-            assert self.ecosystem == actual_ecosystem, "Ecosystem {e1} differs from expected " \
-                "ecosystem {e2}".format(e1=actual_ecosystem, e2=self.ecosystem)
-
-            actual_package = self.check_and_get_attribute(data, "package")
-            assert self.package_name == actual_package, "Package {p1} differs from expected " \
-                "package {p2}".format(p1=actual_package, p2=self.package_name)
-
-            actual_version = self.check_and_get_attribute(data, "version")
-            assert self._version == actual_version, "Version {v1} differs from expected " \
-                "version {v2}".format(v1=actual_version, v2=self._version)
-
-            # the following attributes are expected to be presented for all component
-            # toplevel metadata
-            attributes_to_check = ["id", "analyses", "audit", "dependents_count", "latest_version",
-                                   "package_info", "subtasks"]
-            self.check_attributes_presence(data, attributes_to_check)
-
+            COMPONENT_VALIDATORS["core_data"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("code_metrics")
     def check_code_metrics(self):
         """Check the content of package version metadata taken from core_metrics.json."""
         try:
-            data = self.read_metadata("code_metrics")
+            data = self.read_metadata("code_metrics", Checker.COMMON_FIELDS | {"summary"})
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_attributes_presence(data, ["details", "schema", "summary"])
-            summary = data["summary"]
-            self.check_attributes_presence(summary, ["blank_lines", "code_lines", "comment_lines",
-                                                     "total_files", "total_lines"])
-            details = data["details"]
-            assert details
-            #
-            #
-            # 'details': {   'languages': [   {   'blank_lines': 433,
-            #                                    'code_lines': 2927,
-            #                                    'comment_lines': 62,
-            #                                    'files_count': 1,
-            #                                    'language': 'Clojure'},
-            #                                {   'blank_lines': 1771,
-            #                                    'code_lines': 6679,
-            #                                    'comment_lines': 1174,
-            #                                    'files_count': 77,
-            #                                    'language': 'Python',
-            #
+            COMPONENT_VALIDATORS["code_metrics"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("dependency_snapshot")
     def check_dependency_snapshot(self):
         """Check the content of package version metadata taken from dependency_snapshot.json."""
         try:
-            data = self.read_metadata("dependency_snapshot")
+            data = self.read_metadata("dependency_snapshot",
+                                      Checker.COMMON_FIELDS | {"summary"})
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_schema_attribute(data, "dependency_snapshot", "1-0-0")
-            self.check_attribute_presence(data, "summary")
-            summary = data["summary"]
-            self.check_attributes_presence(summary, ["dependency_counts", "errors"])
-            dependency_counts = self.check_and_get_attribute(summary, "dependency_counts")
-            runtime_count = self.check_and_get_attribute(dependency_counts, "runtime")
-            assert int(runtime_count) >= 0
+            COMPONENT_VALIDATORS["dependency_snapshot"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("digests")
     def check_digests(self):
         """Check the content of package version metadata taken from digests.json."""
         try:
-            data = self.read_metadata("digests")
+            data = self.read_metadata("digests", Checker.COMMON_FIELDS)
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_schema_attribute(data, "digests", "1-0-0")
-            self.check_attributes_presence(data, ["details", "summary"])
-            details = self.check_and_get_attribute(data, "details")
-            assert len(details) >= 0
-            # TODO: list of maps
+            COMPONENT_VALIDATORS["digests"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("keywords_tagging")
     def check_keywords_tagging(self):
         """Check the content of package version metadata taken from keywords_tagging.json."""
         try:
-            data = self.read_metadata("keywords_tagging")
+            data = self.read_metadata("keywords_tagging", Checker.COMMON_FIELDS)
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_attributes_presence(data, ["details", "summary"])
+            COMPONENT_VALIDATORS["keywords_tagging"](data, self.validation_context())
             #  no schema to check (yet?)
             #  tracked here: https://github.com/openshiftio/openshift.io/issues/1074
             return "OK"
@@ -241,18 +205,13 @@ class ComponentVersionsChecker(Checker):
         except Exception as e:
             return str(e)
 
+    @cached_verdict("metadata")
     def check_metadata(self):
         """Check the content of package version metadata taken from metadata.json."""
         try:
-            data = self.read_metadata("metadata")
+            data = self.read_metadata("metadata", Checker.COMMON_FIELDS)
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_attributes_presence(data, ["details", "summary", "schema"])
-            self.check_schema_attribute(data, "metadata", "3-2-0")
-            details = data["details"]
-            assert details
+            COMPONENT_VALIDATORS["metadata"](data, self.validation_context())
             # TODO: list of maps
             return "OK"
         except ClientError:
@@ -260,38 +219,27 @@ class ComponentVersionsChecker(Checker):
         except Exception as e:
             return str(e)
 
+    @cached_verdict("security_issues")
     def check_security_issues(self):
         """Check the content of package version metadata taken from security_issues.json."""
         try:
-            data = self.read_metadata("security_issues")
+            data = self.read_metadata("security_issues", Checker.COMMON_FIELDS | {"summary"})
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_schema_attribute(data, "security_issues", "3-0-1")
-            self.check_attributes_presence(data, ["details", "summary", "schema"])
-            details = data["details"]
-            assert type(details) is list
+            COMPONENT_VALIDATORS["security_issues"](data, self.validation_context())
             # TODO: list of maps
-            summary = data["summary"]
-            for cve in summary:
-                self.check_cve_value(cve)
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("source_licenses")
     def check_source_licenses(self):
         """Check the content of package version metadata taken from source_licenses.json."""
         try:
-            data = self.read_metadata("source_licenses")
+            data = self.read_metadata("source_licenses", Checker.COMMON_FIELDS)
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            self.check_schema_attribute(data, "source_licenses", "3-0-0")
-            self.check_attributes_presence(data, ["details", "summary", "schema"])
+            COMPONENT_VALIDATORS["source_licenses"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
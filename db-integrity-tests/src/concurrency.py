@@ -0,0 +1,205 @@
+"""Adaptive (AIMD) control of the number of concurrent requests sent to S3.
+
+S3 scales the request rate per key prefix, and it responds by 503 SlowDown when the rate
+grows faster than the partition can handle. Fixed concurrency therefore either leaves
+the available rate unused, or it triggers storms of SlowDown responses when all keys are
+read from the same hot prefix (pypi/...).
+
+The number of requests in flight is limited separately for each bucket and prefix (the
+first part of the key). The limit grows additively, by one request per limit of healthy
+responses, as long as the latency stays close to the lowest observed latency and the
+error rate stays low. When S3 throttles the requests (the request failed by SlowDown or
+it needed to be retried), the limit is cut multiplicatively. The limit is cut once per
+throttling episode: responses to requests sent before the last cut do not cut it again.
+"""
+
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+
+# multiplicative decrease of the limit on throttling
+DEFAULT_DECREASE_FACTOR = 0.5
+
+# the latency is healthy when its moving average is at most this multiple of the baseline
+DEFAULT_LATENCY_TOLERANCE = 2.0
+
+# the error rate is healthy when its moving average is at most this fraction
+DEFAULT_ERROR_THRESHOLD = 0.05
+
+# weight of the last response in moving averages of the latency and the error rate
+SMOOTHING = 0.1
+
+# the lowest observed latency slowly grows, so the baseline follows the changing load
+BASELINE_DRIFT = 1.001
+
+# error codes used by S3 (and S3 compatible services) for throttled requests
+THROTTLING_ERRORS = {"SlowDown", "ServiceUnavailable", "Throttling", "ThrottlingException",
+                     "RequestLimitExceeded", "TooManyRequests"}
+
+OK = "OK"
+ERROR = "ERROR"
+THROTTLED = "THROTTLED"
+
+
+def key_prefix(key):
+    """Return the prefix (first part including the slash) of the key that S3 partitions by."""
+    return key[:key.find("/") + 1]
+
+
+def response_outcome(response):
+    """Return the outcome of the successful call, retried calls were throttled."""
+    if response.get("ResponseMetadata", {}).get("RetryAttempts", 0) > 0:
+        return THROTTLED
+    return OK
+
+
+def error_outcome(exception):
+    """Return the outcome of the failed call."""
+    if not isinstance(exception, ClientError):
+        # timeouts and connection errors
+        return ERROR
+    status = exception.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    code = exception.response.get("Error", {}).get("Code")
+    if status == 503 or code in THROTTLING_ERRORS:
+        return THROTTLED
+    if status is not None and status >= 500:
+        return ERROR
+    # missing objects and other client errors are valid answers of a healthy service
+    return OK
+
+
+class AIMDLimiter:
+    """Limit of requests in flight for one bucket and prefix, adapted by AIMD."""
+
+    def __init__(self, bucket, prefix, initial_limit=DEFAULT_INITIAL_LIMIT,
+                 min_limit=DEFAULT_MIN_LIMIT, max_limit=None,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 latency_tolerance=DEFAULT_LATENCY_TOLERANCE,
+                 error_threshold=DEFAULT_ERROR_THRESHOLD):
+        """Initialize the limiter, max_limit=None means that the limit is not bounded."""
+        self.bucket = bucket
+        self.prefix = prefix
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = self.bounded(initial_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+
+        self._condition = threading.Condition()
+        self.in_flight = 0
+        # incremented by each decrease, requests sent before it don't decrease the limit again
+        self.generation = 0
+
+        self.latency = None
+        self.baseline_latency = None
+        self.error_rate = 0.0
+
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.decreases = 0
+        self.peak_limit = self.limit
+
+    def bounded(self, limit):
+        """Return the limit bounded by the minimal and maximal limit."""
+        limit = max(self.min_limit, limit)
+        if self.max_limit is not None:
+            limit = min(self.max_limit, limit)
+        return limit
+
+    def acquire(self):
+        """Wait until the request can be sent, return the generation it is sent in."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self.generation
+
+    def release(self, generation, latency, outcome):
+        """Finish the request sent in the generation and adapt the limit to its outcome."""
+        with self._condition:
+            self.in_flight -= 1
+            self.requests += 1
+            if outcome == THROTTLED:
+                self.throttled += 1
+                if generation == self.generation:
+                    self.limit = self.bounded(self.limit * self.decrease_factor)
+                    self.generation += 1
+                    self.decreases += 1
+            else:
+                self.add_sample(latency, outcome)
+                if self.is_healthy():
+                    # the limit grows by one per round trip of all requests in flight
+                    self.limit = self.bounded(self.limit + 1 / self.limit)
+                    self.peak_limit = max(self.peak_limit, self.limit)
+            self._condition.notify_all()
+
+    def add_sample(self, latency, outcome):
+        """Update moving averages of the latency and the error rate."""
+        if outcome == ERROR:
+            self.errors += 1
+        self.error_rate += SMOOTHING * ((outcome == ERROR) - self.error_rate)
+        if outcome != OK:
+            return
+        if self.latency is None:
+            self.latency = self.baseline_latency = latency
+            return
+        self.latency += SMOOTHING * (latency - self.latency)
+        self.baseline_latency = min(self.latency, self.baseline_latency * BASELINE_DRIFT)
+
+    def is_healthy(self):
+        """Check if the latency and the error rate allow sending more requests."""
+        if self.error_rate > self.error_threshold:
+            return False
+        return self.latency is None or \
+            self.latency <= self.latency_tolerance * self.baseline_latency
+
+
+class AdaptiveConcurrency:
+    """AIMD limiters of requests in flight, one for each bucket and key prefix."""
+
+    def __init__(self, max_limit, initial_limit=DEFAULT_INITIAL_LIMIT):
+        """Initialize the controller, max_limit is the number of threads sending requests."""
+        self.max_limit = max_limit
+        self.initial_limit = initial_limit
+        self.limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, bucket, prefix):
+        """Return the limiter for the bucket and prefix, it is created when needed."""
+        with self._lock:
+            limiter = self.limiters.get((bucket, prefix))
+            if limiter is None:
+                limiter = AIMDLimiter(bucket, prefix, self.initial_limit,
+                                      max_limit=self.max_limit)
+                self.limiters[(bucket, prefix)] = limiter
+            return limiter
+
+    def call(self, bucket, key, function, **kwargs):
+        """Call the client function when the limit for the bucket and key prefix allows it."""
+        limiter = self.limiter(bucket, key_prefix(key))
+        generation = limiter.acquire()
+        start = time.perf_counter()
+        try:
+            response = function(**kwargs)
+        except Exception as e:
+            limiter.release(generation, time.perf_counter() - start, error_outcome(e))
+            raise
+        limiter.release(generation, time.perf_counter() - start, response_outcome(response))
+        return response
+
+    def summary(self):
+        """Return one line per bucket and prefix with the limit and throttled requests."""
+        with self._lock:
+            limiters = sorted(self.limiters.items())
+        return ["S3 concurrency for {b}/{p}: limit {l:.1f} (peak {m:.1f}), {n} requests, "
+                "{t} throttled, {e} errors, {d} decreases".format(
+                    b=bucket, p=prefix, l=limiter.limit, m=limiter.peak_limit,
+                    n=limiter.requests, t=limiter.throttled, e=limiter.errors,
+                    d=limiter.decreases)
+                for (bucket, prefix), limiter in limiters]
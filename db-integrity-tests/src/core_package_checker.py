@@ -1,7 +1,8 @@
 """Checker for JSON files stored for the whole packages in core-package-data bucket."""
 
-from checker import Checker
+from checker import Checker, cached_verdict
 from botocore.exceptions import ClientError
+from validators import PACKAGE_VALIDATORS
 
 
 class CorePackageChecker(Checker):
@@ -10,31 +11,48 @@ class CorePackageChecker(Checker):
     BUCKET_NAME = "bayesian-core-package-data"
     GITHUB_DETAILS_SCHEMA_VERSION = "2-0-1"
 
-    def __init__(self, s3interface, ecosystem, package_name):
+    # analyses stored for the whole package, other files are reported as leftovers
+    ANALYSES = ["github_details", "keywords_tagging", "libraries_io", "git_stats"]
+
+    def __init__(self, s3interface, ecosystem, package_name, key_index=None,
+                 state_store=None):
         """Initialize the core package checker."""
         self.s3interface = s3interface
         self.ecosystem = ecosystem
         self.package_name = package_name
-
-    def read_metadata(self, metadata_key):
-        """Read JSON metadata for the given key."""
+        self.key_index = key_index
+        self.state_store = state_store
+
+    def object_key(self, metadata_key):
+        """Return key of the package toplevel file or of the selected package metadata."""
+        if metadata_key is None:
+            return self.s3interface.package_key(self.ecosystem, self.package_name)
+        return self.s3interface.package_analysis_key(self.ecosystem, self.package_name,
+                                                     metadata_key)
+
+    def read_metadata(self, metadata_key, fields=None):
+        """Read JSON metadata for the given key, parse only selected fields if specified."""
         key = self.s3interface.package_analysis_key(self.ecosystem, self.package_name, metadata_key)
-        return self.s3interface.read_object(CorePackageChecker.BUCKET_NAME, key)
+        return self.read_object(CorePackageChecker.BUCKET_NAME, key, fields)
 
+    @cached_verdict(None)
     def check_core_json(self):
         """Check the content of package toplevel file."""
         key = self.s3interface.package_key(self.ecosystem, self.package_name)
         try:
-            data = self.s3interface.read_object(CorePackageChecker.BUCKET_NAME, key)
-            self.check_attribute_presence(data, "id")
-            self.check_attribute_presence(data, "package_id")
-            self.check_attribute_presence(data, "started_at")
-            self.check_attribute_presence(data, "finished_at")
+            data = self.read_object(CorePackageChecker.BUCKET_NAME, key)
+            PACKAGE_VALIDATORS["core_json"](data, self.validation_context())
             assert data, "N/A"
             return "OK"
         except Exception as e:
             return str(e)
 
+    def validation_context(self):
+        """Return values expected in the validated metadata."""
+        return {"ecosystem": self.ecosystem,
+                "package": self.package_name,
+                "release": self.release_string(self.ecosystem, self.package_name)}
+
     def check_release_attribute(self, data, version=None):
         """Check the content of _release attribute.
 
@@ -44,68 +62,52 @@ class CorePackageChecker(Checker):
         self.check_attribute_presence(data, "_release")
         assert data["_release"] == self.release_string(self.ecosystem, self.package_name, version)
 
+    @cached_verdict("github_details")
     def check_github_details(self):
         """Check all relevant attributes stored in the JSON with GitHub details."""
         try:
-            data = self.read_metadata("github_details")
+            data = self.read_metadata("github_details", Checker.COMMON_FIELDS)
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-
-            self.check_attribute_presence(data, "summary")
-            self.check_attribute_presence(data, "details")
-
-            self.check_schema_attribute(data, "github_details",
-                                        CorePackageChecker.GITHUB_DETAILS_SCHEMA_VERSION)
+            PACKAGE_VALIDATORS["github_details"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("keywords_tagging")
     def check_keywords_tagging(self):
         """Check all relevant attributes stored in the JSON with keywods tagging."""
         try:
-            data = self.read_metadata("keywords_tagging")
+            data = self.read_metadata("keywords_tagging", Checker.COMMON_FIELDS | {"details"})
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-
-            details = self.get_details_node(data)
-            self.check_attribute_presence(details, "package_name")
-            self.check_attribute_presence(details, "repository_description")
+            PACKAGE_VALIDATORS["keywords_tagging"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("libraries_io")
     def check_libraries_io(self):
         """Check the content of package metadata taken from libaries.io."""
         try:
-            data = self.read_metadata("libraries_io")
+            data = self.read_metadata("libraries_io", Checker.COMMON_FIELDS)
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
+            PACKAGE_VALIDATORS["libraries_io"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
         except Exception as e:
             return str(e)
 
+    @cached_verdict("git_stats")
     def check_git_stats(self):
         """Check the content of package metadata taken from git_stats.json."""
         try:
-            data = self.read_metadata("git_stats")
+            data = self.read_metadata("git_stats", Checker.COMMON_FIELDS | {"details"})
             assert data, "N/A"
-            self.check_audit_metadata(data)
-            self.check_release_attribute(data)
-            self.check_status_attribute(data)
-            details = self.get_details_node(data)
-            self.check_attribute_presence(details, "master")
+            PACKAGE_VALIDATORS["git_stats"](data, self.validation_context())
             return "OK"
         except ClientError:
             return "N/A"
@@ -115,16 +117,20 @@ class CorePackageChecker(Checker):
     def check_leftovers(self):
         """Check for any leftovers in the S3 database."""
         try:
-            jsons = self.s3interface.read_object_list(CorePackageChecker.BUCKET_NAME,
-                                                      self.ecosystem, self.package_name)
-            jsons = set(jsons)
-
-            # remove the 'main' JSON file
-            package_json = "{p}.json".format(p=self.package_name)
-            jsons.remove(package_json)
-
-            expected = {'github_details.json', 'keywords_tagging.json', 'git_stats.json',
-                        'libraries_io.json'}
+            if self.key_index is not None:
+                # only the files stored in the package directory are in the index
+                jsons = self.key_index.keys_for_package(self.package_name)
+                jsons = set(json[json.rfind("/") + 1:] for json in jsons)
+            else:
+                jsons = self.s3interface.read_object_list(CorePackageChecker.BUCKET_NAME,
+                                                          self.ecosystem, self.package_name)
+                jsons = set(jsons)
+
+                # remove the 'main' JSON file
+                package_json = "{p}.json".format(p=self.package_name)
+                jsons.remove(package_json)
+
+            expected = {analysis + ".json" for analysis in CorePackageChecker.ANALYSES}
 
             leftovers = jsons - expected
             assert not leftovers, ",".join(leftovers)
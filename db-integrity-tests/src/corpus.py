@@ -0,0 +1,264 @@
+"""Generator of synthetic corpus of analyses, used to benchmark the integrity checks offline.
+
+The corpus consists of N packages with M versions each. For every package the core package
+data and all package analyses are generated, for every version the core data and all
+component analyses are generated, so the corpus looks like the content of core-data and
+core-package-data buckets. Selected fraction of objects is made defective: the object is
+truncated, an attribute required by the checks is removed, a timestamp is broken, or the
+details node is null, so every defective object fails exactly one check. The corpus is
+written into a directory that is read by LocalS3Interface (see local_s3.py), the manifest
+with the numbers of objects and injected defects is written next to the buckets.
+"""
+
+import json
+import logging
+import os
+import random
+
+from checker import Checker
+from component_versions_checker import ComponentVersionsChecker
+from core_package_checker import CorePackageChecker
+from s3interface import S3Interface
+
+MANIFEST = "corpus.json"
+
+# to be increased when generated objects change, so the old corpus is not reused
+CORPUS_VERSION = 3
+
+DEFAULT_DEPLOYMENT_PREFIX = "STAGE"
+
+MANIFESTS_BUCKET = "bayesian-core-manifests"
+
+# name of the analysis used for core data (version.json) and core package data (package.json)
+CORE_ANALYSIS = "core"
+
+COMPONENT_ANALYSES = ["code_metrics", "dependency_snapshot", "digests", "keywords_tagging",
+                      "metadata", "security_issues", "source_licenses"]
+
+PACKAGE_ANALYSES = ["github_details", "keywords_tagging", "libraries_io", "git_stats"]
+
+SCHEMA_VERSIONS = {
+    "code_metrics": "1-0-0",
+    "dependency_snapshot": "1-0-0",
+    "digests": "1-0-0",
+    "github_details": "2-0-1",
+    "metadata": "3-2-0",
+    "security_issues": "3-0-1",
+    "source_licenses": "3-0-0",
+}
+
+DEFECTS = ["truncated", "missing_attribute", "broken_timestamp", "null_details"]
+
+# analyses with checks that inspect the value of the details node
+DETAILS_CHECKED = {"code_metrics", "digests", "metadata", "security_issues"}
+
+WORDS = ["parser", "client", "server", "async", "json", "yaml", "http", "crypto", "test",
+         "logging", "cache", "database", "image", "config", "network", "cli", "plugin"]
+
+
+class CorpusGenerator:
+    """Generator of analyses for N packages x M versions with a fraction of defects.
+
+    The payload is the number of items in the details of each analysis, it determines the
+    size of generated objects. The same seed gives the same corpus.
+    """
+
+    def __init__(self, packages, versions, defect_rate=0.05, payload=20, seed=0,
+                 ecosystem="pypi"):
+        """Initialize the generator."""
+        self.packages = packages
+        self.versions = versions
+        self.defect_rate = defect_rate
+        self.payload = payload
+        self.seed = seed
+        self.ecosystem = ecosystem
+        self.rng = random.Random(seed)
+
+    def settings(self):
+        """Return settings of the generator, the same settings give the same corpus."""
+        return {"version": CORPUS_VERSION, "packages": self.packages, "versions": self.versions,
+                "defect_rate": self.defect_rate, "payload": self.payload, "seed": self.seed,
+                "ecosystem": self.ecosystem}
+
+    def timestamp(self):
+        """Return random timestamp in one of formats used by the analyses."""
+        separator = self.rng.choice("T ")
+        fraction = self.rng.choice(["", ".%06d" % self.rng.randrange(1000000)])
+        return "2017-%02d-%02d%s%02d:%02d:%02d%s" % (
+            self.rng.randint(1, 12), self.rng.randint(1, 28), separator,
+            self.rng.randrange(24), self.rng.randrange(60), self.rng.randrange(60), fraction)
+
+    def words(self, count):
+        """Return list of random words."""
+        return [self.rng.choice(WORDS) for _ in range(count)]
+
+    def analysis(self, name, release, details, summary):
+        """Return the analysis with audit, release, and status attributes."""
+        document = {"_audit": {"version": "v1", "started_at": self.timestamp(),
+                               "ended_at": self.timestamp()},
+                    "_release": release,
+                    "status": "success",
+                    "details": details,
+                    "summary": summary}
+        if name in SCHEMA_VERSIONS:
+            document["schema"] = {"name": name, "version": SCHEMA_VERSIONS[name]}
+        return document
+
+    def component_analysis(self, name, package, version):
+        """Return the component analysis of the selected type."""
+        release = Checker.release_string(self.ecosystem, package, version)
+        n = self.payload
+        if name == "code_metrics":
+            details = {"languages": [{"language": word, "metrics": {"average_cyclomatic":
+                                                                    self.rng.random()}}
+                                     for word in self.words(n)]}
+            summary = {"blank_lines": n, "code_lines": 10 * n, "comment_lines": 2 * n,
+                       "total_files": n, "total_lines": 13 * n}
+        elif name == "dependency_snapshot":
+            details = {"runtime": [{"package": word, "version": "1.0"}
+                                   for word in self.words(n)]}
+            summary = {"dependency_counts": {"runtime": str(n)}, "errors": []}
+        elif name == "digests":
+            details = [{"path": "/".join(self.words(3)),
+                        "sha1": "%040x" % self.rng.getrandbits(160)} for _ in range(n)]
+            summary = {}
+        elif name == "keywords_tagging":
+            details = {"keywords": self.words(n)}
+            summary = self.words(5)
+        elif name == "metadata":
+            details = [{"name": package, "version": version,
+                        "description": " ".join(self.words(n)), "keywords": self.words(5)}]
+            summary = []
+        elif name == "security_issues":
+            cves = ["CVE-2017-%04d" % self.rng.randrange(10000) for _ in range(n // 10)]
+            details = [{"id": cve, "cvss": {"score": 5.0}} for cve in cves]
+            summary = cves
+        else:
+            details = {"licenses": {word: 1 for word in self.words(n)}}
+            summary = {"sure_licenses": self.words(2)}
+        return self.analysis(name, release, details, summary)
+
+    def package_analysis(self, name, package):
+        """Return the package analysis of the selected type."""
+        release = Checker.release_string(self.ecosystem, package)
+        n = self.payload
+        if name == "github_details":
+            details = {"forks_count": n, "stargazers_count": 10 * n,
+                       "topics": self.words(n)}
+        elif name == "keywords_tagging":
+            details = {"package_name": self.words(n),
+                       "repository_description": self.words(n)}
+        elif name == "libraries_io":
+            details = {"releases": [{"number": "1.%d" % i, "published_at": self.timestamp()}
+                                    for i in range(n)]}
+        else:
+            details = {"master": {"commits": [{"id": "%040x" % self.rng.getrandbits(160)}
+                                              for _ in range(n)]}}
+        return self.analysis(name, release, details, {})
+
+    def core_data(self, package, version):
+        """Return the core data of the package version."""
+        return {"analyses": COMPONENT_ANALYSES, "audit": None, "dependents_count": -1,
+                "ecosystem": self.ecosystem, "finished_at": self.timestamp(), "id": 1,
+                "latest_version": "1.%d.0" % (self.versions - 1), "package": package,
+                "package_info": {"dependents_count": -1, "relative_usage": "not used"},
+                "started_at": self.timestamp(), "subtasks": None, "version": version}
+
+    def core_package_data(self):
+        """Return the core package data."""
+        return {"id": 1, "package_id": 1, "started_at": self.timestamp(),
+                "finished_at": self.timestamp()}
+
+    def inject_defect(self, analysis, document):
+        """Break the document so it fails its check, return the defect and the content."""
+        defect = self.rng.choice(DEFECTS)
+        if defect == "missing_attribute":
+            # attributes checked for all objects of the given type
+            del document["package_id" if analysis == "core_json" else
+                         "id" if analysis == CORE_ANALYSIS else "status"]
+        elif defect == "broken_timestamp":
+            node = document if analysis == CORE_ANALYSIS else document.get("_audit")
+            if node is None:
+                # core package data has no checked timestamp
+                defect = "truncated"
+            else:
+                node["started_at"] = "2017-13-45T25:61:00"
+        elif defect == "null_details":
+            if analysis in DETAILS_CHECKED:
+                document["details"] = None
+            else:
+                defect = "truncated"
+        content = json.dumps(document).encode("utf-8")
+        if defect == "truncated":
+            content = content[:len(content) // 2]
+        return defect, content
+
+    def objects(self):
+        """Generate bucket, key, analysis, content, and the defect (None) for all objects."""
+        for p in range(self.packages):
+            package = "package-%06d" % p
+            for name in ["core_json"] + PACKAGE_ANALYSES:
+                if name == "core_json":
+                    key = S3Interface.package_key(self.ecosystem, package)
+                    document = self.core_package_data()
+                else:
+                    key = S3Interface.package_analysis_key(self.ecosystem, package, name)
+                    document = self.package_analysis(name, package)
+                yield self.make_object(CorePackageChecker.BUCKET_NAME, key,
+                                       CORE_ANALYSIS if name == "core_json" else name,
+                                       name, document)
+            for v in range(self.versions):
+                version = "1.%d.0" % v
+                key = S3Interface.component_key(self.ecosystem, package, version)
+                yield self.make_object(ComponentVersionsChecker.BUCKET_NAME, key, CORE_ANALYSIS,
+                                       CORE_ANALYSIS, self.core_data(package, version))
+                for name in COMPONENT_ANALYSES:
+                    key = S3Interface.component_analysis_key(self.ecosystem, package, version,
+                                                             name)
+                    yield self.make_object(ComponentVersionsChecker.BUCKET_NAME, key, name,
+                                           name, self.component_analysis(name, package,
+                                                                         version))
+
+    def make_object(self, bucket_name, key, analysis, document_type, document):
+        """Serialize the document, inject the defect into the selected fraction of objects."""
+        if self.rng.random() < self.defect_rate:
+            defect, content = self.inject_defect(document_type, document)
+        else:
+            defect, content = None, json.dumps(document).encode("utf-8")
+        return bucket_name, key, analysis, content, defect
+
+    def write(self, directory, deployment_prefix=DEFAULT_DEPLOYMENT_PREFIX):
+        """Write the corpus into the directory (one subdirectory per bucket), return manifest."""
+        manifest = {"settings": self.settings(), "deployment_prefix": deployment_prefix,
+                    "objects": 0, "bytes": 0,
+                    "defects": {CorePackageChecker.BUCKET_NAME: {},
+                                ComponentVersionsChecker.BUCKET_NAME: {}}}
+        # the bucket with manifests is not checked, but it is expected to exist
+        os.makedirs(os.path.join(directory, "{p}-{b}".format(p=deployment_prefix,
+                                                             b=MANIFESTS_BUCKET)),
+                    exist_ok=True)
+        for bucket_name, key, analysis, content, defect in self.objects():
+            filename = os.path.join(directory, "{p}-{b}".format(p=deployment_prefix,
+                                                                b=bucket_name), key)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with open(filename, "wb") as fout:
+                fout.write(content)
+            manifest["objects"] += 1
+            manifest["bytes"] += len(content)
+            if defect is not None:
+                defects = manifest["defects"][bucket_name]
+                defects[analysis] = defects.get(analysis, 0) + 1
+        with open(os.path.join(directory, MANIFEST), "w") as fout:
+            json.dump(manifest, fout, indent=4)
+        logging.info("{n} objects ({b} bytes) written into {d}".format(
+            n=manifest["objects"], b=manifest["bytes"], d=directory))
+        return manifest
+
+
+def read_manifest(directory):
+    """Read the manifest of the corpus, None is returned when there's no corpus."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as fin:
+            return json.load(fin)
+    except FileNotFoundError:
+        return None
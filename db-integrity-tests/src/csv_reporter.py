@@ -1,21 +1,44 @@
 """CSV reporter for package metadata and statuses."""
 
 import csv
+import os
 
 
 class CSVReporter:
     """CSV reporter for package metadata and statuses."""
 
-    def __init__(self, filename):
-        """Initialize the class, register the filename to be generated."""
+    def __init__(self, filename, resume_offset=None):
+        """Initialize the class, register the filename to be generated.
+
+        When the resume offset is given, the existing report is truncated to this size
+        and new rows are appended to it.
+        """
         self.filename = filename
+        self.resume_offset = resume_offset
+
+    @property
+    def resumed(self):
+        """Check if rows are appended to the existing report (the header is there)."""
+        return self.resume_offset is not None
 
     def __enter__(self):
         """Initialize the CSV writer."""
-        self.fout = open(self.filename, "w")
+        if self.resumed:
+            self.fout = open(self.filename, "r+")
+            # rows written after the last checkpoint are written again
+            self.fout.truncate(self.resume_offset)
+            self.fout.seek(self.resume_offset)
+        else:
+            self.fout = open(self.filename, "w")
         self.writer = csv.writer(self.fout)
         return self
 
+    def durable_size(self):
+        """Write all rows to the disk and return the size of the report."""
+        self.fout.flush()
+        os.fsync(self.fout.fileno())
+        return self.fout.tell()
+
     def __exit__(self, _type, _value, _traceback):
         """Close the CSV writer."""
         if self.fout:
@@ -51,3 +74,59 @@ class CSVReporter:
                               core_data, code_metrics, dependency_snapshot, digests,
                               keywords_tagging, metadata, security_issues, source_licenses,
                               leftovers])
+
+    def csv_header_for_graph_consistency(self):
+        """Write the header row."""
+        self.writer.writerow(["Ecosystem", "Package", "In graph?", "Versions in S3",
+                              "Versions in graph", "Missing in graph", "Only in graph",
+                              "Stale in graph", "Graph lookup"])
+
+    def graph_consistency_info(self, ecosystem, package_name, in_graph, s3_versions,
+                               graph_versions, missing_versions, unexpected_versions,
+                               stale_versions, graph_lookup):
+        """Write the record with comparison of package data in S3 and in the graph."""
+        self.writer.writerow([ecosystem, package_name, in_graph, s3_versions, graph_versions,
+                              missing_versions, unexpected_versions, stale_versions,
+                              graph_lookup])
+
+    def csv_header_for_sample(self):
+        """Write the header row."""
+        self.writer.writerow(["Ecosystem", "Bucket", "Analysis", "Objects", "Sampled", "OK",
+                              "Failed", "N/A", "Failure rate", "Lower bound", "Upper bound",
+                              "Estimated failures"])
+
+    def sample_info(self, ecosystem, bucket, analysis, objects, sampled, ok, failed,
+                    not_available, failure_rate, lower_bound, upper_bound, estimated_failures):
+        """Write the record with failure rate of one analysis type estimated from the sample."""
+        self.writer.writerow([ecosystem, bucket, analysis, objects, sampled, ok, failed,
+                              not_available, failure_rate, lower_bound, upper_bound,
+                              estimated_failures])
+
+    def csv_header_for_sample_failures(self):
+        """Write the header row."""
+        self.writer.writerow(["Ecosystem", "Bucket", "Analysis", "Package", "Version",
+                              "Verdict"])
+
+    def sample_failure_info(self, ecosystem, bucket, analysis, package_name, version, verdict):
+        """Write the record with the sampled object that did not pass the check."""
+        self.writer.writerow([ecosystem, bucket, analysis, package_name, version, verdict])
+
+    def csv_header_for_census(self):
+        """Write the header row."""
+        self.writer.writerow(["Ecosystem", "Bucket", "Analysis", "Schema name",
+                              "Schema version", "Objects", "Bytes", "Empty", "Missing",
+                              "Wrong release"])
+
+    def census_info(self, ecosystem, bucket, analysis, schema_name, schema_version, objects,
+                    size, empty, missing, wrong_release):
+        """Write the record with number of objects of one analysis type (and schema)."""
+        self.writer.writerow([ecosystem, bucket, analysis, schema_name, schema_version, objects,
+                              size, empty, missing, wrong_release])
+
+    def csv_header_for_census_problems(self):
+        """Write the header row."""
+        self.writer.writerow(["Ecosystem", "Bucket", "Key", "Problem"])
+
+    def census_problem_info(self, ecosystem, bucket, key, problem):
+        """Write the record with the problem found for the object."""
+        self.writer.writerow([ecosystem, bucket, key, problem])
@@ -1 +1,143 @@
-"""Class to check attributes read from the graph database."""
+"""Class to check attributes read from the graph database.
+
+All packages and versions found in S3 (in the key index of core-data bucket) are compared
+with the graph database. Packages are looked up in batches with one within(...) query for
+package vertexes and one for version vertexes per batch, so the number of requests does not
+grow with the number of packages linearly. Each request has a timeout and a bounded number
+of requests are sent concurrently, so the whole cross-check finishes in bounded time.
+"""
+
+import logging
+
+from component_versions_checker import ComponentVersionsChecker
+from gremlin_query import GremlinQuery
+from pipeline import ordered_map
+from s3interface import S3Interface
+
+# number of package names used in one within(...) lookup
+DEFAULT_BATCH_SIZE = 200
+
+# timeout for one request to the Gremlin, in seconds
+DEFAULT_TIMEOUT = 60
+
+# the graph is updated after analyses are stored into S3, so some delay is expected
+DEFAULT_MAX_DELAY = 24 * 60 * 60
+
+
+def first_value(properties, name):
+    """Return the first value of the property from the valueMap() result, None if missing."""
+    values = properties.get(name)
+    if not values:
+        return None
+    return values[0]
+
+
+class GremlinChecker:
+    """Cross-consistency checker of packages and versions stored in S3 and in the graph."""
+
+    def __init__(self, gremlin_interface, ecosystem, package_index,
+                 batch_size=DEFAULT_BATCH_SIZE, timeout=DEFAULT_TIMEOUT,
+                 max_delay=DEFAULT_MAX_DELAY):
+        """Initialize the checker for the ecosystem, packages are read from the key index."""
+        self.gremlin_interface = gremlin_interface
+        self.ecosystem = ecosystem
+        self.package_index = package_index
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.max_delay = max_delay
+
+    def versions_in_s3(self, package_name):
+        """Return versions stored in S3 with the last modification time of their core data."""
+        keys = self.package_index.keys_for_package(package_name)
+        versions = ComponentVersionsChecker.get_directories(keys) | \
+            ComponentVersionsChecker.get_version_jsons(keys)
+        result = {}
+        for version in versions:
+            key = S3Interface.component_key(self.ecosystem, package_name, version)
+            last_modified = None
+            if key in self.package_index:
+                last_modified = self.package_index.metadata(key)[2]
+            result[version] = last_modified
+        return result
+
+    def read_packages_from_graph(self, package_names):
+        """Return set of packages from the batch that are stored in the graph."""
+        query = GremlinQuery().has("ecosystem", self.ecosystem).has_within(
+            "name", package_names).valueMap("name")
+        data = self.gremlin_interface.read_data(query, self.timeout)
+        return {first_value(properties, "name") for properties in data}
+
+    def read_versions_from_graph(self, package_names):
+        """Return versions (with last_updated timestamps) of packages from the batch."""
+        query = GremlinQuery().has("pecosystem", self.ecosystem).has_within(
+            "pname", package_names).valueMap("pname", "version", "last_updated")
+        data = self.gremlin_interface.read_data(query, self.timeout)
+        versions = {}
+        for properties in data:
+            package_name = first_value(properties, "pname")
+            version = first_value(properties, "version")
+            # such vertex can't be compared with S3
+            if package_name is None or version is None:
+                logging.warning("Version vertex without pname or version in the graph: "
+                                "{p}".format(p=properties))
+                continue
+            versions.setdefault(package_name, {})[version] = first_value(properties,
+                                                                         "last_updated")
+        return versions
+
+    def is_stale(self, last_updated, last_modified):
+        """Check if the version in graph has not been updated after the analysis in S3."""
+        if last_modified is None:
+            return False
+        if last_updated is None:
+            return True
+        return float(last_updated) + self.max_delay < last_modified.timestamp()
+
+    def check_package(self, package_name, in_graph, graph_versions):
+        """Compare one package stored in S3 with the graph, return values for the CSV report."""
+        s3_versions = self.versions_in_s3(package_name)
+        missing_versions = sorted(set(s3_versions) - set(graph_versions))
+        unexpected_versions = sorted(set(graph_versions) - set(s3_versions))
+        stale_versions = sorted(version for version in set(s3_versions) & set(graph_versions)
+                                if self.is_stale(graph_versions[version],
+                                                 s3_versions[version]))
+        return (self.ecosystem, package_name, int(in_graph), len(s3_versions),
+                len(graph_versions), " ".join(missing_versions), " ".join(unexpected_versions),
+                " ".join(stale_versions), "OK")
+
+    def error_row(self, package_name, error, s3_versions="N/A"):
+        """Return the row for the package that can't be compared with the graph."""
+        return (self.ecosystem, package_name, "N/A", s3_versions, "N/A", "", "", "", str(error))
+
+    def check_package_or_error(self, package_name, in_graph, graph_versions):
+        """Compare one package with the graph, the failure is reported in its row only."""
+        try:
+            return self.check_package(package_name, in_graph, graph_versions)
+        except Exception as e:
+            logging.error("Comparison of package {p} failed: {e}".format(p=package_name, e=e))
+            return self.error_row(package_name, e)
+
+    def check_batch(self, package_names):
+        """Compare the batch of packages with the graph, return rows for the CSV report."""
+        try:
+            packages = self.read_packages_from_graph(package_names)
+            versions = self.read_versions_from_graph(package_names)
+        except Exception as e:
+            # the whole batch can't be checked, but other batches can
+            logging.error("Gremlin lookup failed: {e}".format(e=e))
+            return [self.error_row(package_name, e, len(self.versions_in_s3(package_name)))
+                    for package_name in package_names]
+        return [self.check_package_or_error(package_name, package_name in packages,
+                                            versions.get(package_name, {}))
+                for package_name in package_names]
+
+    def batches(self):
+        """Split all packages stored in S3 into batches for within(...) lookups."""
+        package_names = self.package_index.packages()
+        for i in range(0, len(package_names), self.batch_size):
+            yield package_names[i:i + self.batch_size]
+
+    def check_packages(self, max_in_flight):
+        """Compare all packages with the graph, yield rows in the order of packages."""
+        for rows in ordered_map(self.check_batch, self.batches(), max_in_flight):
+            yield from rows
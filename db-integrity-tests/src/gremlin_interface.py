@@ -11,7 +11,20 @@ class GremlinInterface:
         """Initialize the Gremlin interface object."""
         self.configuration = gremlinConfiguration
 
-    def post_query(self, query):
+    def post_query(self, query, timeout=None):
         """Post the already constructed query to the Gremlin."""
         data = {"gremlin": str(query)}
-        return requests.post(self.configuration.url, json=data)
+        return requests.post(self.configuration.url, json=data, timeout=timeout)
+
+    def read_data(self, query, timeout=None):
+        """Post the query to the Gremlin and return data from the result node."""
+        response = self.post_query(query, timeout)
+        assert response.status_code == 200, \
+            "Gremlin responded with status code {c}".format(c=response.status_code)
+        data = response.json()
+        assert "result" in data and "data" in data["result"], \
+            "Unexpected Gremlin response: {d}".format(d=data)
+        # no vertexes found
+        if data["result"]["data"] is None:
+            return []
+        return data["result"]["data"]
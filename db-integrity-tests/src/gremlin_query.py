@@ -1,5 +1,7 @@
 """Simple wrapper over Gremlin language."""
 
+import json
+
 
 class GremlinQuery:
     """Simple wrapper over Gremlin language."""
@@ -13,14 +15,21 @@ class GremlinQuery:
         self.query += '.has("{name}", "{value}")'.format(name=name, value=value)
         return self
 
+    def has_within(self, name, values):
+        """Add a 'has' clause matching any of given values (one query for many vertexes)."""
+        self.query += '.has("{name}", within({values}))'.format(
+            name=name, values=", ".join(quote(value) for value in values))
+        return self
+
     def out(self, name):
         """Add an 'out' clause into the query."""
         self.query += '.out("{name}")'.format(name=name)
         return self
 
-    def valueMap(self):
-        """Append a clause to retrieve map of values to the query."""
-        self.query += '.valueMap()'
+    def valueMap(self, *names):
+        """Append a clause to retrieve map of values (all or the selected ones) to the query."""
+        self.query += '.valueMap({names})'.format(names=", ".join(quote(name)
+                                                                  for name in names))
         return self
 
     def count(self):
@@ -45,3 +54,8 @@ class GremlinQuery:
     def ___str___(self):
         """Return an informal represenation of the object, same as __repr__ here."""
         return self.query
+
+
+def quote(value):
+    """Quote the string value, the $ character would be interpolated in Groovy string."""
+    return json.dumps(value).replace("$", "\\$")
@@ -0,0 +1,298 @@
+"""Streaming reader of selected top-level fields from JSON objects stored in S3.
+
+Only values of the requested top-level fields are parsed. Objects, arrays, and strings
+in other fields are skipped without being decoded; the reader remembers just their type
+and whether they are empty. Scalars (numbers, true, false, null) are tiny, so they are
+always parsed. The document is read in chunks, so neither the whole byte stream nor its
+decoded form needs to be held in memory at once. The size of the read data is limited.
+
+Fields can also be extracted from a part of the document read by a ranged GET: leading
+fields from the beginning of the document, and trailing fields from its end.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_MAX_OBJECT_SIZE = 50 * 1024 * 1024
+
+WHITESPACE = re.compile(rb"[ \t\r\n]*")
+STRING_SPECIAL = re.compile(rb'["\\]')
+STRUCTURAL = re.compile(rb'["\[\]{}]')
+SCALAR_END = re.compile(rb"[,\]} \t\r\n]")
+WHITESPACE_TEXT = re.compile(r"[ \t\r\n]*")
+
+KINDS = {ord("{"): "object", ord("["): "array", ord('"'): "string"}
+
+
+class ObjectTooLarge(Exception):
+    """Exception raised when the object exceeds the size limit."""
+
+    def __init__(self, key, size, limit):
+        """Construct the exception with clear message."""
+        super().__init__("Object {k} is too large: {s} bytes (limit {l} bytes)".format(
+            k=key, s=size, l=limit))
+        self.key = key
+        self.size = size
+        self.limit = limit
+
+
+class TruncatedDocument(ValueError):
+    """Exception raised when the stream ends before the end of the JSON document."""
+
+    pass
+
+
+class SkippedValue:
+    """Placeholder for the value of the field that was not requested (not parsed)."""
+
+    def __init__(self, kind, empty):
+        """Remember the type of skipped value (object, array, string) and emptiness."""
+        self.kind = kind
+        self.empty = empty
+
+    def __bool__(self):
+        """Skipped value is true when it is not empty, like the parsed value would be."""
+        return not self.empty
+
+    def __len__(self):
+        """Return zero for empty value, only the emptiness is known for other values."""
+        return 0 if self.empty else 1
+
+    def __repr__(self):
+        """Return textual representation of the skipped value."""
+        return "SkippedValue({k}, empty={e})".format(k=self.kind, e=self.empty)
+
+
+class StreamScanner:
+    """Scanner of JSON document read from the stream in chunks."""
+
+    def __init__(self, stream, key, max_size=DEFAULT_MAX_OBJECT_SIZE, chunk_size=CHUNK_SIZE):
+        """Initialize the scanner for stream with read(size) method."""
+        self.stream = stream
+        self.key = key
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.pos = 0
+        self.size = 0
+        # pieces of the value that is being captured
+        self.captured = None
+        self.capture_start = 0
+
+    def refill(self):
+        """Read the next chunk, all data in the current one has to be consumed."""
+        if self.captured is not None:
+            self.captured.append(self.buffer[self.capture_start:])
+            self.capture_start = 0
+        self.buffer = self.stream.read(self.chunk_size)
+        self.pos = 0
+        if not self.buffer:
+            raise TruncatedDocument("Unexpected end of JSON document {k}".format(k=self.key))
+        self.size += len(self.buffer)
+        if self.size > self.max_size:
+            raise ObjectTooLarge(self.key, self.size, self.max_size)
+
+    def peek(self):
+        """Return the next byte without consuming it."""
+        if self.pos >= len(self.buffer):
+            self.refill()
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        """Consume the next byte, that needs to be the given one."""
+        actual = self.peek()
+        if actual != ord(char):
+            raise ValueError("Expected '{e}', found '{a}' in JSON document {k}".format(
+                e=char, a=chr(actual), k=self.key))
+        self.pos += 1
+
+    def skip_whitespaces(self):
+        """Skip all whitespace characters."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return
+            self.refill()
+
+    def scan_string(self):
+        """Scan the string, opening quote is already consumed."""
+        while True:
+            match = STRING_SPECIAL.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                self.refill()
+                continue
+            self.pos = match.end()
+            if match.group() == b'"':
+                return
+            # escaped character, possibly in the next chunk
+            self.peek()
+            self.pos += 1
+
+    def scan_container(self):
+        """Scan the object or array, opening bracket is already consumed."""
+        depth = 1
+        while True:
+            match = STRUCTURAL.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                self.refill()
+                continue
+            self.pos = match.end()
+            char = match.group()
+            if char == b'"':
+                self.scan_string()
+            elif char in (b"{", b"["):
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def scan_scalar(self):
+        """Scan number, true, false, or null."""
+        while True:
+            match = SCALAR_END.search(self.buffer, self.pos)
+            if match is not None:
+                self.pos = match.start()
+                return
+            self.pos = len(self.buffer)
+            self.refill()
+
+    def scan_value(self, capture):
+        """Scan one value, return the raw bytes (when captured) and SkippedValue.
+
+        Scalars are always captured, because their value decides whether they are empty.
+        """
+        self.skip_whitespaces()
+        first = self.peek()
+        kind = KINDS.get(first, "scalar")
+        capture = capture or kind == "scalar"
+        if capture:
+            self.captured = []
+            self.capture_start = self.pos
+
+        empty = False
+        self.pos += 1
+        if kind in ("object", "array"):
+            self.skip_whitespaces()
+            if self.peek() == (ord("}") if kind == "object" else ord("]")):
+                self.pos += 1
+                empty = True
+            else:
+                self.scan_container()
+        elif kind == "string":
+            empty = self.peek() == ord('"')
+            self.scan_string()
+        else:
+            self.scan_scalar()
+
+        raw = None
+        if capture:
+            self.captured.append(self.buffer[self.capture_start:self.pos])
+            raw = b"".join(self.captured)
+            self.captured = None
+        return raw, SkippedValue(kind, empty)
+
+
+def iterate_fields(scanner, fields):
+    """Yield names and values of all top-level fields, only selected fields are parsed."""
+    scanner.skip_whitespaces()
+    scanner.expect("{")
+
+    scanner.skip_whitespaces()
+    if scanner.peek() == ord("}"):
+        return
+
+    while True:
+        raw_name, _ = scanner.scan_value(capture=True)
+        name = json.loads(raw_name)
+        scanner.skip_whitespaces()
+        scanner.expect(":")
+        raw_value, skipped = scanner.scan_value(capture=name in fields)
+        yield name, json.loads(raw_value) if raw_value is not None else skipped
+
+        scanner.skip_whitespaces()
+        if scanner.peek() == ord("}"):
+            return
+        scanner.expect(",")
+
+
+def read_fields(stream, key, fields, max_size=DEFAULT_MAX_OBJECT_SIZE):
+    """Read the JSON object from the stream, parse only values of the selected fields.
+
+    All top-level fields are present in the returned dictionary, values of fields that
+    were not selected are replaced by SkippedValue instances.
+    """
+    return dict(iterate_fields(StreamScanner(stream, key, max_size), fields))
+
+
+def read_leading_fields(stream, key, fields, max_size=DEFAULT_MAX_OBJECT_SIZE):
+    """Parse selected fields from the beginning of the JSON object that may be truncated.
+
+    Reading stops once all selected fields are parsed. Return dictionary with the selected
+    fields found and the flag whether the stream ended before the end of the document.
+    """
+    result = {}
+    try:
+        for name, value in iterate_fields(StreamScanner(stream, key, max_size), fields):
+            if name in fields:
+                result[name] = value
+                if len(result) == len(fields):
+                    break
+    except TruncatedDocument:
+        return result, True
+    return result, False
+
+
+def parse_members(text, pos, decoder):
+    """Parse members of the object from the position to the end of the text.
+
+    Return the dictionary with all members, or None when the text from the position is
+    not a list of members closed by the last bracket of the document.
+    """
+    members = {}
+    try:
+        while True:
+            name, pos = decoder.raw_decode(text, pos)
+            pos = WHITESPACE_TEXT.match(text, pos).end()
+            if not isinstance(name, str) or text[pos] != ":":
+                return None
+            pos = WHITESPACE_TEXT.match(text, pos + 1).end()
+            members[name], pos = decoder.raw_decode(text, pos)
+            pos = WHITESPACE_TEXT.match(text, pos).end()
+            if text[pos] == "}":
+                # nested objects are followed by the rest of the document
+                return members if not text[pos + 1:].strip() else None
+            if text[pos] != ",":
+                return None
+            pos = WHITESPACE_TEXT.match(text, pos + 1).end()
+    except (ValueError, IndexError):
+        return None
+
+
+def read_trailing_fields(tail, fields):
+    """Parse selected top-level fields from the end of the JSON object.
+
+    The tail is the end of the document, its beginning is usually cut in the middle of
+    some value. Each occurrence of the field name that starts a member is tried from the
+    end; it is a top-level member when the rest of the tail is a list of members closed by
+    the last bracket. The document needs to be well-formed, the tail of a truncated
+    document can't be told apart from the tail of a nested object. Return dictionary with
+    the selected fields found in the tail.
+    """
+    # the tail might start in the middle of a multi-byte character
+    text = tail.decode("utf-8", "replace")
+    decoder = json.JSONDecoder()
+    result = {}
+    for field in fields:
+        name = re.compile(re.escape(json.dumps(field)) + r"\s*:")
+        for match in reversed(list(name.finditer(text))):
+            if not text[:match.start()].rstrip().endswith((",", "{")):
+                continue
+            members = parse_members(text, match.start(), decoder)
+            if members is not None:
+                result[field] = members[field]
+                break
+    return result
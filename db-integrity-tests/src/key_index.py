@@ -0,0 +1,87 @@
+"""Index of all keys stored in the bucket for one ecosystem.
+
+The index is built by one paginated sweep over all objects with the "ecosystem/" prefix.
+Presence checks, lists of package metadata, and leftover checks are then answered from
+the index, so objects are read (GET) only when they really exist.
+"""
+
+import logging
+
+from botocore.exceptions import ClientError
+
+from merge_join import listing_order
+
+
+class KeyIndex:
+    """Index of all keys stored in the bucket for one ecosystem."""
+
+    def __init__(self, bucket_name, ecosystem, shard=None):
+        """Initialize an empty index for the bucket and ecosystem.
+
+        When the shard is specified, only keys of packages from the shard are indexed.
+        """
+        self.bucket_name = bucket_name
+        self.ecosystem = ecosystem
+        self.shard = shard
+        self.prefix = ecosystem + "/"
+        # key -> (etag, size, last modified)
+        self.objects = {}
+        # package name -> list of keys relative to the package directory
+        self.package_keys = {}
+
+    @staticmethod
+    def build(s3interface, bucket_name, ecosystem, shard=None):
+        """Read all keys stored for the ecosystem in the bucket and build the index."""
+        index = KeyIndex(bucket_name, ecosystem, shard)
+        for o in s3interface.iterate_objects(bucket_name, index.prefix):
+            index.add(o["Key"], o.get("ETag"), o.get("Size"), o.get("LastModified"))
+        logging.info("{n} keys indexed in the bucket {b} for the ecosystem {e}{s}".format(
+            n=len(index), b=bucket_name, e=ecosystem,
+            s="" if shard is None else " (shard {s})".format(s=shard)))
+        return index
+
+    def add(self, key, etag=None, size=None, last_modified=None):
+        """Add one key into the index, keys of packages from other shards are ignored."""
+        relative_key = key[len(self.prefix):]
+        slash = relative_key.find("/")
+        # keys like "ecosystem/package.json" are not stored in the package directory
+        if slash != -1:
+            package = relative_key[:slash]
+        else:
+            package = relative_key[:-len(".json")]
+        if self.shard is not None and package not in self.shard:
+            return
+
+        self.objects[key] = (etag, size, last_modified)
+        if slash != -1:
+            self.package_keys.setdefault(package, []).append(relative_key[slash + 1:])
+
+    def __contains__(self, key):
+        """Check if the key exists in the bucket."""
+        return key in self.objects
+
+    def __len__(self):
+        """Return number of indexed keys."""
+        return len(self.objects)
+
+    def metadata(self, key):
+        """Return ETag, size, and last modification time of the object."""
+        return self.objects[key]
+
+    def packages(self):
+        """Return list of all packages that have its own directory in the bucket.
+
+        Packages are sorted in the same order as directories are listed by S3.
+        """
+        return sorted(self.package_keys.keys(), key=listing_order)
+
+    def keys_for_package(self, package):
+        """Return sorted list of keys stored in the package directory (relative to it)."""
+        return sorted(self.package_keys.get(package, []))
+
+    def no_such_key(self, key):
+        """Construct the same exception as raised by S3 for a missing object."""
+        return ClientError({"Error": {"Code": "NoSuchKey",
+                                      "Message": "The key {k} is not in the bucket {b}".format(
+                                          k=key, b=self.bucket_name)}},
+                           "GetObject")
@@ -0,0 +1,146 @@
+"""Filesystem-backed stand-in for the AWS S3, used to run the integrity checks offline.
+
+Each bucket is a directory named by the full bucket name (with the deployment prefix) and
+each object is a file stored under its key. Objects are listed in the same (lexicographic)
+order as by S3 and missing objects raise the same ClientError. The ETag is derived from
+the modification time and size of the file, so listing does not need to read the files.
+Numbers of GET requests (including ranged ones) and read bytes are counted for the benchmark.
+"""
+
+import datetime
+import io
+import os
+import threading
+
+from botocore.exceptions import ClientError
+
+from json_stream import ObjectTooLarge, DEFAULT_MAX_OBJECT_SIZE
+from merge_join import listing_order
+from s3interface import S3Interface
+
+
+class LocalS3Interface(S3Interface):
+    """Interface to buckets stored in the local directory, with the same API as S3Interface."""
+
+    def __init__(self, directory, deployment_prefix):
+        """Initialize the interface for buckets stored in the directory."""
+        self.directory = directory
+        self._deployment_prefix = deployment_prefix
+        self.max_object_size = DEFAULT_MAX_OBJECT_SIZE
+        # local files are not throttled
+        self.concurrency = None
+        # objects are read by more threads
+        self._lock = threading.Lock()
+        self.get_requests = 0
+        self.bytes_read = 0
+
+    @property
+    def deployment_prefix(self):
+        """Get the deployment prefix used in the names of bucket directories."""
+        return self._deployment_prefix
+
+    def connect(self, max_pool_connections=None, connect_timeout=None, read_timeout=None,
+                max_attempts=None):
+        """Do nothing, no connection is needed."""
+        pass
+
+    def bucket_directory(self, bucket_name):
+        """Return the directory with all objects stored in the bucket."""
+        return os.path.join(self.directory, self.full_bucket_name(bucket_name))
+
+    def read_bucket_names(self):
+        """Read names of all buckets (directories) in the local storage."""
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isdir(os.path.join(self.directory, name)))
+
+    def does_bucket_exist(self, bucket_name):
+        """Check if the given bucket exists in the local storage."""
+        return os.path.isdir(self.bucket_directory(bucket_name))
+
+    @staticmethod
+    def no_such_key():
+        """Construct the same exception as raised by S3 for a missing object."""
+        return ClientError({"Error": {"Code": "NoSuchKey",
+                                      "Message": "The specified key does not exist."}},
+                           "GetObject")
+
+    def get_object(self, bucket_name, key):
+        """Read the object into memory, ObjectTooLarge is raised for large objects."""
+        filename = os.path.join(self.bucket_directory(bucket_name), key)
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            raise self.no_such_key()
+        if size > self.max_object_size:
+            raise ObjectTooLarge(key, size, self.max_object_size)
+        with open(filename, "rb") as fin:
+            content = fin.read()
+        with self._lock:
+            self.get_requests += 1
+            self.bytes_read += len(content)
+        return {"Body": io.BytesIO(content), "ContentLength": len(content)}
+
+    def read_object_size(self, bucket_name, key):
+        """Return size of the file, None if it does not exist."""
+        try:
+            return os.path.getsize(os.path.join(self.bucket_directory(bucket_name), key))
+        except OSError:
+            return None
+
+    def read_object_range(self, bucket_name, key, start, end=None):
+        """Read bytes start:end of the file, return them and the file size."""
+        filename = os.path.join(self.bucket_directory(bucket_name), key)
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            raise self.no_such_key()
+        start, end, _ = slice(start, end).indices(size)
+        with open(filename, "rb") as fin:
+            fin.seek(start)
+            content = fin.read(max(0, end - start))
+        with self._lock:
+            self.get_requests += 1
+            self.bytes_read += len(content)
+        return content, size
+
+    def read_object_metadata(self, bucket_name, key, attribute):
+        """Return the attribute of the GET response."""
+        return self.get_object(bucket_name, key)[attribute]
+
+    def iterate_objects(self, bucket_name, prefix):
+        """Yield all objects (Key, ETag, Size, LastModified) with the given prefix."""
+        bucket_directory = self.bucket_directory(bucket_name)
+        # only the directory that can contain keys with the prefix is walked
+        top = os.path.join(bucket_directory, prefix[:prefix.rfind("/") + 1])
+        objects = []
+        for directory, _, filenames in os.walk(top):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                key = os.path.relpath(path, bucket_directory).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    objects.append((key, os.stat(path)))
+        # S3 returns keys in lexicographic order
+        objects.sort()
+        for key, stat in objects:
+            yield {"Key": key,
+                   "ETag": '"{m:x}-{s:x}"'.format(m=stat.st_mtime_ns, s=stat.st_size),
+                   "Size": stat.st_size,
+                   "LastModified": datetime.datetime.fromtimestamp(stat.st_mtime,
+                                                                   datetime.timezone.utc)}
+
+    def read_ecosystems_from_bucket(self, bucket_name):
+        """Return list of all ecosystems (top-level directories) from selected bucket."""
+        bucket_directory = self.bucket_directory(bucket_name)
+        return sorted(name for name in os.listdir(bucket_directory)
+                      if os.path.isdir(os.path.join(bucket_directory, name)))
+
+    def iterate_packages_from_bucket_for_ecosystem(self, ecosystem, bucket_name):
+        """Yield all packages (directories) found for the selected ecosystem."""
+        ecosystem_directory = os.path.join(self.bucket_directory(bucket_name),
+                                           ecosystem.rstrip("/"))
+        if not os.path.isdir(ecosystem_directory):
+            return
+        # directories are listed by S3 in the order of their prefixes
+        yield from sorted((name for name in os.listdir(ecosystem_directory)
+                           if os.path.isdir(os.path.join(ecosystem_directory, name))),
+                          key=listing_order)
@@ -1,17 +1,35 @@
 """The main module of the database integrity tests."""
 
+import os
+import random
 import sys
+import time
 
 from s3interface import S3Interface
 from s3configuration import S3Configuration
 from gremlin_configuration import GremlinConfiguration
 from gremlin_interface import GremlinInterface
 from cliargs import cli_parser
-from utils import store_list
+from utils import store_while_iterating
 # from utils import read_list  # needed to dummy read (to selfcheck)
 from csv_reporter import CSVReporter
 from core_package_checker import CorePackageChecker
 from component_versions_checker import ComponentVersionsChecker
+from pipeline import ordered_map, DEFAULT_MAX_IN_FLIGHT
+from key_index import KeyIndex
+from state_store import StateStore
+from validators import validation_stats
+from validation_pool import PrefetchedChecks, ValidationPool
+from gremlin_checker import GremlinChecker
+from sharding import report_filename, write_summary, merge_shards
+from checkpoint import Checkpoint
+from sampling import Sampler, DEFAULT_CONFIDENCE
+from local_s3 import LocalS3Interface
+from corpus import read_manifest, DEFAULT_DEPLOYMENT_PREFIX
+from s3_client import metrics as s3_metrics
+from concurrency import AdaptiveConcurrency
+from merge_join import merge_join
+from census import Census
 
 import logging
 
@@ -19,6 +37,18 @@ ECOSYSTEMS = [
     "pypi", "go", "maven", "npm", "nuget"
 ]
 
+# checking all ecosystems by one process is too slow, use sharding to check more of them
+DEFAULT_ECOSYSTEMS = ["pypi"]
+
+CORE_PACKAGES_REPORT = "s3_core_packages.csv"
+PACKAGE_VERSIONS_REPORT = "s3_package_versions.csv"
+CHECKPOINT = "s3_checkpoint.json"
+SAMPLE_REPORT = "s3_sample.csv"
+SAMPLE_FAILURES_REPORT = "s3_sample_failures.csv"
+S3_REQUESTS_REPORT = "s3_requests.csv"
+CENSUS_REPORT = "s3_{m}_census.csv"
+CENSUS_PROBLEMS_REPORT = "s3_{m}_census_problems.csv"
+
 
 def initial_checks(s3interface, gremlinInterface):
     """Perform initial checks of services + selftest."""
@@ -76,92 +106,414 @@ def check_ecosystems_in_s3(s3interface):
     check_ecosystems_in_bucket(found_ecosystems, "core_data")
 
 
-def check_packages_in_ecosystem(s3interface, csvReporter, ecosystem):
-    """Check all packages in selected ecosystem."""
-    core_packages = s3interface.read_core_packages_for_ecosystem(ecosystem)
-    packages = s3interface.read_packages_for_ecosystem(ecosystem)
-    store_list("s3_core_packages.txt", core_packages)
-    store_list("s3_packages.txt", packages)
+CORE_PACKAGE_CHECKS = ["check_core_json", "check_github_details", "check_keywords_tagging",
+                       "check_libraries_io", "check_git_stats"]
+
+COMPONENT_VERSION_CHECKS = ["check_core_data", "check_code_metrics",
+                            "check_dependency_snapshot", "check_digests",
+                            "check_keywords_tagging", "check_metadata",
+                            "check_security_issues", "check_source_licenses"]
+
+
+def prefetch_core_package(s3interface, ecosystem, package_name, in_core_packages, in_packages,
+                          core_package_index=None, state_store=None):
+    """Read objects for one package in selected ecosystem, checks are performed later."""
+    core_package_checker = CorePackageChecker(s3interface, ecosystem, package_name,
+                                              core_package_index, state_store)
+
+    row_prefix = (ecosystem, package_name, in_core_packages, in_packages)
+
+    if not in_core_packages:
+        return PrefetchedChecks(core_package_checker, CORE_PACKAGE_CHECKS, row_prefix, ("N/A",),
+                                {check_name: "N/A" for check_name in CORE_PACKAGE_CHECKS})
+
+    leftovers = core_package_checker.check_leftovers()
+    return PrefetchedChecks(core_package_checker, CORE_PACKAGE_CHECKS, row_prefix,
+                            (leftovers,)).read()
+
+
+def check_core_package(s3interface, ecosystem, package_name, in_core_packages, in_packages,
+                       core_package_index=None, state_store=None):
+    """Check one package in selected ecosystem, return values for the CSV report."""
+    core_package_checker = CorePackageChecker(s3interface, ecosystem, package_name,
+                                              core_package_index, state_store)
+
+    core_package_json = "N/A"
+    core_package_github_details = "N/A"
+    core_package_keywords_tagging = "N/A"
+    core_package_libraries_io = "N/A"
+    core_package_git_stats = "N/A"
+    core_package_leftovers = "N/A"
+
+    if in_core_packages:
+        core_package_json = core_package_checker.check_core_json()
+        core_package_github_details = core_package_checker.check_github_details()
+        core_package_keywords_tagging = core_package_checker.check_keywords_tagging()
+        core_package_libraries_io = core_package_checker.check_libraries_io()
+        core_package_git_stats = core_package_checker.check_git_stats()
+        core_package_leftovers = core_package_checker.check_leftovers()
+
+    return (ecosystem, package_name, in_core_packages, in_packages,
+            core_package_json, core_package_github_details,
+            core_package_keywords_tagging, core_package_libraries_io,
+            core_package_git_stats, core_package_leftovers)
+
+
+def check_packages_in_ecosystem(s3interface, csvReporter, ecosystem,
+                                max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                                core_package_index=None, package_index=None,
+                                state_store=None, validation_pool=None, shard=None,
+                                checkpoint=None):
+    """Check all packages in selected ecosystem.
+
+    When key indexes are provided, packages are read from them instead of listing the buckets.
+    Verdicts for objects that have not been changed are taken from the state store, if any.
+    With the validation pool, objects are only read by threads and checked by the pool.
+    Packages checked before the checkpoint are skipped, the progress is stored into it.
+    """
+    if core_package_index is not None:
+        core_packages = core_package_index.packages()
+    else:
+        core_packages = s3interface.iterate_core_packages_for_ecosystem(ecosystem)
+    if package_index is not None:
+        packages = package_index.packages()
+    else:
+        packages = s3interface.iterate_packages_for_ecosystem(ecosystem)
+    core_packages = store_while_iterating(report_filename("s3_core_packages.txt", shard),
+                                          core_packages)
+    packages = store_while_iterating(report_filename("s3_packages.txt", shard), packages)
 
     # dummy read
     # core_packages = read_list("s3_core_packages.txt")
     # packages = read_list("s3_packages.txt")
 
-    all_packages = list(set(core_packages) | set(packages))
-    all_packages.sort()
-    for package_name in all_packages:
-        core_package_checker = CorePackageChecker(s3interface, ecosystem, package_name)
-
-        in_core_packages = package_name in core_packages
-        in_packages = package_name in packages
-        core_package_json = "N/A"
-        core_package_github_details = "N/A"
-        core_package_keywords_tagging = "N/A"
-        core_package_libraries_io = "N/A"
-        core_package_git_stats = "N/A"
-        core_package_leftovers = "N/A"
-
-        if in_core_packages:
-            core_package_json = core_package_checker.check_core_json()
-            core_package_github_details = core_package_checker.check_github_details()
-            core_package_keywords_tagging = core_package_checker.check_keywords_tagging()
-            core_package_libraries_io = core_package_checker.check_libraries_io()
-            core_package_git_stats = core_package_checker.check_git_stats()
-            core_package_leftovers = core_package_checker.check_leftovers()
-
-        csvReporter.core_package_info(ecosystem, package_name, in_core_packages, in_packages,
-                                      core_package_json, core_package_github_details,
-                                      core_package_keywords_tagging, core_package_libraries_io,
-                                      core_package_git_stats, core_package_leftovers)
-
-
-def check_package_versions_in_ecosystem(s3interface, csvReporter, ecosystem):
-    """Check all package versions in selected ecosystem."""
-    packages = s3interface.read_packages_for_ecosystem(ecosystem)
+    # both listings are sorted, so they are joined in one pass without holding them in memory
+    all_packages = (joined for joined in merge_join(core_packages, packages)
+                    if (shard is None or joined[0] in shard) and
+                    (checkpoint is None or not checkpoint.is_checked(CORE_PACKAGES_REPORT,
+                                                                     ecosystem, joined[0])))
+
+    if validation_pool is None:
+        rows = ordered_map(lambda joined: check_core_package(s3interface, ecosystem, *joined,
+                                                             core_package_index, state_store),
+                           all_packages, max_in_flight)
+    else:
+        prefetched = ordered_map(lambda joined: prefetch_core_package(s3interface, ecosystem,
+                                                                      *joined,
+                                                                      core_package_index,
+                                                                      state_store),
+                                 all_packages, max_in_flight)
+        rows = validation_pool.rows(prefetched)
+    for row in rows:
+        if checkpoint is not None:
+            checkpoint.before_row(csvReporter, CORE_PACKAGES_REPORT, ecosystem, row[1])
+        csvReporter.core_package_info(*row)
+    if checkpoint is not None:
+        checkpoint.ecosystem_done(csvReporter)
+
+
+def read_package_versions(s3interface, ecosystem, package_name, package_index=None):
+    """Read list of all metadata for the package, return one task per package version."""
+    component_versions_checker = ComponentVersionsChecker(s3interface, ecosystem, package_name,
+                                                          package_index)
+    directories, version_jsons, versions, metadata_list = \
+        component_versions_checker.read_versions()
+    assert metadata_list
+
+    return [(package_name, version, directories, version_jsons, metadata_list)
+            for version in sorted(versions)]
+
+
+def component_versions_checker_for_task(s3interface, ecosystem, task, package_index=None,
+                                        state_store=None):
+    """Construct the checker for the package version, the checker holds the current version."""
+    package_name, version = task[:2]
+    component_versions_checker = ComponentVersionsChecker(s3interface, ecosystem, package_name,
+                                                          package_index, state_store)
+    component_versions_checker.version = version
+    return component_versions_checker
+
+
+def package_version_leftovers(component_versions_checker, task):
+    """Return base JSON and subdirectory presence, and leftovers for the package version."""
+    package_name, version, directories, version_jsons, metadata_list = task
+    base_json = version in version_jsons
+    subdir = version in directories
+    metadata_for_version = [m for m in metadata_list if m.startswith(version + "/")]
+    leftovers = component_versions_checker.check_leftovers(metadata_for_version)
+    return base_json, subdir, leftovers
+
+
+def prefetch_package_version(s3interface, ecosystem, task, package_index=None,
+                             state_store=None):
+    """Read objects for one package version, checks are performed later."""
+    package_name, version = task[:2]
+    # the checker holds the current version, so it can't be shared between threads
+    component_versions_checker = component_versions_checker_for_task(s3interface, ecosystem,
+                                                                     task, package_index,
+                                                                     state_store)
+    base_json, subdir, leftovers = package_version_leftovers(component_versions_checker, task)
+    return PrefetchedChecks(component_versions_checker, COMPONENT_VERSION_CHECKS,
+                            (ecosystem, package_name, version, base_json, subdir),
+                            (leftovers,)).read()
+
+
+def check_package_version(s3interface, ecosystem, task, package_index=None, state_store=None):
+    """Check one package version, return values for the CSV report."""
+    package_name, version = task[:2]
+    # the checker holds the current version, so it can't be shared between threads
+    component_versions_checker = component_versions_checker_for_task(s3interface, ecosystem,
+                                                                     task, package_index,
+                                                                     state_store)
+    verdicts = tuple(getattr(component_versions_checker, check_name)()
+                     for check_name in COMPONENT_VERSION_CHECKS)
+    base_json, subdir, leftovers = package_version_leftovers(component_versions_checker, task)
+    return (ecosystem, package_name, version, base_json, subdir) + verdicts + (leftovers,)
+
+
+def package_version_tasks(s3interface, ecosystem, packages, max_in_flight, package_index=None):
+    """Generate tasks for all package versions, metadata lists are read in parallel."""
+    if package_index is not None:
+        # no need to call S3 at all, the metadata lists are in the index
+        for package_name in packages:
+            yield from read_package_versions(s3interface, ecosystem, package_name, package_index)
+        return
+
+    tasks_for_packages = ordered_map(lambda package_name: read_package_versions(s3interface,
+                                                                                ecosystem,
+                                                                                package_name),
+                                     packages, max_in_flight)
+    for tasks in tasks_for_packages:
+        yield from tasks
+
+
+def check_package_versions_in_ecosystem(s3interface, csvReporter, ecosystem,
+                                        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                                        package_index=None, state_store=None,
+                                        validation_pool=None, shard=None, checkpoint=None):
+    """Check all package versions in selected ecosystem.
+
+    Listing of package metadata and checks of package versions run in parallel, but rows
+    are written into the CSV report in the same order as by sequential check. When the key
+    index is provided, metadata lists are taken from it and missing objects are not read.
+    Verdicts for objects that have not been changed are taken from the state store, if any.
+    With the validation pool, objects are only read by threads and checked by the pool.
+    Packages checked before the checkpoint are skipped, the progress is stored into it.
+    """
+    if package_index is not None:
+        packages = package_index.packages()
+    else:
+        packages = s3interface.iterate_packages_for_ecosystem(ecosystem)
+        # the index contains packages from the shard only, the listing contains all of them
+        if shard is not None:
+            packages = (package_name for package_name in packages if package_name in shard)
+    if checkpoint is not None:
+        packages = (package_name for package_name in packages
+                    if not checkpoint.is_checked(PACKAGE_VERSIONS_REPORT, ecosystem,
+                                                 package_name))
 
     # dummy read
     # core_packages = read_list("s3_core_packages.txt")
     # packages = read_list("s3_packages.txt")
 
-    for package_name in packages:
-        component_versions_checker = ComponentVersionsChecker(s3interface, ecosystem, package_name)
-        all_jsons = component_versions_checker.read_metadata_list()
-        assert all_jsons
-        directories, version_jsons, versions, metadata_list = \
-            component_versions_checker.read_versions()
-
-        for version in sorted(versions):
-            component_versions_checker.version = version
-            base_json = version in version_jsons
-            subdir = version in directories
-            metadata_for_version = [m for m in metadata_list if m.startswith(version + "/")]
-            core_data = component_versions_checker.check_core_data()
-            code_metrics = component_versions_checker.check_code_metrics()
-            dependency_snapshot = component_versions_checker.check_dependency_snapshot()
-            digests = component_versions_checker.check_digests()
-            keywords_tagging = component_versions_checker.check_keywords_tagging()
-            metadata = component_versions_checker.check_metadata()
-            security_issues = component_versions_checker.check_security_issues()
-            source_licenses = component_versions_checker.check_source_licenses()
-            leftovers = component_versions_checker.check_leftovers(metadata_for_version)
-            csvReporter.package_version_info(ecosystem, package_name, version, base_json, subdir,
-                                             core_data, code_metrics, dependency_snapshot, digests,
-                                             keywords_tagging, metadata, security_issues,
-                                             source_licenses, leftovers)
-
-
-def check_packages_in_s3(s3interface):
-    """Check all packages in all ecosystems."""
-    ECOSYSTEMS = ["pypi"]
-    with CSVReporter("s3_core_packages.csv") as csvReporter:
-        csvReporter.csv_header_for_core_packages()
-        for ecosystem in ECOSYSTEMS:
-            check_packages_in_ecosystem(s3interface, csvReporter, ecosystem)
-
-    with CSVReporter("s3_package_versions.csv") as csvReporter:
-        csvReporter.csv_header_for_package_version()
-        for ecosystem in ECOSYSTEMS:
-            check_package_versions_in_ecosystem(s3interface, csvReporter, ecosystem)
+    tasks = package_version_tasks(s3interface, ecosystem, packages, max_in_flight,
+                                  package_index)
+    if validation_pool is None:
+        rows = ordered_map(lambda task: check_package_version(s3interface, ecosystem, task,
+                                                              package_index, state_store),
+                           tasks, max_in_flight)
+    else:
+        prefetched = ordered_map(lambda task: prefetch_package_version(s3interface, ecosystem,
+                                                                       task, package_index,
+                                                                       state_store),
+                                 tasks, max_in_flight)
+        rows = validation_pool.rows(prefetched)
+    for row in rows:
+        if checkpoint is not None:
+            # the checkpoint is stored only after all versions of the package are written
+            checkpoint.before_row(csvReporter, PACKAGE_VERSIONS_REPORT, ecosystem, row[1])
+        csvReporter.package_version_info(*row)
+    if checkpoint is not None:
+        checkpoint.ecosystem_done(csvReporter)
+
+
+def open_report(report, shard=None, checkpoint=None):
+    """Open the report for writing, the partially written report is reopened when resuming."""
+    resume_offset = checkpoint.resume_offset(report) if checkpoint is not None else None
+    return CSVReporter(report_filename(report, shard), resume_offset)
+
+
+def check_packages_in_s3(s3interface, max_in_flight=DEFAULT_MAX_IN_FLIGHT, state_store=None,
+                         validation_pool=None, ecosystems=DEFAULT_ECOSYSTEMS, shard=None,
+                         checkpoint=None, key_index=True):
+    """Check all packages in selected ecosystems, return key indexes of core-data bucket.
+
+    When the shard is specified, only packages from the shard are checked. When the
+    checkpoint is specified, the scan continues after its position and it is updated
+    periodically. Without the key index, package listings of both buckets are joined
+    while they are being paginated, so the memory does not grow with the number of
+    packages, but objects of each package are listed separately; None is returned then.
+    """
+    # one listing of all keys per bucket and ecosystem
+    core_package_indexes = dict.fromkeys(ecosystems)
+    package_indexes = dict.fromkeys(ecosystems)
+    if key_index:
+        for ecosystem in ecosystems:
+            core_package_indexes[ecosystem] = KeyIndex.build(s3interface,
+                                                             CorePackageChecker.BUCKET_NAME,
+                                                             ecosystem, shard)
+            package_indexes[ecosystem] = KeyIndex.build(s3interface,
+                                                        ComponentVersionsChecker.BUCKET_NAME,
+                                                        ecosystem, shard)
+
+    if checkpoint is None or not checkpoint.is_completed(CORE_PACKAGES_REPORT):
+        with open_report(CORE_PACKAGES_REPORT, shard, checkpoint) as csvReporter:
+            if not csvReporter.resumed:
+                csvReporter.csv_header_for_core_packages()
+            for ecosystem in ecosystems:
+                check_packages_in_ecosystem(s3interface, csvReporter, ecosystem, max_in_flight,
+                                            core_package_indexes[ecosystem],
+                                            package_indexes[ecosystem], state_store,
+                                            validation_pool, shard, checkpoint)
+        if checkpoint is not None:
+            checkpoint.report_done(CORE_PACKAGES_REPORT)
+
+    if checkpoint is None or not checkpoint.is_completed(PACKAGE_VERSIONS_REPORT):
+        with open_report(PACKAGE_VERSIONS_REPORT, shard, checkpoint) as csvReporter:
+            if not csvReporter.resumed:
+                csvReporter.csv_header_for_package_version()
+            for ecosystem in ecosystems:
+                check_package_versions_in_ecosystem(s3interface, csvReporter, ecosystem,
+                                                    max_in_flight, package_indexes[ecosystem],
+                                                    state_store, validation_pool, shard,
+                                                    checkpoint)
+        if checkpoint is not None:
+            checkpoint.report_done(PACKAGE_VERSIONS_REPORT)
+
+    validation_stats.export_into_csv(report_filename("s3_validation_cost.csv", shard))
+    for name in sorted(validation_stats.objects):
+        logging.info("Validation of {a}: {n} objects, {t:.1f} us per object".format(
+            a=name, n=validation_stats.objects[name],
+            t=1e6 * validation_stats.seconds[name] / validation_stats.objects[name]))
+    return package_indexes if key_index else None
+
+
+def check_packages_in_graph(gremlinInterface, package_indexes, max_in_flight, batch_size,
+                            timeout, max_delay, shard=None):
+    """Compare all packages and versions found in S3 with the graph database.
+
+    Packages are looked up in batches of batch_size packages, max_delay (in seconds) is the
+    allowed delay of the graph update after the analysis has been stored into S3.
+    """
+    with CSVReporter(report_filename("s3_vs_graph.csv", shard)) as csvReporter:
+        csvReporter.csv_header_for_graph_consistency()
+        for ecosystem, package_index in package_indexes.items():
+            gremlin_checker = GremlinChecker(gremlinInterface, ecosystem, package_index,
+                                             batch_size, timeout, max_delay)
+            missing = 0
+            for row in gremlin_checker.check_packages(max_in_flight):
+                csvReporter.graph_consistency_info(*row)
+                if row[2] == 0:
+                    missing += 1
+            logging.info("{n} packages from the ecosystem {e} are missing in the graph".format(
+                n=missing, e=ecosystem))
+
+
+def check_sample_in_s3(s3interface, sample_size, confidence=DEFAULT_CONFIDENCE, seed=None,
+                       max_in_flight=DEFAULT_MAX_IN_FLIGHT, ecosystems=DEFAULT_ECOSYSTEMS,
+                       shard=None):
+    """Estimate failure rates of all analysis types from a random sample of objects.
+
+    At most sample_size objects per ecosystem and analysis type are checked. The same seed
+    gives the same sample, as long as the objects stored in the buckets are the same.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    logging.info("Objects are sampled with the seed {s}".format(s=seed))
+    rng = random.Random(seed)
+
+    with CSVReporter(report_filename(SAMPLE_REPORT, shard)) as csvReporter, \
+            CSVReporter(report_filename(SAMPLE_FAILURES_REPORT, shard)) as failuresReporter:
+        csvReporter.csv_header_for_sample()
+        failuresReporter.csv_header_for_sample_failures()
+        for ecosystem in ecosystems:
+            for checker_class, check_names, versioned in (
+                    (CorePackageChecker, CORE_PACKAGE_CHECKS, False),
+                    (ComponentVersionsChecker, COMPONENT_VERSION_CHECKS, True)):
+                bucket_name = checker_class.BUCKET_NAME
+                sampler = Sampler(checker_class, check_names, ecosystem, sample_size, rng,
+                                  versioned, shard)
+                sampler.sample_bucket(s3interface, bucket_name)
+                for stratum, sampled, verdict in sampler.check_sample(s3interface,
+                                                                      max_in_flight):
+                    if verdict != "OK":
+                        package_name, version, _ = sampled
+                        failuresReporter.sample_failure_info(ecosystem, bucket_name,
+                                                             stratum.name, package_name,
+                                                             version or "", verdict)
+                for name, stratum in sorted(sampler.strata.items()):
+                    failure_rate = stratum.failure_rate()
+                    lower_bound, upper_bound = stratum.confidence_interval(confidence)
+                    if failure_rate is None:
+                        failure_rate = estimated_failures = "N/A"
+                    else:
+                        estimated_failures = round(failure_rate * stratum.population)
+                    csvReporter.sample_info(ecosystem, bucket_name, name, stratum.population,
+                                            len(stratum.reservoir.items), stratum.ok,
+                                            stratum.failed, stratum.not_available,
+                                            failure_rate, lower_bound, upper_bound,
+                                            estimated_failures)
+                    logging.info("{e}/{a}: {f} of {n} sampled objects failed, failure rate "
+                                 "is between {l:.2%} and {u:.2%} with {c:.0%} "
+                                 "confidence".format(e=ecosystem, a=name, f=stratum.failed,
+                                                     n=stratum.ok + stratum.failed,
+                                                     l=lower_bound, u=upper_bound,
+                                                     c=confidence))
+
+
+def check_census_in_s3(s3interface, mode, range_size, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                       ecosystems=DEFAULT_ECOSYSTEMS, shard=None):
+    """Count objects by analysis type (existence) or by schema version (schema).
+
+    Objects are not read whole: the existence census needs only listing and HEAD requests,
+    the schema census reads range_size bytes of objects by ranged GETs.
+    """
+    with CSVReporter(report_filename(CENSUS_REPORT.format(m=mode), shard)) as csvReporter, \
+            CSVReporter(report_filename(CENSUS_PROBLEMS_REPORT.format(m=mode),
+                                        shard)) as problemsReporter:
+        csvReporter.csv_header_for_census()
+        problemsReporter.csv_header_for_census_problems()
+        for ecosystem in ecosystems:
+            census = Census(s3interface, ecosystem, shard)
+            if mode == "existence":
+                census.existence(max_in_flight)
+            else:
+                census.schemas(CorePackageChecker.BUCKET_NAME, False, range_size,
+                               max_in_flight)
+                census.schemas(ComponentVersionsChecker.BUCKET_NAME, True, range_size,
+                               max_in_flight)
+            for (bucket, analysis, schema_name, schema_version), counts in \
+                    sorted(census.counts.items()):
+                csvReporter.census_info(ecosystem, bucket, analysis, schema_name,
+                                        schema_version, counts.objects, counts.bytes,
+                                        counts.empty, counts.missing, counts.wrong_release)
+            for bucket, key, problem in census.problems:
+                problemsReporter.census_problem_info(ecosystem, bucket, key, problem)
+            logging.info("Census of {e}: {n} objects ({s} bytes stored, {r} bytes read), "
+                         "{p} problems found".format(
+                             e=ecosystem, n=sum(c.objects for c in census.counts.values()),
+                             s=census.bytes_stored, r=census.bytes_read,
+                             p=len(census.problems)))
+
+
+def export_s3_metrics(s3interface, shard=None):
+    """Log and export metrics of all requests sent to the S3."""
+    for line in s3_metrics.summary():
+        logging.info(line)
+    if s3interface.concurrency is not None:
+        for line in s3interface.concurrency.summary():
+            logging.info(line)
+    s3_metrics.export_into_csv(report_filename(S3_REQUESTS_REPORT, shard))
 
 
 def set_log_level(log_level):
@@ -175,14 +527,40 @@ def main():
     cli_arguments = cli_parser.parse_args()
     set_log_level(cli_arguments.log_level)
 
+    ecosystems = cli_arguments.ecosystem or DEFAULT_ECOSYSTEMS
+    unknown_ecosystems = set(ecosystems) - set(ECOSYSTEMS)
+    assert not unknown_ecosystems, "Unknown ecosystems: {e}".format(e=unknown_ecosystems)
+
+    if cli_arguments.merge:
+        merge_shards(cli_arguments.merge, ecosystems)
+        return
+
+    shard = cli_arguments.shard
+    if shard is not None:
+        logging.info("Only packages from the shard {s} are checked".format(s=shard))
+
     s3_tests_enabled = not cli_arguments.disable_s3_tests
     gremlin_tests_enabled = not cli_arguments.disable_gremlin_tests
 
     s3interface = None
-    if s3_tests_enabled:
+    if s3_tests_enabled and cli_arguments.local_s3:
+        # buckets stored in the local directory, no AWS credentials are needed
+        manifest = read_manifest(cli_arguments.local_s3)
+        deployment_prefix = manifest["deployment_prefix"] if manifest is not None else \
+            os.environ.get("DEPLOYMENT_PREFIX", DEFAULT_DEPLOYMENT_PREFIX)
+        s3interface = LocalS3Interface(cli_arguments.local_s3, deployment_prefix)
+        s3interface.max_object_size = cli_arguments.max_object_size * 1024 * 1024
+    elif s3_tests_enabled:
         s3configuration = S3Configuration()
         s3interface = S3Interface(s3configuration)
-        s3interface.connect()
+        s3interface.max_object_size = cli_arguments.max_object_size * 1024 * 1024
+        # each request in flight needs its own connection; without the key index, metadata
+        # lists and objects are read by two pools of max_in_flight threads at the same time
+        s3interface.connect(2 * cli_arguments.max_in_flight, cli_arguments.s3_connect_timeout,
+                            cli_arguments.s3_read_timeout, cli_arguments.s3_max_attempts)
+        if cli_arguments.adaptive_concurrency:
+            s3interface.concurrency = AdaptiveConcurrency(cli_arguments.max_in_flight,
+                                                          cli_arguments.initial_in_flight)
 
     gremlinInterface = None
     if gremlin_tests_enabled:
@@ -195,7 +573,79 @@ def main():
         logging.info("Only initial check is performed, exiting")
         sys.exit()
 
-    check_packages_in_s3(s3interface)
+    if cli_arguments.census:
+        if s3interface is None:
+            logging.info("S3 tests disabled, no census is performed")
+        else:
+            check_census_in_s3(s3interface, cli_arguments.census,
+                               cli_arguments.range_size * 1024, cli_arguments.max_in_flight,
+                               ecosystems, shard)
+            export_s3_metrics(s3interface, shard)
+        return
+
+    if cli_arguments.sample:
+        if s3interface is None:
+            logging.info("S3 tests disabled, nothing to be sampled")
+        else:
+            check_sample_in_s3(s3interface, cli_arguments.sample,
+                               cli_arguments.sample_confidence, cli_arguments.sample_seed,
+                               cli_arguments.max_in_flight, ecosystems, shard)
+            export_s3_metrics(s3interface, shard)
+        return
+
+    validation_pool = None
+    if cli_arguments.validation_pool:
+        validation_pool = ValidationPool(cli_arguments.validation_processes,
+                                         cli_arguments.validation_batch)
+        logging.info("Objects are checked by {n} processes".format(n=validation_pool.processes))
+
+    # progress of the scan is stored periodically, so the interrupted scan can be resumed
+    checkpoint_file = report_filename(CHECKPOINT, shard)
+    if cli_arguments.resume:
+        checkpoint = Checkpoint.load(checkpoint_file, ecosystems, shard,
+                                     cli_arguments.checkpoint_interval)
+    else:
+        checkpoint = Checkpoint(checkpoint_file, ecosystems, shard,
+                                cli_arguments.checkpoint_interval)
+
+    # verdicts are cached by ETags that are read from the key index
+    use_state_db = cli_arguments.state_db and not cli_arguments.no_key_index
+    if cli_arguments.state_db and cli_arguments.no_key_index:
+        logging.warning("State database is not used, verdicts can't be cached without the key "
+                        "index")
+
+    start_time = time.time()
+    package_indexes = None
+    try:
+        if not s3_tests_enabled:
+            logging.info("S3 tests disabled, skipping")
+        elif use_state_db:
+            # shards running on the same host must not share the database
+            state_db = report_filename(cli_arguments.state_db, shard)
+            with StateStore(state_db, cli_arguments.refresh) as state_store:
+                package_indexes = check_packages_in_s3(s3interface, cli_arguments.max_in_flight,
+                                                       state_store, validation_pool,
+                                                       ecosystems, shard, checkpoint,
+                                                       not cli_arguments.no_key_index)
+        else:
+            package_indexes = check_packages_in_s3(s3interface, cli_arguments.max_in_flight,
+                                                   None, validation_pool, ecosystems, shard,
+                                                   checkpoint, not cli_arguments.no_key_index)
+    finally:
+        if validation_pool is not None:
+            validation_pool.close()
+
+    # packages found in S3 are compared with the graph, the comparison needs the key index
+    if gremlinInterface is not None and cli_arguments.no_key_index:
+        logging.warning("Graph check is skipped, it can't run without the key index")
+    if gremlinInterface is not None and package_indexes is not None:
+        check_packages_in_graph(gremlinInterface, package_indexes, cli_arguments.max_in_flight,
+                                cli_arguments.gremlin_batch, cli_arguments.gremlin_timeout,
+                                cli_arguments.gremlin_max_delay * 60 * 60, shard)
+
+    write_summary(shard, ecosystems, time.time() - start_time)
+    if s3interface is not None:
+        export_s3_metrics(s3interface, shard)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+"""Streaming merge-join of package listings of core-package-data and core-data buckets.
+
+S3 returns package directories (common prefixes) in the lexicographic order of their
+prefixes, so both listings are already sorted and they can be joined in one linear pass
+without holding them in memory. The order of prefixes differs from the order of package
+names: the package "a-b/" is listed before "a/", because "-" sorts before "/". Packages
+are therefore ordered by their prefixes everywhere the order matters (reports, key
+indexes, checkpoints, and merged shards).
+"""
+
+
+def listing_order(package_name):
+    """Return the key that orders packages in the same way as S3 lists their directories."""
+    return package_name + "/"
+
+
+def merge_join(core_packages, packages):
+    """Yield package, in_core_packages, and in_packages for the union of both listings.
+
+    Both listings need to be in the listing order (see listing_order), they are read
+    lazily, so they can be generators that perform the paginated listing.
+    """
+    core_packages = iter(core_packages)
+    packages = iter(packages)
+    core_package = next(core_packages, None)
+    package = next(packages, None)
+    previous = None
+    while core_package is not None or package is not None:
+        if package is None or \
+                core_package is not None and listing_order(core_package) < listing_order(package):
+            joined = (core_package, True, False)
+            core_package = next(core_packages, None)
+        elif core_package is None or listing_order(package) < listing_order(core_package):
+            joined = (package, False, True)
+            package = next(packages, None)
+        else:
+            joined = (package, True, True)
+            core_package = next(core_packages, None)
+            package = next(packages, None)
+
+        # unsorted listing would silently break the join
+        if previous is not None and listing_order(joined[0]) <= listing_order(previous):
+            raise Exception("Packages are not listed in the listing order: {p} after {q}".format(
+                p=joined[0], q=previous))
+        previous = joined[0]
+        yield joined
@@ -0,0 +1,40 @@
+"""Bounded-concurrency pipeline used to read and check objects stored in S3 in parallel."""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_IN_FLIGHT = 16
+
+
+def ordered_map(function, items, max_in_flight=DEFAULT_MAX_IN_FLIGHT, executor=None):
+    """Call the function for all items in parallel, yield results in the order of items.
+
+    At most max_in_flight calls are running (or waiting for being consumed) at any time.
+    The items are read lazily, so the input can be a generator that performs listing
+    of objects; listing is then performed in parallel with processing of the items.
+
+    The calls are submitted to the given executor (it might be a process pool), a new
+    thread pool with max_in_flight threads is used otherwise.
+    """
+    if executor is not None:
+        yield from _ordered_map(function, items, max_in_flight, executor)
+        return
+
+    if max_in_flight <= 1:
+        for item in items:
+            yield function(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        yield from _ordered_map(function, items, max_in_flight, executor)
+
+
+def _ordered_map(function, items, max_in_flight, executor):
+    """Submit calls to the executor, yield results in the order of items."""
+    in_flight = collections.deque()
+    for item in items:
+        if len(in_flight) >= max_in_flight:
+            yield in_flight.popleft().result()
+        in_flight.append(executor.submit(function, item))
+    while in_flight:
+        yield in_flight.popleft().result()
@@ -0,0 +1,207 @@
+"""Shared low-level S3 client with tuned configuration and request metrics.
+
+One client is created per process (and per credentials and endpoint) and shared by all
+threads; the low-level client, unlike sessions and resources, is thread safe. The client
+uses the connection pool of the given size, adaptive retry mode (exponential backoff plus
+client-side rate limiting when S3 responds by 503 SlowDown), and connect and read timeouts.
+
+Requests are instrumented by botocore event hooks. Number of requests, read bytes,
+latency histogram, retries, 503 SlowDown responses, and errors are counted per bucket
+in the metrics object shared by all clients in the process.
+"""
+
+import csv
+import threading
+import time
+
+import boto3
+import botocore.config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_MAX_ATTEMPTS = 10
+
+# upper bounds of latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# key used to store the call metadata in the botocore request context
+CONTEXT_KEY = "s3_metrics"
+
+
+class BucketMetrics:
+    """Counters of requests sent to one bucket."""
+
+    def __init__(self):
+        """Initialize all counters to zero."""
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self.slow_downs = 0
+        self.errors = 0
+        self.seconds = 0.0
+        # the last bucket counts requests slower than the last bound
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.first_request = None
+        self.last_response = None
+
+    def add_request(self, start, end, size, retries, error):
+        """Count one API call (including its retries)."""
+        self.requests += 1
+        self.bytes += size
+        self.retries += retries
+        self.errors += int(error)
+        self.seconds += end - start
+        bucket = 0
+        while bucket < len(LATENCY_BUCKETS) and end - start > LATENCY_BUCKETS[bucket]:
+            bucket += 1
+        self.latency_histogram[bucket] += 1
+        if self.first_request is None or start < self.first_request:
+            self.first_request = start
+        if self.last_response is None or end > self.last_response:
+            self.last_response = end
+
+    def average_latency(self):
+        """Return the average latency of one call in seconds."""
+        return self.seconds / self.requests if self.requests else 0.0
+
+    def duration(self):
+        """Return time between the first request and the last response."""
+        if self.first_request is None:
+            return 0.0
+        return self.last_response - self.first_request
+
+    def requests_per_second(self):
+        """Return the average request rate."""
+        duration = self.duration()
+        return self.requests / duration if duration else 0.0
+
+    def bytes_per_second(self):
+        """Return the average read throughput."""
+        duration = self.duration()
+        return self.bytes / duration if duration else 0.0
+
+
+class S3Metrics:
+    """Metrics of all requests sent to the S3 by instrumented clients, per bucket."""
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, client):
+        """Register event hooks that measure all requests sent by the client."""
+        events = client.meta.events
+        events.register("before-parameter-build.s3", self._before_call)
+        events.register("needs-retry.s3", self._needs_retry)
+        events.register("after-call.s3", self._after_call)
+
+    def bucket_metrics(self, bucket):
+        """Return metrics for the bucket, to be called with the lock held."""
+        metrics = self.buckets.get(bucket)
+        if metrics is None:
+            metrics = self.buckets[bucket] = BucketMetrics()
+        return metrics
+
+    def _before_call(self, params, context, **kwargs):
+        """Remember the bucket and the time when the call started."""
+        # calls like ListBuckets are not sent to any bucket
+        context[CONTEXT_KEY] = (params.get("Bucket", "-"), time.perf_counter())
+
+    def _needs_retry(self, response=None, request_dict=None, **kwargs):
+        """Count 503 SlowDown responses, including the ones hidden by retries."""
+        if response is None or request_dict is None:
+            return None
+        http_response = response[0]
+        call = request_dict.get("context", {}).get(CONTEXT_KEY)
+        if call is not None and http_response.status_code == 503:
+            with self._lock:
+                self.bucket_metrics(call[0]).slow_downs += 1
+        # the retry handler decides whether the request is retried
+        return None
+
+    def _after_call(self, http_response, parsed, context, **kwargs):
+        """Count the finished call, its latency, size, and retries."""
+        call = context.get(CONTEXT_KEY)
+        if call is None:
+            return
+        bucket, start = call
+        end = time.perf_counter()
+        metadata = parsed.get("ResponseMetadata", {})
+        size = parsed.get("ContentLength") or 0
+        with self._lock:
+            self.bucket_metrics(bucket).add_request(start, end, size,
+                                                    metadata.get("RetryAttempts", 0),
+                                                    http_response.status_code >= 300)
+
+    def summary(self):
+        """Return one line per bucket with the request rate, throughput, latency, and errors."""
+        with self._lock:
+            return ["S3 bucket {b}: {n} requests ({r:.1f}/s), {m:.2f} MB/s, average latency "
+                    "{l:.1f} ms, {t} retries, {s} SlowDown, {e} errors".format(
+                        b=bucket, n=metrics.requests, r=metrics.requests_per_second(),
+                        m=metrics.bytes_per_second() / 1024 / 1024,
+                        l=1000 * metrics.average_latency(), t=metrics.retries,
+                        s=metrics.slow_downs, e=metrics.errors)
+                    for bucket, metrics in sorted(self.buckets.items())]
+
+    def export_into_csv(self, filename):
+        """Export metrics of all buckets into the CSV file."""
+        with self._lock, open(filename, "w") as fout:
+            writer = csv.writer(fout)
+            writer.writerow(["Bucket", "Requests", "Requests per second", "Bytes",
+                             "Bytes per second", "Retries", "SlowDown", "Errors",
+                             "Average latency"] +
+                            ["<= {b} s".format(b=bound) for bound in LATENCY_BUCKETS] +
+                            ["> {b} s".format(b=LATENCY_BUCKETS[-1])])
+            for bucket, metrics in sorted(self.buckets.items()):
+                writer.writerow([bucket, metrics.requests, metrics.requests_per_second(),
+                                 metrics.bytes, metrics.bytes_per_second(), metrics.retries,
+                                 metrics.slow_downs, metrics.errors,
+                                 metrics.average_latency()] + metrics.latency_histogram)
+
+
+# metrics of all clients created in this process
+metrics = S3Metrics()
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client_config(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                  connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                  max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Return the botocore configuration with the connection pool, retries, and timeouts."""
+    return botocore.config.Config(signature_version='s3v4',
+                                  max_pool_connections=max_pool_connections,
+                                  connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                  retries={'total_max_attempts': max_attempts,
+                                           'mode': 'adaptive'})
+
+
+def shared_client(access_key_id, secret_access_key, region_name, endpoint_url=None,
+                  max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                  connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                  max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """Return the instrumented client shared by the whole process.
+
+    The client is created when it's needed for the first time, the pool size, timeouts,
+    and retries given by the first caller are used.
+    """
+    key = (access_key_id, secret_access_key, region_name, endpoint_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            session = boto3.session.Session(aws_access_key_id=access_key_id,
+                                            aws_secret_access_key=secret_access_key,
+                                            region_name=region_name)
+            # the local S3 compatible service is usually not accessed over HTTPS
+            use_ssl = endpoint_url is None or endpoint_url.startswith("https://")
+            client = session.client('s3', config=client_config(max_pool_connections,
+                                                               connect_timeout,
+                                                               read_timeout, max_attempts),
+                                    use_ssl=use_ssl, endpoint_url=endpoint_url)
+            metrics.instrument(client)
+            _clients[key] = client
+        return client
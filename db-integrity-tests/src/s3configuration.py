@@ -14,6 +14,8 @@ class S3Configuration:
         self.region_name = os.environ.get('S3_REGION_NAME')
         # optional
         self.deployment_prefix = os.environ.get('DEPLOYMENT_PREFIX')
+        # optional, S3 compatible service (moto server, MinIO...) to be used instead of AWS
+        self.endpoint_url = os.environ.get('S3_ENDPOINT_URL') or None
 
         # check if all required environment variables have been set
 
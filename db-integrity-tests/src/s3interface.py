@@ -1,10 +1,14 @@
 """AWS S3 Interface used by tests."""
 
-import boto3
-import botocore
 from botocore.exceptions import ClientError
+import io
 import json
 
+from json_stream import read_fields, read_leading_fields, read_trailing_fields, \
+    ObjectTooLarge, TruncatedDocument, DEFAULT_MAX_OBJECT_SIZE
+from s3_client import shared_client, DEFAULT_MAX_POOL_CONNECTIONS, DEFAULT_CONNECT_TIMEOUT, \
+    DEFAULT_READ_TIMEOUT, DEFAULT_MAX_ATTEMPTS
+
 
 class S3Interface():
     """Interface to the AWS S3 database."""
@@ -18,43 +22,43 @@ class S3Interface():
         self.s3_configuration = s3configuration
 
         # to be set up by the connect() method
-        self.s3_resource = None
-        self.s3_session = None
+        self.s3_client = None
 
-    def connect(self):
-        """Connect to the AWS S3 database."""
-        # we are already connected -> let's use this connection
-        if self.s3_resource is not None:
-            return
+        # larger objects are not read at all
+        self.max_object_size = DEFAULT_MAX_OBJECT_SIZE
 
-        # create the session used to communicate with the S3 database
-        # and check if the operation was successful
-        self.s3_session = boto3.session.Session(
-            aws_access_key_id=self.s3_configuration.access_key_id,
-            aws_secret_access_key=self.s3_configuration.secret_access_key,
-            region_name=self.s3_configuration.region_name)
+        # AdaptiveConcurrency that limits requests in flight per bucket and prefix (optional)
+        self.concurrency = None
 
-        assert self.s3_session is not None
+    def connect(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Connect to the AWS S3 database.
 
-        use_ssl = True
-        endpoint_url = None
+        The max_pool_connections should be set to the number of requests sent concurrently.
+        The low-level client is shared by all interfaces (and threads) in the process.
+        """
+        # we are already connected -> let's use this connection
+        if self.s3_client is not None:
+            return
 
-        # retrieve the bucket resource and check if the operation was successful
-        self.s3_resource = self.s3_session.resource(
-            's3',
-            config=botocore.client.Config(signature_version='s3v4'),
-            use_ssl=use_ssl, endpoint_url=endpoint_url)
+        self.s3_client = shared_client(self.s3_configuration.access_key_id,
+                                       self.s3_configuration.secret_access_key,
+                                       self.s3_configuration.region_name,
+                                       self.s3_configuration.endpoint_url,
+                                       max_pool_connections, connect_timeout, read_timeout,
+                                       max_attempts)
 
-        assert self.s3_resource is not None
+        assert self.s3_client is not None
 
     def read_all_buckets(self):
         """Read all available buckets from the AWS S3 database."""
-        return self.s3_resource.buckets.all()
+        return self.s3_client.list_buckets()["Buckets"]
 
     def read_bucket_names(self):
         """Read names of all available buckets from the AWS S3 database."""
         buckets = self.read_all_buckets()
-        return [bucket.name for bucket in buckets]
+        return [bucket["Name"] for bucket in buckets]
 
     def full_bucket_name(self, bucket_name):
         """Insert deployment prefix to the given bucket name."""
@@ -106,11 +110,48 @@ class S3Interface():
                                                               package=package,
                                                               analysis=analysis)
 
+    @staticmethod
+    def parse_key(key, ecosystem, versioned=False):
+        """Return package, version (None for package files), and analysis for the key.
+
+        The analysis is None for the package (or version) toplevel file. None is returned
+        for keys with unexpected layout. Keys stored for package versions contain the
+        version as well.
+        """
+        prefix = ecosystem + "/"
+        if not key.startswith(prefix) or not key.endswith(".json"):
+            return None
+        parts = key[len(prefix):-len(".json")].split("/")
+        # number of parts identifying the package (and version)
+        depth = 2 if versioned else 1
+        if len(parts) == depth:
+            analysis = None
+        elif len(parts) == depth + 1:
+            analysis = parts.pop()
+        else:
+            return None
+        return parts[0], parts[1] if versioned else None, analysis
+
     @property
     def deployment_prefix(self):
         """Get the deployment prefix set up during initialization of this class."""
         return self.s3_configuration.deployment_prefix
 
+    def send_request(self, operation, bucket_name, key, **kwargs):
+        """Send the request for the key (or prefix) to the bucket, return the response.
+
+        When the adaptive concurrency is enabled, the request waits until the limit of
+        requests in flight for the bucket and the key prefix allows it to be sent.
+        """
+        s3 = self.s3_client
+        assert s3 is not None
+        function = getattr(s3, operation)
+        full_bucket_name = self.full_bucket_name(bucket_name)
+        if self.concurrency is None:
+            return function(Bucket=full_bucket_name, **kwargs)
+        return self.concurrency.call(full_bucket_name, key, function,
+                                     Bucket=full_bucket_name, **kwargs)
+
     def does_bucket_exist(self, bucket_name):
         """Check if the given bucket exists in the S3 database.
 
@@ -118,31 +159,105 @@ class S3Interface():
         by current AWS S3 database user.
         """
         try:
-            s3 = self.s3_resource
+            s3 = self.s3_client
             assert s3 is not None
-            s3.meta.client.head_bucket(Bucket=self.full_bucket_name(bucket_name))
+            s3.head_bucket(Bucket=self.full_bucket_name(bucket_name))
             return True
         except ClientError:
             return False
 
-    def read_object(self, bucket_name, key):
-        """Read byte stream from the S3 database, decode it into string, and parse as JSON."""
-        s3 = self.s3_resource
-        assert s3 is not None
-        data = s3.Object(self.full_bucket_name(bucket_name), key).get()['Body'].read().decode()
-        return json.loads(data)
+    def get_object(self, bucket_name, key):
+        """Send the GET request for the object, ObjectTooLarge is raised for large objects."""
+        response = self.send_request('get_object', bucket_name, key, Key=key)
+        size = response.get('ContentLength')
+        if size is not None and size > self.max_object_size:
+            response['Body'].close()
+            raise ObjectTooLarge(key, size, self.max_object_size)
+        return response
+
+    def read_raw_object(self, bucket_name, key):
+        """Read byte stream from the S3 database, the content is not parsed."""
+        return self.get_object(bucket_name, key)['Body'].read()
+
+    def read_object(self, bucket_name, key, fields=None):
+        """Read byte stream from the S3 database and parse it as JSON.
+
+        When fields are specified, the object is parsed from the stream and only values of
+        the selected top-level fields are decoded (see json_stream.py). ObjectTooLarge is
+        raised for objects larger than max_object_size.
+        """
+        response = self.get_object(bucket_name, key)
+        if fields is not None:
+            return read_fields(response['Body'], key, fields, self.max_object_size)
+        return json.loads(response['Body'].read())
 
     def read_object_metadata(self, bucket_name, key, attribute):
-        """Read byte stream from the S3 database, decode it into string, and parse as JSON."""
-        s3 = self.s3_resource
-        assert s3 is not None
-        data = s3.Object(self.full_bucket_name(bucket_name), key).get()[attribute]
-        return data
+        """Read the attribute of the object (LastModified, ETag...) by the HEAD request."""
+        return self.send_request('head_object', bucket_name, key, Key=key)[attribute]
+
+    def read_object_size(self, bucket_name, key):
+        """Return size of the object read by the HEAD request, None if it does not exist."""
+        try:
+            return self.read_object_metadata(bucket_name, key, 'ContentLength')
+        except ClientError as e:
+            if e.response.get('ResponseMetadata', {}).get('HTTPStatusCode') == 404:
+                return None
+            raise
+
+    def read_object_range(self, bucket_name, key, start, end=None):
+        """Read bytes start:end of the object by the ranged GET, return them and object size.
+
+        Like for slices, the negative start without end selects the end of the object.
+        """
+        if start < 0:
+            byte_range = "bytes={s}".format(s=start)
+        else:
+            byte_range = "bytes={s}-{e}".format(s=start, e="" if end is None else end - 1)
+        try:
+            response = self.send_request('get_object', bucket_name, key, Key=key,
+                                         Range=byte_range)
+        except ClientError as e:
+            # no range can be satisfied for empty objects
+            if e.response.get('Error', {}).get('Code') == 'InvalidRange':
+                return b"", 0
+            raise
+        content = response['Body'].read()
+        content_range = response.get('ContentRange')
+        size = int(content_range.rsplit("/", 1)[1]) if content_range else len(content)
+        return content, size
+
+    def read_object_fields(self, bucket_name, key, fields, range_size):
+        """Read selected top-level fields of the JSON object by ranged GETs.
+
+        The first range_size bytes are read and fields found there are parsed. Fields that
+        are not at the beginning are looked for in the last range_size bytes, the object is
+        never read whole. Return dictionary with the selected fields found, number of read
+        bytes, and the flag whether the whole object has been read: when it's false, the
+        fields that were not found may be stored in the middle of the object.
+        """
+        fields = set(fields)
+        head, size = self.read_object_range(bucket_name, key, 0, range_size)
+        result, truncated = read_leading_fields(io.BytesIO(head), key, fields,
+                                                self.max_object_size)
+        if len(head) >= size:
+            if truncated:
+                raise TruncatedDocument("Unexpected end of JSON document {k}".format(k=key))
+            return result, len(head), True
+        if not truncated or len(result) == len(fields):
+            return result, len(head), False
+
+        tail, _ = self.read_object_range(bucket_name, key, -min(range_size, size - len(head)))
+        if len(head) + len(tail) == size:
+            # the tail starts right after the head, so the whole object has been read
+            data = read_fields(io.BytesIO(head + tail), key, fields, self.max_object_size)
+            return {field: data[field] for field in fields if field in data}, size, True
+        result.update(read_trailing_fields(tail, fields - set(result)))
+        return result, len(head) + len(tail), False
 
     def read_ecosystems_from_bucket(self, bucket_name):
         """Return list of all ecosystems from selected bucket."""
-        bucket = self.s3_resource.Bucket(self.full_bucket_name(bucket_name))
-        result = bucket.meta.client.list_objects(Bucket=bucket.name, Delimiter='/')
+        result = self.s3_client.list_objects(Bucket=self.full_bucket_name(bucket_name),
+                                             Delimiter='/')
         names = [o.get('Prefix') for o in result.get('CommonPrefixes')]
         # remove the / at the end of object name
         return [name[:-1] for name in names]
@@ -155,50 +270,69 @@ class S3Interface():
         """Return list of all ecosystems from core-data bucket."""
         return self.read_ecosystems_from_bucket("bayesian-core-data")
 
-    def read_packages_from_bucket_for_ecosystem(self, ecosystem, bucket_name):
-        """Return list of all packages found for the selected ecosystem."""
+    def iterate_packages_from_bucket_for_ecosystem(self, ecosystem, bucket_name):
+        """Yield all packages found for the selected ecosystem, in the listing order.
+
+        Pages of the listing are read lazily, so the whole list is never held in memory.
+        """
         if not ecosystem.endswith("/"):
             ecosystem += "/"
-        bucket = self.s3_resource.Bucket(self.full_bucket_name(bucket_name))
-
         # parameters to be passed to list_objects_v2 method
-        kwargs = {'Bucket': bucket.name, 'Delimiter': '/', 'Prefix': ecosystem}
-
-        package_names = []
+        kwargs = {'Delimiter': '/', 'Prefix': ecosystem}
 
         # the S3 interface supports and requires 'pagination', so we need
         # to get list of package names in a loop
         while True:
-            result = bucket.meta.client.list_objects_v2(**kwargs)
-            names = [o.get('Prefix') for o in result.get('CommonPrefixes')]
+            result = self.send_request('list_objects_v2', bucket_name, ecosystem, **kwargs)
+            names = [o.get('Prefix') for o in result.get('CommonPrefixes', [])]
             # names are returned in format "ecosystem/package/"
             # -> we need to get only the package part
-            package_names.extend([name[name.find("/") + 1: name.find("/", -1)] for name in names])
+            for name in names:
+                yield name[name.find("/") + 1: name.find("/", -1)]
             # perform 'pagination', but only when results were truncated
             if not result.get("IsTruncated"):
                 break
             # token used by S3 to remember when the next page should begin
             kwargs['ContinuationToken'] = result['NextContinuationToken']
 
-        return package_names
+    def read_packages_from_bucket_for_ecosystem(self, ecosystem, bucket_name):
+        """Return list of all packages found for the selected ecosystem."""
+        return list(self.iterate_packages_from_bucket_for_ecosystem(ecosystem, bucket_name))
+
+    def iterate_core_packages_for_ecosystem(self, ecosystem):
+        """Yield all core packages for the selected ecosystem, in the listing order."""
+        return self.iterate_packages_from_bucket_for_ecosystem(ecosystem,
+                                                               "bayesian-core-package-data")
+
+    def iterate_packages_for_ecosystem(self, ecosystem):
+        """Yield all packages for the selected ecosystem, in the listing order."""
+        return self.iterate_packages_from_bucket_for_ecosystem(ecosystem, "bayesian-core-data")
 
     def read_core_packages_for_ecosystem(self, ecosystem):
         """Return list of all core packages for the selected ecosystem."""
-        return self.read_packages_from_bucket_for_ecosystem(ecosystem, "bayesian-core-package-data")
+        return list(self.iterate_core_packages_for_ecosystem(ecosystem))
 
     def read_packages_for_ecosystem(self, ecosystem):
         """Return list of all packages for the selected ecosystem."""
-        return self.read_packages_from_bucket_for_ecosystem(ecosystem, "bayesian-core-data")
+        return list(self.iterate_packages_for_ecosystem(ecosystem))
+
+    def iterate_objects(self, bucket_name, prefix):
+        """Yield all objects (Key, ETag, Size, LastModified...) with the given prefix."""
+        kwargs = {'Prefix': prefix}
+
+        # the S3 returns at most 1000 objects per request, so 'pagination' is needed
+        while True:
+            result = self.send_request('list_objects_v2', bucket_name, prefix, **kwargs)
+            yield from result.get("Contents", [])
+            if not result.get("IsTruncated"):
+                break
+            kwargs['ContinuationToken'] = result['NextContinuationToken']
 
     def read_object_list(self, bucket_name, ecosystem, package, update_names=True,
                          remove_prefix=False):
         """Read list of objects (JSON files) stored for the given E+P."""
-        bucket_name = self.full_bucket_name(bucket_name)
         prefix = S3Interface.package_key_to_metadata(ecosystem, package)
-        bucket = self.s3_resource.Bucket(bucket_name)
-        result = bucket.meta.client.list_objects_v2(Bucket=bucket.name, Prefix=prefix)
-        contents = result["Contents"]
-        json_files = [o["Key"] for o in contents]
+        json_files = [o["Key"] for o in self.iterate_objects(bucket_name, prefix)]
         if update_names:
             return [json_file[json_file.rfind("/") + 1:] for json_file in json_files]
         elif remove_prefix:
@@ -0,0 +1,191 @@
+"""Estimation of failure rates of analyses from a uniform random sample of objects in S3.
+
+Keys are streamed from one paginated listing of the bucket and each key is assigned to the
+stratum given by its analysis type (core data, code_metrics, github_details...). For each
+stratum, a uniform random sample of fixed size is kept by reservoir sampling, so neither
+the whole listing nor the number of objects needs to be known in advance. Only sampled
+objects are read and checked, and the failure rate of each analysis type is reported with
+the Wilson score interval, which behaves well for small samples and rates close to 0 or 1.
+"""
+
+import logging
+import math
+
+from pipeline import ordered_map, DEFAULT_MAX_IN_FLIGHT
+from s3interface import S3Interface
+
+DEFAULT_SAMPLE_SIZE = 400
+
+DEFAULT_CONFIDENCE = 0.95
+
+# name used for the stratum of top-level files (package.json, version.json)
+CORE_STRATUM = "core"
+
+
+class Reservoir:
+    """Uniform random sample of fixed size from the stream of unknown length (algorithm R)."""
+
+    def __init__(self, size, rng):
+        """Initialize the empty sample, rng is the source of random numbers."""
+        self.size = size
+        self.rng = rng
+        self.items = []
+        # number of items seen in the stream
+        self.seen = 0
+
+    def add(self, item):
+        """Offer the item from the stream, each item is in the sample with equal probability."""
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        position = self.rng.randrange(self.seen)
+        if position < self.size:
+            self.items[position] = item
+
+
+def z_score(confidence):
+    """Return the two-sided critical value of the standard normal distribution."""
+    # erf(z / sqrt(2)) is increasing, so it can be inverted by bisection
+    low, high = 0.0, 10.0
+    for _ in range(100):
+        middle = (low + high) / 2
+        if math.erf(middle / math.sqrt(2)) < confidence:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def wilson_interval(failed, checked, confidence=DEFAULT_CONFIDENCE):
+    """Return the lower and upper bound of the confidence interval of the failure rate."""
+    if checked == 0:
+        return 0.0, 1.0
+    z = z_score(confidence)
+    rate = failed / checked
+    denominator = 1 + z * z / checked
+    centre = (rate + z * z / (2 * checked)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / checked +
+                           z * z / (4 * checked * checked)) / denominator
+    # the bounds are exact at both ends, rounding errors would show up in the report
+    lower = 0.0 if failed == 0 else max(0.0, centre - margin)
+    upper = 1.0 if failed == checked else min(1.0, centre + margin)
+    return lower, upper
+
+
+class Stratum:
+    """Sampled objects of one analysis type and their verdicts."""
+
+    def __init__(self, name, sample_size, rng):
+        """Initialize the stratum with empty sample."""
+        self.name = name
+        self.reservoir = Reservoir(sample_size, rng)
+        self.ok = 0
+        self.failed = 0
+        # objects that could not be checked (deleted after the listing, empty...)
+        self.not_available = 0
+
+    @property
+    def population(self):
+        """Return number of objects of this analysis type in the bucket."""
+        return self.reservoir.seen
+
+    def add_verdict(self, verdict):
+        """Count the verdict of one sampled object."""
+        if verdict == "OK":
+            self.ok += 1
+        elif verdict == "N/A":
+            self.not_available += 1
+        else:
+            self.failed += 1
+
+    def failure_rate(self):
+        """Return the failure rate in the sample, None if no object has been checked."""
+        checked = self.ok + self.failed
+        if checked == 0:
+            return None
+        return self.failed / checked
+
+    def confidence_interval(self, confidence=DEFAULT_CONFIDENCE):
+        """Return the confidence interval of the failure rate of all objects in the stratum."""
+        return wilson_interval(self.failed, self.ok + self.failed, confidence)
+
+
+class Sampler:
+    """Sample of objects stored for one ecosystem in one bucket, stratified by analysis type.
+
+    The checker_class is used to check the sampled objects, checks are selected by the
+    metadata key (analysis) they are checking (see cached_verdict). When the bucket stores
+    objects for package versions, the key contains the version as well.
+    """
+
+    def __init__(self, checker_class, check_names, ecosystem, sample_size, rng,
+                 versioned=False, shard=None):
+        """Initialize the sampler, check_names are names of the checker's methods."""
+        self.checker_class = checker_class
+        # analysis (None for top-level files) -> check method
+        self.checks = {getattr(checker_class, check_name).metadata_key: check_name
+                       for check_name in check_names}
+        self.ecosystem = ecosystem
+        self.prefix = ecosystem + "/"
+        self.sample_size = sample_size
+        self.rng = rng
+        self.versioned = versioned
+        self.shard = shard
+        self.strata = {}
+        # keys of objects that are not checked by any check
+        self.unknown = 0
+
+    def parse_key(self, key):
+        """Return package, version (None for package files), and analysis for the key.
+
+        None is returned for keys not checked by any check.
+        """
+        parsed = S3Interface.parse_key(key, self.ecosystem, self.versioned)
+        if parsed is None or parsed[2] not in self.checks:
+            return None
+        return parsed
+
+    def add(self, key):
+        """Offer the listed key to the sample of its analysis type."""
+        parsed = self.parse_key(key)
+        if parsed is None:
+            self.unknown += 1
+            return
+        package, version, analysis = parsed
+        if self.shard is not None and package not in self.shard:
+            return
+        name = analysis or CORE_STRATUM
+        stratum = self.strata.get(name)
+        if stratum is None:
+            stratum = self.strata[name] = Stratum(name, self.sample_size, self.rng)
+        stratum.reservoir.add((package, version, analysis))
+
+    def sample_bucket(self, s3interface, bucket_name):
+        """List all objects stored for the ecosystem in the bucket and sample them."""
+        for o in s3interface.iterate_objects(bucket_name, self.prefix):
+            self.add(o["Key"])
+        logging.info("{n} objects from {p} strata sampled in the bucket {b} for the "
+                     "ecosystem {e}".format(n=sum(len(s.reservoir.items)
+                                                  for s in self.strata.values()),
+                                            p=len(self.strata), b=bucket_name,
+                                            e=self.ecosystem))
+
+    def check(self, s3interface, sampled):
+        """Check one sampled object, return its verdict."""
+        package, version, analysis = sampled
+        checker = self.checker_class(s3interface, self.ecosystem, package)
+        if self.versioned:
+            checker.version = version
+        return getattr(checker, self.checks[analysis])()
+
+    def check_sample(self, s3interface, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        """Check all sampled objects, yield stratum, sampled object, and verdict."""
+        # strata are checked in the order of their names, so the report is stable
+        sampled = [(stratum, item) for _, stratum in sorted(self.strata.items())
+                   for item in sorted(stratum.reservoir.items, key=str)]
+        verdicts = ordered_map(lambda item: self.check(s3interface, item[1]), sampled,
+                               max_in_flight)
+        for (stratum, item), verdict in zip(sampled, verdicts):
+            stratum.add_verdict(verdict)
+            yield stratum, item, verdict
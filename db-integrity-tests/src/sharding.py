@@ -0,0 +1,201 @@
+"""Deterministic partitioning of packages into shards for distributed integrity checks.
+
+Packages are assigned to shards by a stable hash (CRC-32) of their names, so N processes
+or hosts started with --shard 0/N ... --shard N-1/N check disjoint sets of packages and
+together cover all of them. Each shard writes its own reports and summary, the merge
+command then combines them into reports equivalent to the ones from one process.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import zlib
+
+from merge_join import listing_order
+from validators import ValidationStats
+
+# reports written by the integrity checks -> number of columns that identify the row
+REPORTS = {
+    "s3_core_packages.csv": 2,
+    "s3_package_versions.csv": 3,
+    "s3_vs_graph.csv": 2,
+}
+
+COST_REPORT = "s3_validation_cost.csv"
+
+SUMMARY = "s3_summary.json"
+
+# values that are not counted as failures in the summary
+OK_VALUES = {"OK", "none", "1", ""}
+
+
+class Shard:
+    """One of N disjoint parts of packages from all ecosystems."""
+
+    def __init__(self, index, count):
+        """Initialize the shard with given index (counted from zero)."""
+        assert 0 <= index < count, "Shard index {i} is out of range 0..{m}".format(
+            i=index, m=count - 1)
+        self.index = index
+        self.count = count
+
+    @staticmethod
+    def parse(value):
+        """Parse the shard specification in the form i/N, to be used by argparse."""
+        try:
+            index, count = value.split("/")
+            return Shard(int(index), int(count))
+        except (ValueError, AssertionError):
+            raise argparse.ArgumentTypeError(
+                "Shard needs to be specified as i/N where 0 <= i < N, got '{v}'".format(v=value))
+
+    def __contains__(self, package_name):
+        """Check if the package belongs to this shard, the result is the same on all hosts."""
+        return zlib.crc32(package_name.encode("utf-8")) % self.count == self.index
+
+    def __str__(self):
+        """Return the shard specification in the form i/N."""
+        return "{i}/{n}".format(i=self.index, n=self.count)
+
+    def filename(self, filename):
+        """Insert the shard number into the name of the report file."""
+        name, _, extension = filename.rpartition(".")
+        return "{n}.shard-{i}-of-{c}.{e}".format(n=name, i=self.index, c=self.count,
+                                                 e=extension)
+
+
+def report_filename(filename, shard=None):
+    """Return the name of the report file written by the (sharded) run."""
+    return filename if shard is None else shard.filename(filename)
+
+
+def summarize_report(filename, key_columns):
+    """Count rows and OK/N/A/failed values in all non-key columns of the report."""
+    with open(filename) as fin:
+        reader = csv.reader(fin)
+        header = next(reader)
+        columns = {name: {"OK": 0, "N/A": 0, "failed": 0} for name in header[key_columns:]}
+        rows = 0
+        for row in reader:
+            rows += 1
+            for name, value in zip(header[key_columns:], row[key_columns:]):
+                if value in OK_VALUES:
+                    columns[name]["OK"] += 1
+                elif value == "N/A":
+                    columns[name]["N/A"] += 1
+                else:
+                    columns[name]["failed"] += 1
+    return {"rows": rows, "columns": columns}
+
+
+def write_summary(shard, ecosystems, duration):
+    """Write the summary of all reports written by this run."""
+    summary = {"shard": str(shard) if shard is not None else None,
+               "ecosystems": ecosystems,
+               "duration": duration,
+               "reports": {}}
+    for report, key_columns in REPORTS.items():
+        filename = report_filename(report, shard)
+        try:
+            summary["reports"][report] = summarize_report(filename, key_columns)
+        except FileNotFoundError:
+            # e.g. the graph database is not checked
+            pass
+    with open(report_filename(SUMMARY, shard), "w") as fout:
+        json.dump(summary, fout, indent=4)
+    return summary
+
+
+def merge_summaries(summaries):
+    """Combine summaries of all shards, numbers of rows and values are added together."""
+    merged = {"shard": None, "shards": [summary["shard"] for summary in summaries],
+              "ecosystems": [], "duration": 0.0, "reports": {}}
+    for summary in summaries:
+        for ecosystem in summary["ecosystems"]:
+            if ecosystem not in merged["ecosystems"]:
+                merged["ecosystems"].append(ecosystem)
+        # shards run in parallel
+        merged["duration"] = max(merged["duration"], summary["duration"])
+        for report, report_summary in summary["reports"].items():
+            merged_report = merged["reports"].setdefault(report, {"rows": 0, "columns": {}})
+            merged_report["rows"] += report_summary["rows"]
+            for name, counts in report_summary["columns"].items():
+                merged_counts = merged_report["columns"].setdefault(name, {})
+                for value, count in counts.items():
+                    merged_counts[value] = merged_counts.get(value, 0) + count
+    return merged
+
+
+def merge_report(report, key_columns, count, ecosystems):
+    """Merge rows from all shards into one report, rows are ordered as by one process."""
+    header = None
+    rows = []
+    for index in range(count):
+        with open(Shard(index, count).filename(report)) as fin:
+            reader = csv.reader(fin)
+            header = next(reader)
+            rows.extend(reader)
+
+    # ecosystems are checked in the given order, packages (and versions) are sorted
+    def order(row):
+        ecosystem = row[0]
+        rank = ecosystems.index(ecosystem) if ecosystem in ecosystems else len(ecosystems)
+        return (rank, listing_order(row[1])) + tuple(row[2:key_columns])
+    rows.sort(key=order)
+
+    with open(report, "w") as fout:
+        writer = csv.writer(fout)
+        writer.writerow(header)
+        writer.writerows(rows)
+    logging.info("{n} rows from {c} shards merged into {r}".format(n=len(rows), c=count,
+                                                                   r=report))
+
+
+def merge_cost_report(count):
+    """Merge the validation cost measured by all shards."""
+    stats = ValidationStats()
+    for index in range(count):
+        with open(Shard(index, count).filename(COST_REPORT)) as fin:
+            reader = csv.reader(fin)
+            next(reader)
+            for name, objects, seconds, _ in reader:
+                stats.merge({name: int(objects)}, {name: float(seconds)})
+    stats.export_into_csv(COST_REPORT)
+
+
+def merge_shards(count, ecosystems):
+    """Merge reports and summaries written by all N shards, all of them need to exist.
+
+    The ecosystems determine the order of rows for ecosystems not known by shard summaries.
+    """
+    summary_files = [Shard(index, count).filename(SUMMARY) for index in range(count)]
+    missing = [filename for filename in summary_files if not os.path.exists(filename)]
+    assert not missing, "Summaries of the following shards are missing: {m}".format(
+        m=", ".join(missing))
+
+    summaries = []
+    for filename in summary_files:
+        with open(filename) as fin:
+            summaries.append(json.load(fin))
+
+    # the order of ecosystems used by the shards (they all use the same command line)
+    ecosystems = summaries[0]["ecosystems"] + [e for e in ecosystems
+                                               if e not in summaries[0]["ecosystems"]]
+
+    merged = merge_summaries(summaries)
+    for report, key_columns in REPORTS.items():
+        if report in merged["reports"]:
+            merge_report(report, key_columns, count, ecosystems)
+    if all(os.path.exists(Shard(index, count).filename(COST_REPORT)) for index in range(count)):
+        merge_cost_report(count)
+
+    with open(SUMMARY, "w") as fout:
+        json.dump(merged, fout, indent=4)
+    for report, report_summary in sorted(merged["reports"].items()):
+        failed = sum(counts.get("failed", 0) for counts in report_summary["columns"].values())
+        logging.info("{r}: {n} rows, {f} failed checks".format(r=report,
+                                                               n=report_summary["rows"],
+                                                               f=failed))
+    return merged
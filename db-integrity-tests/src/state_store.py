@@ -0,0 +1,84 @@
+"""Persistent store of verdicts of checks performed for objects stored in S3.
+
+The verdict is stored together with the ETag and the last modification time of the
+checked object. The next run reuses the verdict when the ETag has not been changed,
+so only new and changed objects need to be read and checked again.
+"""
+
+import logging
+import sqlite3
+import threading
+
+# number of changes that are committed together
+COMMIT_INTERVAL = 1000
+
+
+class StateStore:
+    """Persistent (SQLite) store of verdicts of checks performed for objects stored in S3."""
+
+    def __init__(self, filename, refresh=False):
+        """Open (or create) the database, cached verdicts are not used when refresh is set."""
+        self.filename = filename
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._uncommitted = 0
+        self._lock = threading.Lock()
+        # the connection is shared by all checking threads, access is guarded by the lock
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS verdicts (
+                bucket TEXT NOT NULL,
+                key TEXT NOT NULL,
+                check_name TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                verdict TEXT,
+                PRIMARY KEY (bucket, key, check_name))""")
+        self.connection.commit()
+
+    def __enter__(self):
+        """Use the store as context manager."""
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        """Store all changes and close the database."""
+        self.close()
+
+    def read_verdict(self, bucket, key, check_name, etag):
+        """Return the verdict stored for the object if its ETag has not been changed."""
+        if self.refresh:
+            self.misses += 1
+            return None
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT etag, verdict FROM verdicts "
+                "WHERE bucket = ? AND key = ? AND check_name = ?",
+                (bucket, key, check_name)).fetchone()
+            if row is None or etag is None or row[0] != etag:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[1]
+
+    def store_verdict(self, bucket, key, check_name, etag, last_modified, verdict):
+        """Store the verdict for the object with given ETag."""
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO verdicts "
+                "(bucket, key, check_name, etag, last_modified, verdict) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (bucket, key, check_name, etag,
+                 str(last_modified) if last_modified is not None else None, verdict))
+            self._uncommitted += 1
+            if self._uncommitted >= COMMIT_INTERVAL:
+                self.connection.commit()
+                self._uncommitted = 0
+
+    def close(self):
+        """Store all changes and close the database."""
+        with self._lock:
+            self.connection.commit()
+            self.connection.close()
+        logging.info("State store {f}: {h} cached verdicts used, {m} objects checked".format(
+            f=self.filename, h=self.hits, m=self.misses))
@@ -9,6 +9,15 @@ def store_list(filename, a_list):
             fout.write("\n")
 
 
+def store_while_iterating(filename, items):
+    """Yield all items and store them into a file, one per line, as they are consumed."""
+    with open(filename, "w") as fout:
+        for item in items:
+            fout.write(item)
+            fout.write("\n")
+            yield item
+
+
 def read_list(filename):
     """Read list from file."""
     with open(filename, "r") as fin:
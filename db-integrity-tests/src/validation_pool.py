@@ -0,0 +1,194 @@
+"""Two-stage checking of objects stored in S3: threads read the objects, processes check them.
+
+JSON decoding and validation of objects are CPU-bound and, when performed in the thread
+that read the object, they run under the GIL. With the validation pool, I/O threads only
+read raw objects (and take verdicts of unchanged objects from the state store). Batches
+of read objects are then parsed and checked by the same checkers running in a process
+pool with one process per CPU core by default. Rows for the CSV report are returned in
+the same order as by the sequential check.
+"""
+
+import collections
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from json_stream import read_fields
+from pipeline import ordered_map
+from s3interface import S3Interface
+import validators
+
+DEFAULT_BATCH_SIZE = 32
+
+
+class PrefetchedObjects(S3Interface):
+    """Objects read by I/O threads, used by checkers in the worker process in place of S3."""
+
+    def __init__(self, deployment_prefix, max_object_size, objects, errors):
+        """Initialize the interface, no connection to the S3 is needed."""
+        self._deployment_prefix = deployment_prefix
+        self.max_object_size = max_object_size
+        # key -> raw content of the object
+        self.objects = objects
+        # key -> error raised when the object was read
+        self.errors = errors
+
+    @property
+    def deployment_prefix(self):
+        """Get the deployment prefix of the S3 interface that read the objects."""
+        return self._deployment_prefix
+
+    def read_object(self, bucket_name, key, fields=None):
+        """Parse the object, raise the same error as was raised when the object was read."""
+        if key in self.errors:
+            error = self.errors[key]
+            if isinstance(error, tuple):
+                raise ClientError(*error)
+            raise Exception(error)
+        if key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey",
+                                         "Message": "The key {k} was not read".format(k=key)}},
+                              "GetObject")
+        data = self.objects[key]
+        if fields is not None:
+            return read_fields(io.BytesIO(data), key, fields, self.max_object_size)
+        return json.loads(data)
+
+
+class PrefetchedChecks:
+    """Objects read for one checker by the I/O thread, to be checked in the worker process.
+
+    The row for the CSV report consists of row_prefix, verdicts of checks in the order
+    of check_names, and row_suffix.
+    """
+
+    def __init__(self, checker, check_names, row_prefix=(), row_suffix=(), verdicts=None):
+        """Remember everything needed to construct the same checker in the worker process."""
+        # the checker (with S3 connection, key index, and state store) stays in this process
+        self.checker = checker
+        self.checker_class = type(checker)
+        self.ecosystem = checker.ecosystem
+        self.package_name = checker.package_name
+        self.version = getattr(checker, "version", None)
+        self.deployment_prefix = checker.s3interface.deployment_prefix
+        self.max_object_size = checker.s3interface.max_object_size
+        self.check_names = check_names
+        self.row_prefix = tuple(row_prefix)
+        self.row_suffix = tuple(row_suffix)
+        self.verdicts = dict(verdicts or {})
+        self.objects = {}
+        self.errors = {}
+
+    def __getstate__(self):
+        """Return the state sent to the worker process, without the checker."""
+        state = self.__dict__.copy()
+        state["checker"] = None
+        return state
+
+    def metadata_key(self, check_name):
+        """Return the metadata key used by the check method (see cached_verdict)."""
+        return getattr(self.checker_class, check_name).metadata_key
+
+    def read(self):
+        """Take verdicts from the state store, read raw objects for all other checks."""
+        checker = self.checker
+        for check_name in self.check_names:
+            if check_name in self.verdicts:
+                continue
+            metadata_key = self.metadata_key(check_name)
+            verdict = checker.read_cached_verdict(check_name, metadata_key)
+            if verdict is not None:
+                self.verdicts[check_name] = verdict
+                continue
+            key = checker.object_key(metadata_key)
+            try:
+                self.objects[key] = checker.read_raw_object(checker.BUCKET_NAME, key)
+            except ClientError as e:
+                # exceptions can't be sent to other process reliably
+                self.errors[key] = (e.response, e.operation_name)
+            except Exception as e:
+                self.errors[key] = str(e)
+        return self
+
+    def check(self):
+        """Perform all remaining checks, to be called in the worker process."""
+        objects = PrefetchedObjects(self.deployment_prefix, self.max_object_size,
+                                    self.objects, self.errors)
+        checker = self.checker_class(objects, self.ecosystem, self.package_name)
+        if self.version is not None:
+            checker.version = self.version
+        return {check_name: getattr(checker, check_name)() for check_name in self.check_names
+                if check_name not in self.verdicts}
+
+    def row(self, verdicts):
+        """Store verdicts returned by the worker process, return the row for the CSV report."""
+        for check_name, verdict in verdicts.items():
+            self.checker.store_verdict(check_name, self.metadata_key(check_name), verdict)
+        self.verdicts.update(verdicts)
+        return self.row_prefix + tuple(self.verdicts[check_name]
+                                       for check_name in self.check_names) + self.row_suffix
+
+
+def check_batch(batch):
+    """Perform checks for the batch of read objects in the worker process."""
+    verdicts = [prefetched.check() for prefetched in batch]
+    # validation cost measured in this process needs to be sent to the main process
+    return verdicts, validators.validation_stats.pop()
+
+
+def batches(items, batch_size):
+    """Split the items into lists of batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class ValidationPool:
+    """Process pool that parses and checks objects read by I/O threads."""
+
+    def __init__(self, processes=None, batch_size=DEFAULT_BATCH_SIZE):
+        """Initialize the pool, by default with one process per CPU core."""
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        # worker processes are not forked, as forking is not safe with running I/O threads
+        self.executor = ProcessPoolExecutor(max_workers=self.processes,
+                                            mp_context=multiprocessing.get_context("spawn"))
+
+    def __enter__(self):
+        """Use the pool as context manager."""
+        return self
+
+    def __exit__(self, _type, _value, _traceback):
+        """Stop all worker processes."""
+        self.close()
+
+    def close(self):
+        """Stop all worker processes."""
+        self.executor.shutdown()
+
+    def rows(self, prefetched_items):
+        """Check the read objects in batches, yield rows in the order of prefetched items."""
+        # batches sent to the worker processes, results are returned in the same order
+        sent = collections.deque()
+
+        def send(prefetched_batches):
+            for batch in prefetched_batches:
+                sent.append(batch)
+                yield batch
+
+        # two batches per process, so the next one is ready when the process is done
+        results = ordered_map(check_batch, send(batches(prefetched_items, self.batch_size)),
+                              2 * self.processes, self.executor)
+        for verdicts, (objects, seconds) in results:
+            validators.validation_stats.merge(objects, seconds)
+            for prefetched, prefetched_verdicts in zip(sent.popleft(), verdicts):
+                yield prefetched.row(prefetched_verdicts)
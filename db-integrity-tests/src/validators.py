@@ -0,0 +1,318 @@
+"""Declarative validation rules for component and package analyses.
+
+Rules for each analysis type are declared once (see COMPONENT_RULES and PACKAGE_RULES)
+and compiled into a validator function when this module is imported. The validator
+raises AssertionError with the same messages as the hand-written checks in the Checker
+class did, but the messages are constructed only when the validation fails, and
+timestamps are checked by a regular expression instead of strptime.
+
+Validation cost is measured per object and analysis type, see ValidationStats.
+"""
+
+import calendar
+import csv
+import re
+import threading
+import time
+
+from checker import Checker
+
+TIMESTAMP = re.compile(r"(\d{4})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])[T ]"
+                       r"([01]\d|2[0-3]):[0-5]\d:[0-5]\d(\.\d{1,6})?")
+
+_checker = Checker()
+
+
+def resolve(data, path):
+    """Return the node on given path (sequence of attribute names)."""
+    for name in path:
+        data = data[name]
+    return data
+
+
+def check_timestamp(timestamp):
+    """Check the timestamp, the slow (strptime based) check is used for unusual values only."""
+    if type(timestamp) is str:
+        match = TIMESTAMP.fullmatch(timestamp)
+        if match is not None:
+            year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+            if day <= 28 or day <= calendar.monthrange(year, month)[1]:
+                return
+    # not matched by the regular expression -> let the original check decide
+    # and construct the error message
+    _checker.check_timestamp(timestamp)
+
+
+def contains(node, name):
+    """Check the attribute presence in the given dictionary or list."""
+    if type(node) is not dict and type(node) is not list:
+        # fail with the same error as Checker.check_attribute_presence
+        node.keys()
+    return name in node
+
+
+def missing_attribute_message(node, name):
+    """Construct the same message as Checker.check_attribute_presence."""
+    found_attributes = node if type(node) is list else node.keys()
+    return "'%s' attribute is expected in the node, " \
+           "found: %s attributes " % (name, ", ".join(found_attributes))
+
+
+# rule constructors, each rule is compiled into function(data, context)
+
+def present(*names, path=()):
+    """Attributes need to be present in the node on given path."""
+    def rule(data, context):
+        node = resolve(data, path)
+        for name in names:
+            if not contains(node, name):
+                raise AssertionError(missing_attribute_message(node, name))
+    return rule
+
+
+def timestamp(name, path=()):
+    """Attribute needs to be present and contain the timestamp."""
+    def rule(data, context):
+        node = resolve(data, path)
+        if not contains(node, name):
+            raise AssertionError(missing_attribute_message(node, name))
+        check_timestamp(node[name])
+    return rule
+
+
+def equals(name, expected, message=None, path=()):
+    """Attribute needs to be present and have the expected value (or value from context)."""
+    def rule(data, context):
+        node = resolve(data, path)
+        if not contains(node, name):
+            raise AssertionError(missing_attribute_message(node, name))
+        value = node[name]
+        expected_value = expected(context) if callable(expected) else expected
+        if value != expected_value:
+            if message is None:
+                raise AssertionError()
+            raise AssertionError(message.format(actual=value, expected=expected_value))
+    return rule
+
+
+def one_of(name, allowed, path=()):
+    """Attribute needs to be present and have one of allowed values."""
+    def rule(data, context):
+        node = resolve(data, path)
+        if not contains(node, name):
+            raise AssertionError(missing_attribute_message(node, name))
+        if node[name] not in allowed:
+            raise AssertionError()
+    return rule
+
+
+def truthy(name, path=()):
+    """Attribute needs to be present and must not be empty."""
+    def rule(data, context):
+        if not resolve(data, path)[name]:
+            raise AssertionError()
+    return rule
+
+
+def sized(name, path=()):
+    """Attribute needs to be a container (or string)."""
+    def rule(data, context):
+        len(resolve(data, path)[name])
+    return rule
+
+
+def is_list(name, path=()):
+    """Attribute needs to be a list (might be skipped by the streaming parser)."""
+    def rule(data, context):
+        if not Checker.is_list(resolve(data, path)[name]):
+            raise AssertionError()
+    return rule
+
+
+def non_negative_int(name, path=()):
+    """Attribute needs to be present and contain non-negative integer."""
+    def rule(data, context):
+        node = resolve(data, path)
+        if not contains(node, name):
+            raise AssertionError(missing_attribute_message(node, name))
+        if int(node[name]) < 0:
+            raise AssertionError()
+    return rule
+
+
+def each_cve(name, path=()):
+    """All items in the list need to be CVE identifiers."""
+    def rule(data, context):
+        for cve in resolve(data, path)[name]:
+            _checker.check_cve_value(cve)
+    return rule
+
+
+def audit():
+    """Check the metadata stored in the _audit attribute."""
+    return [present("_audit"),
+            equals("version", "v1", path=("_audit",)),
+            timestamp("started_at", path=("_audit",)),
+            timestamp("ended_at", path=("_audit",))]
+
+
+def release():
+    """Check the content of _release attribute against the ecosystem, package, and version."""
+    return [equals("_release", lambda context: context["release"])]
+
+
+def status():
+    """Check the value of the status attribute, only two values are allowed."""
+    return [one_of("status", ("success", "error"))]
+
+
+def schema(name, version):
+    """Check the name and version stored in the schema attribute."""
+    return [present("schema"),
+            present("name", path=("schema",)),
+            present("version", path=("schema",)),
+            equals("name", name, "Schema name '{actual}' is different from "
+                   "expected name '{expected}'", path=("schema",)),
+            equals("version", version, "Schema version {actual} is different from "
+                   "expected version {expected}", path=("schema",))]
+
+
+def analysis(*rules):
+    """Check _audit, _release, and status attributes, then the given rules."""
+    return audit() + release() + status() + flatten(rules)
+
+
+def flatten(rules):
+    """Flatten the list of rules and lists of rules."""
+    result = []
+    for rule in rules:
+        if isinstance(rule, list):
+            result.extend(rule)
+        else:
+            result.append(rule)
+    return result
+
+
+COMPONENT_RULES = {
+    "core_data": [
+        timestamp("started_at"),
+        timestamp("finished_at"),
+        equals("ecosystem", lambda context: context["ecosystem"],
+               "Ecosystem {actual} differs from expected ecosystem {expected}"),
+        equals("package", lambda context: context["package"],
+               "Package {actual} differs from expected package {expected}"),
+        equals("version", lambda context: context["version"],
+               "Version {actual} differs from expected version {expected}"),
+        present("id", "analyses", "audit", "dependents_count", "latest_version",
+                "package_info", "subtasks")],
+    "code_metrics": analysis(
+        present("details", "schema", "summary"),
+        present("blank_lines", "code_lines", "comment_lines", "total_files", "total_lines",
+                path=("summary",)),
+        truthy("details")),
+    "dependency_snapshot": analysis(
+        schema("dependency_snapshot", "1-0-0"),
+        present("summary"),
+        present("dependency_counts", "errors", path=("summary",)),
+        non_negative_int("runtime", path=("summary", "dependency_counts"))),
+    "digests": analysis(
+        schema("digests", "1-0-0"),
+        present("details", "summary"),
+        sized("details")),
+    "keywords_tagging": analysis(
+        present("details", "summary")),
+    "metadata": analysis(
+        present("details", "summary", "schema"),
+        schema("metadata", "3-2-0"),
+        truthy("details")),
+    "security_issues": analysis(
+        schema("security_issues", "3-0-1"),
+        present("details", "summary", "schema"),
+        is_list("details"),
+        each_cve("summary")),
+    "source_licenses": analysis(
+        schema("source_licenses", "3-0-0"),
+        present("details", "summary", "schema")),
+}
+
+PACKAGE_RULES = {
+    "core_json": [
+        present("id", "package_id", "started_at", "finished_at")],
+    "github_details": analysis(
+        present("summary", "details"),
+        schema("github_details", "2-0-1")),
+    "keywords_tagging": analysis(
+        present("details"),
+        present("package_name", "repository_description", path=("details",))),
+    "libraries_io": analysis(),
+    "git_stats": analysis(
+        present("details"),
+        present("master", path=("details",))),
+}
+
+
+class ValidationStats:
+    """Number of validated objects and time spent by validation per analysis type."""
+
+    def __init__(self):
+        """Initialize empty statistic."""
+        self.objects = {}
+        self.seconds = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        """Add one validated object."""
+        with self._lock:
+            self.objects[name] = self.objects.get(name, 0) + 1
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def pop(self):
+        """Return the number of objects and time per analysis type, then reset the statistic.
+
+        Used to send the statistic from worker processes to the main process.
+        """
+        with self._lock:
+            objects, seconds = self.objects, self.seconds
+            self.objects, self.seconds = {}, {}
+        return objects, seconds
+
+    def merge(self, objects, seconds):
+        """Add the statistic returned by pop()."""
+        with self._lock:
+            for name in objects:
+                self.objects[name] = self.objects.get(name, 0) + objects[name]
+                self.seconds[name] = self.seconds.get(name, 0.0) + seconds[name]
+
+    def export_into_csv(self, filename):
+        """Export the validation cost per object into the CSV file."""
+        with open(filename, "w") as fout:
+            writer = csv.writer(fout)
+            writer.writerow(["Analysis", "Objects", "Total time", "Microseconds per object"])
+            for name in sorted(self.objects):
+                writer.writerow([name, self.objects[name], self.seconds[name],
+                                 1e6 * self.seconds[name] / self.objects[name]])
+
+
+validation_stats = ValidationStats()
+
+
+def compile_rules(prefix, rules):
+    """Compile the list of rules into one validator function."""
+    rules = tuple(flatten(rules))
+    clock = time.perf_counter
+
+    def validator(data, context):
+        start = clock()
+        try:
+            for rule in rules:
+                rule(data, context)
+        finally:
+            validation_stats.add(prefix, clock() - start)
+    return validator
+
+
+COMPONENT_VALIDATORS = {name: compile_rules("component/" + name, rules)
+                        for name, rules in COMPONENT_RULES.items()}
+
+PACKAGE_VALIDATORS = {name: compile_rules("package/" + name, rules)
+                      for name, rules in PACKAGE_RULES.items()}
@@ -13,6 +13,7 @@ import sys
 from urllib.parse import urljoin
 
 from src.s3interface import S3Interface
+from src.s3_client import metrics as s3_metrics
 
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 _REPO_DIR = os.path.dirname(os.path.dirname(_THIS_DIR))
@@ -571,9 +572,11 @@ def before_all(context):
     aws_secret_access_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
     s3_region_name = os.environ.get('S3_REGION_NAME')
     deployment_prefix = os.environ.get('DEPLOYMENT_PREFIX', 'STAGE')
+    # optional, S3 compatible service to be used instead of AWS S3
+    s3_endpoint_url = os.environ.get('S3_ENDPOINT_URL') or None
 
     context.s3interface = S3Interface(aws_access_key_id, aws_secret_access_key,
-                                      s3_region_name, deployment_prefix)
+                                      s3_region_name, deployment_prefix, s3_endpoint_url)
 
     context.client = None
 
@@ -651,6 +654,9 @@ def after_scenario(context, scenario):
 @capture
 def after_all(context):
     """Perform the cleanup after the last event."""
+    # request rate, latency, and throttling of all S3 requests sent by tests
+    for line in s3_metrics.summary():
+        print(line)
     if context.running_locally:
         try:
             _teardown_system(context)
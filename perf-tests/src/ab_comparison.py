@@ -0,0 +1,170 @@
+"""Interleaved A/B comparison of two deployments (for example stage and production).
+
+Identical requests are sent to both deployments in pairs, the order within each pair is
+randomized. Backend noise that changes slowly over time (time of day, other load) then
+affects both deployments in the same way and it is cancelled in the paired differences.
+"""
+
+import csv
+import math
+import random
+import time
+
+import latency_stats
+import outcomes
+from benchmarks import call_and_check
+from scenarios import SCENARIOS
+
+# two-sided 95% critical values of Student's t-distribution for 1..30 degrees of freedom
+T_CRITICAL_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+Z_CRITICAL_95 = 1.960
+
+BOOTSTRAP_RESAMPLES = 2000
+
+
+def timed_call(function_to_call, check_function, i):
+    """Call the function once and return its duration and outcome."""
+    t1 = time.time()
+    retval, exception, check_passed = call_and_check(function_to_call, check_function, i, None)
+    delta = time.time() - t1
+    if exception is None:
+        return delta, outcomes.outcome_for_result(retval, check_passed)
+    return delta, outcomes.outcome_for_exception(exception)
+
+
+def run_interleaved(call_a, call_b, check_function, pairs, pause_time, rng):
+    """Call both deployments in randomized order and return list of measured pairs."""
+    measured = []
+    for i in range(pairs):
+        b_first = rng.random() < 0.5
+        if b_first:
+            delta_b, outcome_b = timed_call(call_b, check_function, i)
+            delta_a, outcome_a = timed_call(call_a, check_function, i)
+        else:
+            delta_a, outcome_a = timed_call(call_a, check_function, i)
+            delta_b, outcome_b = timed_call(call_b, check_function, i)
+        print("    #{i}    A: {a} ({oa})    B: {b} ({ob})".format(i=i + 1, a=delta_a, b=delta_b,
+                                                                  oa=outcome_a, ob=outcome_b))
+        measured.append({
+            "pair": i,
+            "order": "BA" if b_first else "AB",
+            "delta_a": delta_a,
+            "outcome_a": outcome_a,
+            "delta_b": delta_b,
+            "outcome_b": outcome_b})
+        time.sleep(pause_time)
+    return measured
+
+
+def paired_differences(measured):
+    """Compute differences B-A for pairs where both calls ended successfully."""
+    return [m["delta_b"] - m["delta_a"] for m in measured
+            if m["outcome_a"] == outcomes.OUTCOME_SUCCESS and
+            m["outcome_b"] == outcomes.OUTCOME_SUCCESS]
+
+
+def t_critical_95(degrees_of_freedom):
+    """Return the two-sided 95% critical value for given degrees of freedom."""
+    if degrees_of_freedom <= len(T_CRITICAL_95):
+        return T_CRITICAL_95[degrees_of_freedom - 1]
+    return Z_CRITICAL_95
+
+
+def mean_confidence_interval(differences):
+    """Compute the mean of differences and its 95% confidence interval (paired t-test)."""
+    n = len(differences)
+    mean = latency_stats.mean(differences)
+    if n < 2:
+        return mean, float("nan"), float("nan")
+    variance = sum((d - mean) ** 2 for d in differences) / (n - 1)
+    margin = t_critical_95(n - 1) * math.sqrt(variance / n)
+    return mean, mean - margin, mean + margin
+
+
+def median_confidence_interval(differences, rng, resamples=BOOTSTRAP_RESAMPLES):
+    """Compute the median of differences and its 95% bootstrap (percentile) confidence interval.
+
+    The median is not sensitive to occasional outliers that are common in latencies.
+    """
+    median = latency_stats.percentile(differences, 50)
+    if len(differences) < 2:
+        return median, float("nan"), float("nan")
+    medians = sorted(latency_stats.percentile([rng.choice(differences) for _ in differences], 50)
+                     for _ in range(resamples))
+    return median, medians[int(0.025 * resamples)], medians[int(0.975 * resamples) - 1]
+
+
+def verdict(low, high):
+    """Interpret the confidence interval of differences B-A."""
+    if high < 0:
+        return "B is faster than A"
+    if low > 0:
+        return "B is slower than A"
+    return "no significant difference"
+
+
+def compute_comparison(measured, rng):
+    """Compute the statistic for all measured pairs."""
+    differences = paired_differences(measured)
+    mean, mean_low, mean_high = mean_confidence_interval(differences)
+    median, median_low, median_high = median_confidence_interval(differences, rng)
+    successful_a = [m["delta_a"] for m in measured if m["outcome_a"] == outcomes.OUTCOME_SUCCESS]
+    return {
+        "pairs": len(measured),
+        "valid_pairs": len(differences),
+        "errors_a": sum(1 for m in measured if m["outcome_a"] != outcomes.OUTCOME_SUCCESS),
+        "errors_b": sum(1 for m in measured if m["outcome_b"] != outcomes.OUTCOME_SUCCESS),
+        "mean_a": latency_stats.mean(successful_a),
+        "mean_difference": mean,
+        "mean_low": mean_low,
+        "mean_high": mean_high,
+        "median_difference": median,
+        "median_low": median_low,
+        "median_high": median_high,
+        "verdict": verdict(mean_low, mean_high)}
+
+
+def export_comparison_into_csv(name, measured, comparison):
+    """Export all measured pairs and the computed statistic into CSV files."""
+    with open(name + "_pairs.csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Pair", "Order", "A duration", "A outcome", "B duration",
+                             "B outcome"])
+        for m in measured:
+            csv_writer.writerow([m["pair"], m["order"], m["delta_a"], m["outcome_a"],
+                                 m["delta_b"], m["outcome_b"]])
+
+    with open(name + ".csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        for key, value in comparison.items():
+            csv_writer.writerow([key, value])
+
+
+def run_ab_comparison(core_api_a, core_api_b, scenario, pairs, pause_time, seed=None):
+    """Compare two deployments by interleaved calls of the selected scenario."""
+    call = SCENARIOS[scenario]["call"]
+    check = SCENARIOS[scenario]["check"]
+    rng = random.Random(seed)
+
+    print("A/B comparison for {s}".format(s=scenario))
+    print("    A: {u}".format(u=core_api_a.url))
+    print("    B: {u}".format(u=core_api_b.url))
+
+    measured = run_interleaved(lambda i: call(core_api_a, i), lambda i: call(core_api_b, i),
+                               check, pairs, pause_time, rng)
+    comparison = compute_comparison(measured, rng)
+
+    print("valid pairs: {v}/{p}".format(v=comparison["valid_pairs"], p=comparison["pairs"]))
+    print("errors: A {a}  B {b}".format(a=comparison["errors_a"], b=comparison["errors_b"]))
+    print("mean difference B-A:   {m} s  (95% CI {l} .. {h})".format(
+        m=comparison["mean_difference"], l=comparison["mean_low"], h=comparison["mean_high"]))
+    print("median difference B-A: {m} s  (95% CI {l} .. {h})".format(
+        m=comparison["median_difference"], l=comparison["median_low"],
+        h=comparison["median_high"]))
+    print("verdict: {v}".format(v=comparison["verdict"]))
+
+    name = "ab_comparison_{s}".format(s=scenario.replace("-", "_"))
+    export_comparison_into_csv(name, measured, comparison)
+    return comparison
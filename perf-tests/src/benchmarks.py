@@ -3,51 +3,99 @@
 import time
 import datetime
 
+import outcomes
 
-def measure(function_to_call, check_function, measurement_count, pause_time, thread_id, s3=None):
+
+def call_and_check(function_to_call, check_function, i, s3):
+    """Call the provided callback function once, then check its result.
+
+    Return the value returned by callback function, the exception thrown by it (if any),
+    and flag whether the check passed.
+    """
+    try:
+        if s3 is None:
+            retval = function_to_call(i)
+        else:
+            retval = function_to_call(i, s3)
+    except Exception as e:
+        return None, e, False
+
+    try:
+        check_passed = bool(check_function(retval))
+    except Exception:
+        check_passed = False
+    return retval, None, check_passed
+
+
+def measure(function_to_call, check_function, measurement_count, pause_time, thread_id, s3=None,
+            recorder=None, first_measurement=0):
     """Call the provided callback function repeatedly.
 
     Repeatedly call the provided callback function, then check results by provided check function,
     accumulate results and return them.
+
+    Every attempt is recorded together with its outcome (success, HTTP code, exception, timeout).
+    Sequenced calls (ie. calls without thread_id) still stop on the first failed attempt.
+
+    When the recorder is provided, attempts are passed to it and are not accumulated, so the
+    memory used by long running measurements stays constant.
+
+    Measurements are numbered from first_measurement, so attempts measured by repeated calls
+    can be told apart.
     """
     measurements = []
     debug = []
-    for i in range(measurement_count):
+    last_measurement = first_measurement + measurement_count
+    for i in range(first_measurement, last_measurement):
         t1 = time.time()
+        cpu_t1 = time.thread_time()
         started_at = datetime.datetime.utcnow()
 
-        if s3 is None:
-            retval = function_to_call(i)
-        else:
-            retval = function_to_call(i, s3)
-
-        print("Return value: ", retval)
-
-        # let's ignore retval for concurrent calls (ATM)
-        if thread_id is None:
-            assert check_function(retval)
+        retval, exception, check_passed = call_and_check(function_to_call, check_function, i, s3)
 
         t2 = time.time()
+        # CPU time consumed by the client (this thread) during the call
+        cpu_time = time.thread_time() - cpu_t1
         finished_at = datetime.datetime.utcnow()
 
+        if exception is None:
+            print("Return value: ", retval)
+            outcome = outcomes.outcome_for_result(retval, check_passed)
+        else:
+            print("Exception: ", repr(exception))
+            outcome = outcomes.outcome_for_exception(exception)
+
+        # failures in concurrent calls are just recorded, sequenced calls are stopped
+        if thread_id is None:
+            if exception is not None:
+                raise exception
+            assert check_passed
+
         delta = t2 - t1
         if thread_id is not None:
-            print("    thread: #{t}    call {i}/{m}    {delta}".format(t=thread_id,
-                                                                       i=i + 1,
-                                                                       delta=delta,
-                                                                       m=measurement_count))
+            print("    thread: #{t}    call {i}/{m}    {delta}    {o}".format(
+                t=thread_id, i=i + 1, delta=delta, m=last_measurement, o=outcome))
         else:
             print("    #{i}    {delta}".format(i=i + 1, delta=delta))
 
-        measurements.append({
+        measurement = {
             "measurement_number": i,
+            "thread_id": thread_id,
             "started_at": started_at,
             "finished_at": finished_at,
-            "delta": delta})
-
-        # we can store debug data taken from the stack analysis
-        if "debug" in retval:
-            debug.append(retval["debug"])
+            "delta": delta,
+            "cpu_time": cpu_time,
+            "outcome": outcome,
+            "status_code": outcomes.http_status_code(retval),
+            "exception": type(exception).__name__ if exception is not None else None}
+
+        if recorder is not None:
+            recorder.record(measurement)
+        else:
+            measurements.append(measurement)
+            # we can store debug data taken from the stack analysis
+            if isinstance(retval, dict) and "debug" in retval:
+                debug.append(retval["debug"])
 
         time.sleep(pause_time)
 
@@ -0,0 +1,141 @@
+"""Benchmark that compares scheduling of one component per request with batched scheduling.
+
+The same number of components is scheduled via the flow-scheduling endpoint of the jobs API
+for each batch size (number of components packed into one request). Flows scheduled per
+second are computed, then the S3 database is polled to find out how quickly the analyses
+of all scheduled components appear in the core-data bucket.
+"""
+
+import csv
+import datetime
+import itertools
+import time
+
+from botocore.exceptions import ClientError
+
+import latency_stats
+
+BUCKET = "bayesian-core-data"
+
+
+def split_into_batches(components, batch_size):
+    """Split list of components into batches with given size."""
+    return [components[i:i + batch_size] for i in range(0, len(components), batch_size)]
+
+
+def schedule_batches(jobs_api, batches):
+    """Send all batches to the flow-scheduling endpoint.
+
+    Return request latencies, number of failed requests, and dictionary component ->
+    time when the request with the component was accepted.
+    """
+    latencies = []
+    errors = 0
+    scheduled = {}
+    for batch in batches:
+        t1 = time.time()
+        try:
+            response = jobs_api.start_bulk_component_analysis(batch)
+            accepted = response.status_code == 201
+        except Exception as e:
+            print("    exception: {e}".format(e=repr(e)))
+            accepted = False
+        latencies.append(time.time() - t1)
+
+        if accepted:
+            # LastModified in S3 has one second resolution
+            scheduled_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+            for component in batch:
+                scheduled[component] = scheduled_at
+        else:
+            errors += 1
+    return latencies, errors, scheduled
+
+
+def wait_for_analyses_in_s3(s3, scheduled, timeout, sleep_amount):
+    """Poll the S3 until analyses for all scheduled components are stored there.
+
+    Return dictionary component -> seconds between scheduling and the last modification
+    of the component metadata. Components that did not appear until timeout are not included.
+    """
+    pending = dict(scheduled)
+    appeared = {}
+    deadline = time.time() + timeout
+
+    while pending and time.time() < deadline:
+        for component, scheduled_at in list(pending.items()):
+            ecosystem, package, version = component
+            key = s3.component_key(ecosystem, package, version)
+            try:
+                last_modified = s3.read_object_metadata(BUCKET, key, "LastModified")
+            except ClientError:
+                continue
+            if last_modified >= scheduled_at:
+                appeared[component] = (last_modified - scheduled_at).total_seconds()
+                del pending[component]
+        print("    {a} analyses in S3, {p} pending".format(a=len(appeared), p=len(pending)))
+        if pending:
+            time.sleep(sleep_amount)
+
+    return appeared
+
+
+def run_batch_size(jobs_api, s3, components, batch_size, s3_timeout, sleep_amount):
+    """Schedule all components with the given batch size and compute statistic."""
+    batches = split_into_batches(components, batch_size)
+    print("Batch size {b}: {c} components in {r} requests".format(b=batch_size,
+                                                                  c=len(components),
+                                                                  r=len(batches)))
+    t1 = time.time()
+    latencies, errors, scheduled = schedule_batches(jobs_api, batches)
+    scheduling_time = time.time() - t1
+
+    appeared = wait_for_analyses_in_s3(s3, scheduled, s3_timeout, sleep_amount)
+    in_s3 = list(appeared.values())
+
+    return {
+        "batch_size": batch_size,
+        "components": len(components),
+        "requests": len(batches),
+        "errors": errors,
+        "scheduling_time": scheduling_time,
+        "flows_per_second": len(scheduled) / scheduling_time if scheduling_time > 0 else 0.0,
+        "request_latency": latency_stats.mean(latencies),
+        "in_s3": len(in_s3),
+        "s3_min": min(in_s3) if in_s3 else float("nan"),
+        "s3_avg": latency_stats.mean(in_s3),
+        "s3_max": max(in_s3) if in_s3 else float("nan")}
+
+
+def export_bulk_scheduling_into_csv(name, results):
+    """Export statistic for all batch sizes into the CSV file."""
+    with open(name + ".csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Batch size", "Components", "Requests", "Failed requests",
+                             "Scheduling time", "Flows per second", "Avg request latency",
+                             "Analyses in S3", "Min time to S3", "Avg time to S3",
+                             "Max time to S3"])
+        for r in results:
+            csv_writer.writerow([r["batch_size"], r["components"], r["requests"], r["errors"],
+                                 r["scheduling_time"], r["flows_per_second"],
+                                 r["request_latency"], r["in_s3"], r["s3_min"], r["s3_avg"],
+                                 r["s3_max"]])
+
+
+def run_bulk_scheduling_benchmark(jobs_api, s3, batch_sizes, component_count,
+                                  s3_timeout=3600, sleep_amount=10):
+    """Compare flows scheduled per second and time to S3 for all batch sizes."""
+    print("Bulk flow-scheduling benchmark")
+    s3.connect()
+    results = []
+    for batch_size in batch_sizes:
+        components = list(itertools.islice(jobs_api.componentGeneratorForPypi,
+                                           component_count))
+        result = run_batch_size(jobs_api, s3, components, batch_size, s3_timeout, sleep_amount)
+        print("    {f} flows/s, {a}/{c} analyses in S3, max time to S3 {m} s".format(
+            f=result["flows_per_second"], a=result["in_s3"], c=result["components"],
+            m=result["s3_max"]))
+        results.append(result)
+
+    export_bulk_scheduling_into_csv("bulk_flow_scheduling", results)
+    return results
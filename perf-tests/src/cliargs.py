@@ -2,6 +2,8 @@
 
 import argparse
 
+from scenarios import SCENARIOS, SLA_SCENARIOS
+
 cli_parser = argparse.ArgumentParser()
 
 cli_parser.add_argument('-s', '--server-api-benchmark',
@@ -75,3 +77,139 @@ cli_parser.add_argument('--sla',
 cli_parser.add_argument('--manifest',
                         help='manifest file (from the data directory) used for the stack analysis',
                         type=str)
+
+cli_parser.add_argument('--throughput-search',
+                        help='search the maximum arrival rate that satisfies the SLA '
+                             'for the selected scenario',
+                        choices=SLA_SCENARIOS)
+
+cli_parser.add_argument('--rate-min',
+                        help='minimal arrival rate (calls per second) for the throughput search '
+                             '(default=0.1)',
+                        type=float, default=0.1)
+
+cli_parser.add_argument('--rate-max',
+                        help='maximal arrival rate (calls per second) for the throughput search '
+                             '(default=10)',
+                        type=float, default=10.0)
+
+cli_parser.add_argument('--rate-precision',
+                        help='precision of the throughput search in calls per second '
+                             '(default=0.1)',
+                        type=float, default=0.1)
+
+cli_parser.add_argument('--rate-window',
+                        help='steady-state window in seconds for which each rate is held '
+                             '(default=60)',
+                        type=float, default=60.0)
+
+cli_parser.add_argument('--rate-warmup',
+                        help='warmup period in seconds ignored for each rate (default=10)',
+                        type=float, default=10.0)
+
+cli_parser.add_argument('--max-error-rate',
+                        help='maximal error rate accepted by the throughput search '
+                             '(default=0.01)',
+                        type=float, default=0.01)
+
+cli_parser.add_argument('--sla-file',
+                        help='file with SLA thresholds (default=dashboard/src/sla.py)',
+                        type=str)
+
+cli_parser.add_argument('--ab-compare',
+                        help='compare deployment A (F8A_API_URL) with deployment B '
+                             '(F8A_API_URL_B) by interleaved calls of the selected scenario',
+                        choices=SLA_SCENARIOS)
+
+cli_parser.add_argument('--ab-pairs',
+                        help='number of call pairs for the A/B comparison (default=30)',
+                        type=int, default=30)
+
+cli_parser.add_argument('--ab-pause',
+                        help='pause in seconds between call pairs for the A/B comparison '
+                             '(default=1)',
+                        type=float, default=1.0)
+
+cli_parser.add_argument('--seed',
+                        help='seed for the random number generator (order of calls etc.)',
+                        type=int)
+
+cli_parser.add_argument('--suite',
+                        help='run benchmarks defined in the suite file (YAML or TOML), '
+                             'see the suites directory for examples',
+                        type=str)
+
+cli_parser.add_argument('--gremlin-fanout-benchmark',
+                        help='run benchmark that measures how graph traversals scale with '
+                             'number of package versions',
+                        action='store_true')
+
+cli_parser.add_argument('--fanout-ecosystems',
+                        help='ecosystems used by the fan-out benchmark (default=pypi,npm,maven)',
+                        type=str, default='pypi,npm,maven')
+
+cli_parser.add_argument('--fanout-sample',
+                        help='number of packages per ecosystem read from the graph in addition '
+                             'to known candidates for the fan-out benchmark (default=100)',
+                        type=int, default=100)
+
+cli_parser.add_argument('--bulk-scheduling-benchmark',
+                        help='compare scheduling one component per flow-scheduling request '
+                             'with scheduling more components in one request',
+                        action='store_true')
+
+cli_parser.add_argument('--bulk-batch-sizes',
+                        help='comma separated list of batch sizes for the bulk scheduling '
+                             'benchmark (default=1,5,10,25,50)',
+                        type=str, default='1,5,10,25,50')
+
+cli_parser.add_argument('--bulk-components',
+                        help='number of components scheduled for each batch size (default=50)',
+                        type=int, default=50)
+
+cli_parser.add_argument('--bulk-s3-timeout',
+                        help='timeout in seconds for waiting to analyses in S3 (default=3600)',
+                        type=int, default=3600)
+
+cli_parser.add_argument('--soak',
+                        help='run long running (soak) test of the selected scenario with '
+                             'rolling latency statistic computed in constant memory',
+                        choices=sorted(SCENARIOS))
+
+cli_parser.add_argument('--soak-duration',
+                        help='duration of the soak test in seconds (default=86400)',
+                        type=int, default=86400)
+
+cli_parser.add_argument('--soak-window',
+                        help='length of the time window for rolling statistic in seconds '
+                             '(default=60)',
+                        type=int, default=60)
+
+cli_parser.add_argument('--soak-threads',
+                        help='number of threads calling the scenario in the soak test '
+                             '(default=1)',
+                        type=int, default=1)
+
+cli_parser.add_argument('--soak-pause',
+                        help='pause in seconds between calls in one thread for the soak test '
+                             '(default=1)',
+                        type=float, default=1.0)
+
+cli_parser.add_argument('--profile',
+                        help='sample stacks of the client threads during the benchmarks and '
+                             'store them into PROFILE.folded file (flamegraph format)',
+                        type=str)
+
+cli_parser.add_argument('--profile-interval',
+                        help='sampling interval of the client profiler in seconds '
+                             '(default=0.01)',
+                        type=float, default=0.01)
+
+cli_parser.add_argument('--export-trace',
+                        help='measure stack and component analyses and store client, API, '
+                             'and worker timings into EXPORT_TRACE.json (Chrome trace format)',
+                        type=str)
+
+cli_parser.add_argument('--trace-count',
+                        help='number of stack and component analyses in the trace (default=5)',
+                        type=int, default=5)
@@ -107,8 +107,9 @@ class CoreApi(Api):
         endpoint = self.url + 'api/v1/stack-analyses'
         response = requests.post(endpoint, files=files, headers=self.authorization())
         response.raise_for_status()
-        print(response.json())
-        job_id = response.json().get("id")
+        json_resp = response.json()
+        print(json_resp)
+        job_id = json_resp.get("id")
         print("job ID: " + job_id)
         return job_id
 
@@ -141,7 +142,7 @@ class CoreApi(Api):
                 raise Exception('Bad HTTP status code {c}'.format(c=status_code))
             time.sleep(sleep_amount)
         else:
-            raise Exception('Timeout waiting for the stack analysis results')
+            raise TimeoutError('Timeout waiting for the stack analysis results')
 
     def read_stack_analysis_debug_data(self, job_id, thread_id="", i=0):
         """Read the stack analysis debug data via API."""
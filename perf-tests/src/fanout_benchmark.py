@@ -0,0 +1,159 @@
+"""Benchmark that measures how graph traversals scale with the number of package versions.
+
+Packages with different number of versions (vertex degree) are found by a count() pre-pass
+first. Then the traversal over 'has_version' edges and the valueMap() of all versions are
+measured for each selected package, and the scaling curve latency = a * degree ^ b is fitted.
+"""
+
+import csv
+import math
+import time
+
+import numpy as np
+
+import graph
+import latency_stats
+from gremlin_package_generator import GremlinPackageGenerator
+from gremlin_query import GremlinQuery
+
+# lower bounds of the degree buckets: 1..9, 10..99, 100..999, and 1000+ versions
+DEGREE_BUCKETS = [1, 10, 100, 1000]
+
+TRAVERSALS = {
+    "out_has_version":
+        lambda ecosystem, package: GremlinQuery().has("ecosystem", ecosystem).has(
+            "name", package).out("has_version"),
+    "out_has_version_value_map":
+        lambda ecosystem, package: GremlinQuery().has("ecosystem", ecosystem).has(
+            "name", package).out("has_version").valueMap(),
+}
+
+
+def gremlin_data(response):
+    """Return content of result/data node from the Gremlin response."""
+    response.raise_for_status()
+    return response.json()["result"]["data"]
+
+
+def sample_package_names(gremlin_api, ecosystem, count):
+    """Read names of (any) packages from the selected ecosystem."""
+    if count <= 0:
+        return []
+    query = GremlinQuery().has("ecosystem", ecosystem).limit(count).values("name")
+    return gremlin_data(gremlin_api.post_query(query, print_response=False))
+
+
+def count_versions(gremlin_api, ecosystem, package):
+    """Count number of versions (outgoing 'has_version' edges) of the package."""
+    query = GremlinQuery().has("ecosystem", ecosystem).has("name", package).out(
+        "has_version").count()
+    data = gremlin_data(gremlin_api.post_query(query, print_response=False))
+    return int(data[0]) if data else 0
+
+
+def degree_bucket(degree):
+    """Return the lower bound of the bucket for given degree, or None for zero degree."""
+    bucket = None
+    for lower_bound in DEGREE_BUCKETS:
+        if degree >= lower_bound:
+            bucket = lower_bound
+    return bucket
+
+
+def discover_packages(gremlin_api, ecosystems, sample_count, per_bucket):
+    """Find packages for all degree buckets by the count() pre-pass.
+
+    Return dictionary bucket -> list of (ecosystem, package, degree) tuples.
+    """
+    buckets = {lower_bound: [] for lower_bound in DEGREE_BUCKETS}
+    for ecosystem in ecosystems:
+        candidates = list(GremlinPackageGenerator.FANOUT_CANDIDATES.get(ecosystem, []))
+        for package in sample_package_names(gremlin_api, ecosystem, sample_count):
+            if package not in candidates:
+                candidates.append(package)
+
+        for package in candidates:
+            degree = count_versions(gremlin_api, ecosystem, package)
+            bucket = degree_bucket(degree)
+            print("    {e}/{p}: {d} versions".format(e=ecosystem, p=package, d=degree))
+            if bucket is not None and len(buckets[bucket]) < per_bucket:
+                buckets[bucket].append((ecosystem, package, degree))
+    return buckets
+
+
+def measure_traversal(gremlin_api, query, measurement_count):
+    """Post the query repeatedly, return list of latencies and response size."""
+    deltas = []
+    size = 0
+    for _ in range(measurement_count):
+        t1 = time.time()
+        response = gremlin_api.post_query(query, print_response=False)
+        response.raise_for_status()
+        size = len(response.content)
+        deltas.append(time.time() - t1)
+    return deltas, size
+
+
+def fit_scaling_curve(degrees, latencies):
+    """Fit the curve latency = a * degree ^ b in log-log space, return (a, b)."""
+    if len(set(degrees)) < 2:
+        return float("nan"), float("nan")
+    b, log_a = np.polyfit(np.log(degrees), np.log(latencies), 1)
+    return math.exp(log_a), b
+
+
+def export_fanout_results_into_csv(name, results, fits):
+    """Export all measured traversals and fitted curves into CSV file."""
+    with open(name + ".csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Traversal", "Ecosystem", "Package", "Versions", "Response size",
+                             "Min", "Avg", "P50", "P99", "Max"])
+        for r in results:
+            s = r["statistic"]
+            csv_writer.writerow([r["traversal"], r["ecosystem"], r["package"], r["degree"],
+                                 r["size"], s["min"], s["avg"], s["p50"], s["p99"], s["max"]])
+        csv_writer.writerow([])
+        csv_writer.writerow(["Traversal", "Coefficient a", "Exponent b"])
+        for traversal, (a, b) in fits.items():
+            csv_writer.writerow([traversal, a, b])
+
+
+def run_fanout_benchmark(gremlin_api, ecosystems, measurement_count, sample_count=100,
+                         per_bucket=2):
+    """Run the fan-out scaling benchmark for packages with different number of versions."""
+    print("Gremlin traversal fan-out benchmark")
+    print("Discovering packages with 1, 10, 100, and 1000+ versions")
+    buckets = discover_packages(gremlin_api, ecosystems, sample_count, per_bucket)
+    for lower_bound, packages in sorted(buckets.items()):
+        if not packages:
+            print("Warning: no package with {b}+ versions found".format(b=lower_bound))
+
+    selected = sum((packages for _, packages in sorted(buckets.items())), [])
+
+    results = []
+    fits = {}
+    for traversal, query_builder in sorted(TRAVERSALS.items()):
+        print("Traversal {t}".format(t=traversal))
+        for ecosystem, package, degree in selected:
+            query = query_builder(ecosystem, package)
+            deltas, size = measure_traversal(gremlin_api, query, measurement_count)
+            statistic = latency_stats.latency_statistic(deltas)
+            print("    {e}/{p}: {d} versions, {s} bytes, avg {a} s".format(
+                e=ecosystem, p=package, d=degree, s=size, a=statistic["avg"]))
+            results.append({"traversal": traversal, "ecosystem": ecosystem, "package": package,
+                            "degree": degree, "size": size, "statistic": statistic})
+
+        measured = [r for r in results if r["traversal"] == traversal]
+        degrees = [r["degree"] for r in measured]
+        latencies = [r["statistic"]["p50"] for r in measured]
+        fits[traversal] = fit_scaling_curve(degrees, latencies)
+        print("    fitted curve: latency = {a} * versions ^ {b}".format(a=fits[traversal][0],
+                                                                        b=fits[traversal][1]))
+        if measured:
+            graph.generate_scaling_graph("Scaling of {t} traversal".format(t=traversal),
+                                         "gremlin_fanout_{t}".format(t=traversal),
+                                         degrees, latencies, [r["size"] for r in measured],
+                                         fits[traversal])
+
+    export_fanout_results_into_csv("gremlin_fanout", results, fits)
+    return results, fits
@@ -3,12 +3,19 @@
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 import numpy as np
 
 DEFAULT_WIDTH = 1680
 DEFAULT_HEIGHT = 800
 DPI = 100
 
+# graphs with one bar per call are not readable (and slow) for more measurements
+BAR_GRAPH_LIMIT = 1000
+TIMELINE_POINTS = 2000
+HEATMAP_TIME_BUCKETS = 200
+HEATMAP_LATENCY_BUCKETS = 100
+
 
 def seconds_for_analysis(duration, measurement_type, selector):
     """Get duration for specified measurement type and selector."""
@@ -210,19 +217,189 @@ def create_statistic_graph(title, y_axis_label, labels, min_values, max_values,
     return fig
 
 
+def create_error_rate_graph(title, times, goodputs, error_rates,
+                            width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, dpi=DPI):
+    """Create graph with goodput and error rate over time."""
+    fig, ax1 = plt.subplots(figsize=(1.0 * width / dpi, 1.0 * height / dpi), dpi=dpi)
+
+    ax1.set_xlabel("time (seconds)")
+    ax1.set_ylabel("goodput (successful calls per second)")
+    ax1.grid(True)
+    ax1.plot(times, goodputs, color='green', label='goodput')
+
+    # the error rate is displayed on the second Y axis as it has different units
+    ax2 = ax1.twinx()
+    ax2.set_ylabel("error rate")
+    ax2.set_ylim(0.0, 1.05)
+    ax2.plot(times, error_rates, color='red', label='error rate')
+
+    fig.legend(loc='upper left')
+    fig.suptitle(title)
+    return fig
+
+
+def create_latency_curve_graph(title, rates, avg_values, p50_values, p99_values,
+                               width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, dpi=DPI):
+    """Create graph with latencies measured for different arrival rates."""
+    fig = plt.figure(figsize=(1.0 * width / dpi, 1.0 * height / dpi), dpi=dpi)
+    plt.xlabel("arrival rate (calls per second)")
+    plt.ylabel("seconds")
+    plt.grid(True)
+    plt.plot(rates, avg_values, 'o-', color='orange', label='avg')
+    plt.plot(rates, p50_values, 'o-', color='green', label='p50')
+    plt.plot(rates, p99_values, 'o-', color='red', label='p99')
+    plt.legend(loc='upper left')
+    fig.suptitle(title)
+    return fig
+
+
+def create_scaling_graph(title, degrees, latencies, sizes, fit,
+                         width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, dpi=DPI):
+    """Create log-log graph with latencies and response sizes for different vertex degrees."""
+    fig, ax1 = plt.subplots(figsize=(1.0 * width / dpi, 1.0 * height / dpi), dpi=dpi)
+
+    ax1.set_xscale("log")
+    ax1.set_yscale("log")
+    ax1.set_xlabel("number of versions (vertex degree)")
+    ax1.set_ylabel("median latency (seconds)")
+    ax1.grid(True, which='both', alpha=0.3)
+    ax1.plot(degrees, latencies, 'o', color='red', label='measured latency')
+
+    # fitted curve latency = a * degree ^ b
+    a, b = fit
+    if not np.isnan(a):
+        x = np.logspace(0, np.log10(max(degrees)), 50)
+        ax1.plot(x, a * x ** b, '-', color='orange',
+                 label='fit: {a:.3g} * degree ^ {b:.3g}'.format(a=a, b=b))
+
+    ax2 = ax1.twinx()
+    ax2.set_yscale("log")
+    ax2.set_ylabel("response size (bytes)")
+    ax2.plot(degrees, sizes, 's', color='blue', label='response size')
+
+    fig.legend(loc='upper left')
+    fig.suptitle(title)
+    return fig
+
+
+def lttb_downsample(x, y, threshold=TIMELINE_POINTS):
+    """Downsample the series by Largest-Triangle-Three-Buckets algorithm.
+
+    The first and the last point are kept, and from each bucket the point that forms
+    the largest triangle with the previously selected point and with the average of
+    the next bucket is selected. Peaks (stalls) are therefore preserved.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # bucket boundaries for all points except the first and the last one
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) -
+                       (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return x[selected], y[selected]
+
+
+def latency_histogram(times, latencies, time_buckets=HEATMAP_TIME_BUCKETS,
+                      latency_buckets=HEATMAP_LATENCY_BUCKETS):
+    """Count measurements in time x latency buckets, latency buckets are logarithmic."""
+    times = np.asarray(times, dtype=float)
+    latencies = np.asarray(latencies, dtype=float)
+    positive = latencies[latencies > 0]
+    low = positive.min() if len(positive) else 1e-3
+    high = max(latencies.max(), low * 10)
+    latency_edges = np.logspace(np.log10(low), np.log10(high), latency_buckets + 1)
+    counts, time_edges, latency_edges = np.histogram2d(
+        times, np.clip(latencies, low, high), bins=[time_buckets, latency_edges])
+    return counts, time_edges, latency_edges
+
+
+def create_latency_heatmap(title, x_axis_label, times, latencies,
+                           width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, dpi=DPI):
+    """Create heatmap with number of calls in time x latency buckets."""
+    counts, time_edges, latency_edges = latency_histogram(times, latencies)
+
+    fig, ax = plt.subplots(figsize=(1.0 * width / dpi, 1.0 * height / dpi), dpi=dpi)
+    # empty buckets are not displayed at all
+    mesh = ax.pcolormesh(time_edges, latency_edges, np.ma.masked_equal(counts.T, 0),
+                         cmap="viridis", norm=LogNorm())
+    ax.set_yscale("log")
+    ax.set_xlabel(x_axis_label)
+    ax.set_ylabel("seconds")
+    fig.colorbar(mesh, ax=ax, label="calls")
+    fig.suptitle(title)
+    return fig
+
+
+def create_timeline_graph(title, x_axis_label, x, y, threshold=TIMELINE_POINTS,
+                          width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, dpi=DPI):
+    """Create line graph with (downsampled) durations of calls."""
+    x, y = lttb_downsample(x, y, threshold)
+
+    fig = plt.figure(figsize=(1.0 * width / dpi, 1.0 * height / dpi), dpi=dpi)
+    plt.xlabel(x_axis_label)
+    plt.ylabel("seconds")
+    plt.grid(True, alpha=0.5)
+    plt.plot(x, y, '-', color='blue', linewidth=0.7, label=title)
+    fig.suptitle(title)
+    return fig
+
+
 def save_graph(fig, imageFile, dpi=DPI):
     """Save graph into the raster or vector file."""
     plt.savefig(imageFile, facecolor=fig.get_facecolor(), dpi=dpi)
 
 
 def generate_wait_times_graph(title, name, values):
-    """Generate graph with durations of any measurement(s)."""
+    """Generate graph with durations of any measurement(s).
+
+    For many measurements the downsampled timeline and the heatmap are generated instead
+    of the column graph.
+    """
+    if len(values) > BAR_GRAPH_LIMIT:
+        calls = np.arange(1, 1 + len(values))
+        generate_timeline_graph(title, name, "call #", calls, values)
+        generate_latency_heatmap(title, name + "_heatmap", "call #", calls, values)
+        return
     labels = range(1, 1 + len(values))
     fig = create_graph(title, "seconds", labels, values)
     save_graph(fig, name + ".png")
     plt.close(fig)
 
 
+def generate_timeline_graph(title, name, x_axis_label, x, y):
+    """Generate line graph with (downsampled) durations of calls."""
+    fig = create_timeline_graph(title, x_axis_label, x, y)
+    save_graph(fig, name + ".png")
+    plt.close(fig)
+
+
+def generate_latency_heatmap(title, name, x_axis_label, times, latencies):
+    """Generate heatmap with number of calls in time x latency buckets."""
+    if len(latencies) == 0:
+        return
+    fig = create_latency_heatmap(title, x_axis_label, times, latencies)
+    save_graph(fig, name + ".png")
+    plt.close(fig)
+
+
 def generate_timing_statistic_graph(title, name, pauses, min_times, max_times, avg_times,
                                     width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT):
     """Generate graph with timings of any measurement(s)."""
@@ -243,6 +420,30 @@ def generate_timing_threads_statistic_graph(title, name, threads, min_times, max
     plt.close(fig)
 
 
+def generate_error_rate_graph(title, name, timeline):
+    """Generate graph with goodput and error rate over time."""
+    times = [slot["time"] for slot in timeline]
+    goodputs = [slot["goodput"] for slot in timeline]
+    error_rates = [slot["error_rate"] for slot in timeline]
+    fig = create_error_rate_graph(title, times, goodputs, error_rates)
+    save_graph(fig, name + ".png")
+    plt.close(fig)
+
+
+def generate_latency_curve_graph(title, name, rates, avg_values, p50_values, p99_values):
+    """Generate graph with latencies measured for different arrival rates."""
+    fig = create_latency_curve_graph(title, rates, avg_values, p50_values, p99_values)
+    save_graph(fig, name + ".png")
+    plt.close(fig)
+
+
+def generate_scaling_graph(title, name, degrees, latencies, sizes, fit):
+    """Generate graph with latencies and response sizes for different vertex degrees."""
+    fig = create_scaling_graph(title, degrees, latencies, sizes, fit)
+    save_graph(fig, name + ".png")
+    plt.close(fig)
+
+
 def generate_component_analysis_timing_graph(durations):
     """Generate graph with timings of the component analysis."""
     fig = create_component_analysis_timing_graph(durations)
@@ -85,12 +85,14 @@ class GremlinApi(Api):
         GremlinApi.check_gremlin_status_node(data)
         GremlinApi.check_gremlin_result_node(data)
 
-    def post_query(self, query):
+    def post_query(self, query, print_response=True):
         """Post the already constructed query to the Gremlin."""
         data = {"gremlin": str(query)}
         print(data)
         response = requests.post(self.url, json=data)
-        print(response.json())
+        # large responses are not printed by benchmarks because it would slow down the client
+        if print_response:
+            print(response.json())
         return response
 
     def query_package(self, ecosystem, package):
@@ -126,6 +128,6 @@ class GremlinApi(Api):
             assert data is not None
             self.check_valid_gremlin_response_data(data)
             return True
-        except e:
+        except Exception as e:
             print(e)
             return False
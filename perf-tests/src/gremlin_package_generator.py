@@ -18,6 +18,16 @@ class GremlinPackageGenerator:
         }
     }
 
+    # packages that are expected to have many versions, used as candidates
+    # for the benchmark that measures how traversals scale with vertex degree
+    FANOUT_CANDIDATES = {
+        "pypi": ["clojure_py", "ansicolors", "six", "requests", "pytest", "django",
+                 "setuptools", "pip", "boto3", "botocore"],
+        "npm": ["sequence", "lodash", "express", "react", "typescript", "aws-sdk"],
+        "maven": ["io.vertx:vertx-core", "junit:junit", "org.springframework:spring-core",
+                  "com.amazonaws:aws-java-sdk-core"]
+    }
+
     @staticmethod
     def generate_ecosystem_package(ecosystem, packages):
         """Generate sequence of tuples containing ecosystem+package name pairs."""
@@ -25,6 +25,16 @@ class GremlinQuery:
         self.query += '.valueMap()'
         return self
 
+    def limit(self, n):
+        """Add a 'limit' clause into the query."""
+        self.query += '.limit({n})'.format(n=n)
+        return self
+
+    def values(self, name):
+        """Append a clause to read values of the given property."""
+        self.query += '.values("{name}")'.format(name=name)
+        return self
+
     def count(self):
         """Add a 'count' clause at the end of the query."""
         self.query += '.count()'
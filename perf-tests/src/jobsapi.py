@@ -62,23 +62,35 @@ class JobsApi(Api):
             self.print_error_response(response, "detail")
         return response.status_code == 200
 
-    def prepare_jobs_data(self, ecosystem, package, version):
-        """Prepare data structure that specify new job attributes."""
+    @staticmethod
+    def prepare_flow_arguments(ecosystem, package, version):
+        """Prepare flow arguments for one component."""
         return \
             {
-                "flow_arguments": [
-                    {
-                        "ecosystem": ecosystem,
-                        "name": package,
-                        "version": version,
-                        "force": True,
-                        "force_graph_sync": True,
-                        "recursive_limit": 0
-                    }
-                ],
+                "ecosystem": ecosystem,
+                "name": package,
+                "version": version,
+                "force": True,
+                "force_graph_sync": True,
+                "recursive_limit": 0
+            }
+
+    def prepare_bulk_jobs_data(self, components):
+        """Prepare data structure that specify new job attributes for more components.
+
+        Components are specified as list of (ecosystem, package, version) tuples.
+        """
+        return \
+            {
+                "flow_arguments": [JobsApi.prepare_flow_arguments(ecosystem, package, version)
+                                   for ecosystem, package, version in components],
                 "flow_name": "bayesianApiFlow"
             }
 
+    def prepare_jobs_data(self, ecosystem, package, version):
+        """Prepare data structure that specify new job attributes."""
+        return self.prepare_bulk_jobs_data([(ecosystem, package, version)])
+
     @staticmethod
     def dump_job_data(s3, bucket, key):
         """Dump the job data read from the S3 database to a file."""
@@ -103,6 +115,13 @@ class JobsApi(Api):
         print(response)
         print(response.json())
 
+    def start_bulk_component_analysis(self, components):
+        """Start the component analysis for more components by one flow-scheduling request."""
+        jobs_data = self.prepare_bulk_jobs_data(components)
+        endpoint = "{jobs_api_url}api/v1/jobs/flow-scheduling?state=running".\
+            format(jobs_api_url=self.url)
+        return self.send_data_as_json(endpoint, jobs_data)
+
     def wait_for_component_analysis(self, s3, ecosystem, package, version, thread_id=""):
         """Wait for the component analysis by looking at metadata stored in the S3 database."""
         timeout = 300 * 60
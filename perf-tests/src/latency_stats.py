@@ -0,0 +1,31 @@
+"""Basic statistic computed from the measured latencies."""
+
+import math
+
+
+def percentile(values, p):
+    """Compute the p-th percentile of given values by the nearest-rank method, 0 <= p <= 100."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = int(math.ceil(p / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def mean(values):
+    """Compute the arithmetic mean of given values."""
+    if not values:
+        return float("nan")
+    return sum(values) / len(values)
+
+
+def latency_statistic(values):
+    """Compute the latency statistic used in reports: min, avg, p50, p90, p99, and max."""
+    return {
+        "count": len(values),
+        "min": min(values) if values else float("nan"),
+        "avg": mean(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else float("nan")}
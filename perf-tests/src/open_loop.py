@@ -0,0 +1,100 @@
+"""Open-loop load generator that calls the benchmarked function with a fixed arrival rate.
+
+In contrast to the sequenced and concurrent benchmarks, new calls are started according
+to the schedule, regardless of whether the previous calls have already finished. The
+latency is computed from the scheduled start time, so slow responses are not hidden
+by the client waiting for them (the coordinated omission problem).
+"""
+
+import datetime
+import threading
+import time
+
+import outcomes
+from benchmarks import call_and_check
+
+OUTCOME_DROPPED = "dropped (too many calls in flight)"
+
+
+def perform_scheduled_call(function_to_call, check_function, i, scheduled_at, warmup,
+                           results, lock, in_flight):
+    """Perform one scheduled call and store its measurement into the shared list."""
+    started_at = datetime.datetime.utcnow()
+    t1 = time.time()
+    retval, exception, check_passed = call_and_check(function_to_call, check_function, i, None)
+    t2 = time.time()
+
+    if exception is None:
+        outcome = outcomes.outcome_for_result(retval, check_passed)
+    else:
+        outcome = outcomes.outcome_for_exception(exception)
+
+    measurement = {
+        "measurement_number": i,
+        "thread_id": i,
+        "started_at": started_at,
+        "finished_at": datetime.datetime.utcnow(),
+        "delta": t2 - scheduled_at,
+        "service_time": t2 - t1,
+        "outcome": outcome,
+        "status_code": outcomes.http_status_code(retval),
+        "exception": type(exception).__name__ if exception is not None else None,
+        "warmup": warmup}
+
+    with lock:
+        results.append(measurement)
+    in_flight.release()
+
+
+def run_open_loop(function_to_call, check_function, rate, duration, warmup=0.0,
+                  max_in_flight=100):
+    """Call the function with given arrival rate (calls per second) for given duration.
+
+    Calls scheduled during the warmup period are marked as such and should be ignored by
+    statistic. When more than max_in_flight calls are not finished yet, the scheduled call
+    is not performed and it is recorded as dropped, ie. as an error.
+
+    Return list of measurements for all scheduled calls.
+    """
+    results = []
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    threads = []
+
+    start = time.time()
+    i = 0
+    while True:
+        scheduled_at = start + i / rate
+        if scheduled_at >= start + duration:
+            break
+        delay = scheduled_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+        warmup_call = scheduled_at < start + warmup
+        if in_flight.acquire(blocking=False):
+            t = threading.Thread(target=perform_scheduled_call,
+                                 args=(function_to_call, check_function, i, scheduled_at,
+                                       warmup_call, results, lock, in_flight))
+            t.start()
+            threads.append(t)
+        else:
+            now = datetime.datetime.utcnow()
+            with lock:
+                results.append({
+                    "measurement_number": i,
+                    "thread_id": None,
+                    "started_at": now,
+                    "finished_at": now,
+                    "delta": 0.0,
+                    "service_time": 0.0,
+                    "outcome": OUTCOME_DROPPED,
+                    "status_code": None,
+                    "exception": None,
+                    "warmup": warmup_call})
+        i += 1
+
+    for t in threads:
+        t.join()
+
+    return results
@@ -0,0 +1,133 @@
+"""Functions to classify outcome of every benchmark attempt and to summarize the outcomes."""
+
+import csv
+
+import requests
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_CHECK_FAILED = "check failed"
+
+
+def http_status_code(retval):
+    """Try to find the HTTP status code in value returned by the benchmarked function.
+
+    The benchmarked functions return the response itself, a dictionary with 'result' node
+    that contains the response or status code, or just the status code.
+    """
+    if hasattr(retval, "status_code"):
+        return retval.status_code
+    if isinstance(retval, dict) and "result" in retval:
+        return http_status_code(retval["result"])
+    if isinstance(retval, int) and not isinstance(retval, bool):
+        return retval
+    return None
+
+
+def outcome_for_result(retval, check_passed):
+    """Classify the attempt that returned a value (ie. did not throw an exception)."""
+    if check_passed:
+        return OUTCOME_SUCCESS
+    status_code = http_status_code(retval)
+    if status_code is not None:
+        return "HTTP {c}".format(c=status_code)
+    return OUTCOME_CHECK_FAILED
+
+
+def outcome_for_exception(exception):
+    """Classify the attempt that ended with an exception."""
+    if isinstance(exception, (requests.exceptions.Timeout, TimeoutError)):
+        return OUTCOME_TIMEOUT
+    return "exception {e}".format(e=type(exception).__name__)
+
+
+def is_success(measurement):
+    """Check if the measured attempt ended successfully."""
+    return measurement["outcome"] == OUTCOME_SUCCESS
+
+
+def successful_deltas(measurements):
+    """Return durations of all attempts that ended successfully."""
+    return [m["delta"] for m in measurements if is_success(m)]
+
+
+def deltas_by_outcome(measurements):
+    """Split durations of all attempts by their outcome."""
+    result = {}
+    for m in measurements:
+        result.setdefault(m["outcome"], []).append(m["delta"])
+    return result
+
+
+def latency_by_outcome(measurements):
+    """Compute count, min, avg, and max durations for each outcome."""
+    summary = {}
+    for outcome, deltas in sorted(deltas_by_outcome(measurements).items()):
+        summary[outcome] = {
+            "count": len(deltas),
+            "min": min(deltas),
+            "avg": sum(deltas) / len(deltas),
+            "max": max(deltas)}
+    return summary
+
+
+def error_rate(measurements):
+    """Compute ratio of attempts that did not end successfully."""
+    if not measurements:
+        return 0.0
+    errors = len(measurements) - len(successful_deltas(measurements))
+    return errors / len(measurements)
+
+
+def goodput(measurements, wall_clock_time):
+    """Compute number of successful attempts per second."""
+    if wall_clock_time <= 0:
+        return 0.0
+    return len(successful_deltas(measurements)) / wall_clock_time
+
+
+def error_rate_timeline(measurements, interval=1.0):
+    """Compute number of attempts, goodput, and error rate in time slots of given length.
+
+    Attempts are assigned into slots by time when they finished, the time is computed
+    relatively to the start of the first attempt.
+    """
+    if not measurements:
+        return []
+    start = min(m["started_at"] for m in measurements)
+    slots = {}
+    for m in measurements:
+        slot = int((m["finished_at"] - start).total_seconds() // interval)
+        slots.setdefault(slot, []).append(m)
+
+    timeline = []
+    for slot in range(max(slots.keys()) + 1):
+        attempts = slots.get(slot, [])
+        timeline.append({
+            "time": slot * interval,
+            "attempts": len(attempts),
+            "goodput": goodput(attempts, interval),
+            "error_rate": error_rate(attempts)})
+    return timeline
+
+
+def successful_timeline(measurements):
+    """Return start times (relative to the first attempt) and durations of successful attempts."""
+    if not measurements:
+        return [], []
+    start = min(m["started_at"] for m in measurements)
+    successful = [m for m in measurements if is_success(m)]
+    times = [(m["started_at"] - start).total_seconds() for m in successful]
+    return times, [m["delta"] for m in successful]
+
+
+def export_attempts_into_csv(name, attempts):
+    """Export all attempts, including failed ones, into the CSV file."""
+    with open(name + "_attempts.csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Thread", "Call", "Started at", "Finished at", "Duration",
+                             "Outcome", "Status code", "Exception"])
+        for m in attempts:
+            csv_writer.writerow([m["thread_id"], m["measurement_number"], m["started_at"],
+                                 m["finished_at"], m["delta"], m["outcome"], m["status_code"],
+                                 m["exception"]])
@@ -10,6 +10,7 @@ import queue
 import threading
 import pprint
 import csv
+import math
 
 from coreapi import *
 from jobsapi import *
@@ -17,7 +18,17 @@ from gremlin_api import *
 import benchmarks
 import graph
 from s3interface import *
+from s3_client import metrics as s3_metrics
 import measurements
+import outcomes
+import throughput_search
+import ab_comparison
+import suite
+import fanout_benchmark
+import bulk_scheduling
+import soak_test
+import profiling
+import trace_export
 from duration import *
 
 from cliargs import *
@@ -195,20 +206,51 @@ def run_package_version_query_to_graph_db_sequenced_benchmark(gremlin_api):
 def check_number_of_results(queue_size, thread_count):
     """Check if we really got the same number of results as expected.
 
-    When the server respond by any HTTP error code (4xx, 5xx), the results
-    are NOT stored in the queue. This means that number of results stored
-    in the queue might be less than number of threads set up by user via
-    CLI parameters in certain situations. This function check this situation.
+    Each thread stores all its attempts into the queue, including the failed
+    ones (4xx, 5xx, exceptions, timeouts). Number of results stored in the queue
+    might be less than number of threads set up by user via CLI parameters only
+    when the thread itself crashes. This function check this situation.
     """
     print("queue size: {size}".format(size=queue_size))
 
     if queue_size != thread_count:
         print("Warning: {expected} results expected, but only {got} is presented".format(
             expected=thread_count, got=queue_size))
-        print("This means that {n} stack analysis ends with error or exception".format(
+        print("This means that {n} thread(s) crashed".format(
             n=thread_count - queue_size))
 
 
+def print_outcomes_summary(attempts, wall_clock_time):
+    """Print goodput, error rate, and latency for each outcome."""
+    print("attempts:   {a}".format(a=len(attempts)))
+    print("goodput:    {g} calls/s".format(g=outcomes.goodput(attempts, wall_clock_time)))
+    print("error rate: {e}".format(e=outcomes.error_rate(attempts)))
+    print("client CPU: {c} s/call ({u} of the wall clock time)".format(
+        c=profiling.cpu_per_request(attempts), u=profiling.cpu_utilization(attempts)))
+    for outcome, stat in outcomes.latency_by_outcome(attempts).items():
+        print("    {o}: count {c}  min {mi}  avg {a}  max {ma}".format(o=outcome,
+                                                                       c=stat["count"],
+                                                                       mi=stat["min"],
+                                                                       a=stat["avg"],
+                                                                       ma=stat["max"]))
+
+
+def export_latency_by_outcome_into_csv(name, thread_counts, latencies_by_outcome):
+    """Export latency statistic split by outcome for each thread count into the CSV file."""
+    with open(name + "_latency_by_outcome.csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Threads", "Outcome", "Count", "Min", "Avg", "Max"])
+        for thread_count, latencies in zip(thread_counts, latencies_by_outcome):
+            for outcome, stat in latencies.items():
+                csv_writer.writerow([thread_count, outcome, stat["count"],
+                                     stat["min"], stat["avg"], stat["max"]])
+
+
+def timing_cell(value):
+    """Return the timing written into CSV, empty cell for rounds without successful attempt."""
+    return "" if math.isnan(value) else value
+
+
 def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to_call,
                                       thread_counts=None):
     """Universal function to call any callback function in more threads and collect results."""
@@ -219,6 +261,14 @@ def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to
     summary_min_times = []
     summary_max_times = []
     summary_avg_times = []
+    summary_attempts = []
+    summary_successes = []
+    summary_error_rates = []
+    summary_goodputs = []
+    summary_latencies_by_outcome = []
+    summary_cpu_per_request = []
+
+    all_attempts = []
 
     for thread_count in thread_counts:
         print("Concurrent threads: {c}".format(c=thread_count))
@@ -229,6 +279,7 @@ def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to
         threads = []
         q = queue.Queue()
 
+        round_started = time.time()
         for thread_id in range(0, thread_count):
             t = threading.Thread(target=lambda api, s3, measurement_count, pause_time, q,
                                  thread_id:
@@ -241,13 +292,24 @@ def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to
         print("---------------------------------")
         print("Waiting for all threads to finish")
         wait_for_all_threads(threads)
+        wall_clock_time = time.time() - round_started
         print("Done")
 
         queue_size = q.qsize()
         check_number_of_results(queue_size, thread_count)
 
-        # read all really stored results from the queue
-        values = [q.get()[0][0]["delta"] for i in range(queue_size)]
+        # read all really stored results from the queue, failed attempts included
+        attempts = []
+        for i in range(queue_size):
+            thread_measurements, debug = q.get()
+            attempts.extend(thread_measurements)
+        all_attempts.extend(attempts)
+
+        print_outcomes_summary(attempts, wall_clock_time)
+
+        # latency statistic is computed for successful attempts only,
+        # errors are reported separately as goodput and error rate
+        values = outcomes.successful_deltas(attempts)
         print("values")
         print("count: {cnt}".format(cnt=len(values)))
         print(values)
@@ -257,17 +319,32 @@ def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to
         name = "{n}_{t}_threads".format(n=name_prefix, t=thread_count)
         graph.generate_wait_times_graph(title, name, values)
 
-        min_times.append(min(values))
-        max_times.append(max(values))
-        avg_times.append(sum(values) / len(values))
+        if values:
+            min_time = min(values)
+            max_time = max(values)
+            avg_time = sum(values) / len(values)
+        else:
+            print("Warning: no successful attempt for {t} concurrent threads".format(
+                t=thread_count))
+            min_time = max_time = avg_time = float("nan")
+
+        min_times.append(min_time)
+        max_times.append(max_time)
+        avg_times.append(avg_time)
 
         print("min_times:", min_times)
         print("max_times:", max_times)
         print("avg_times:", avg_times)
 
-        summary_min_times.append(min(values))
-        summary_max_times.append(max(values))
-        summary_avg_times.append(sum(values) / len(values))
+        summary_min_times.append(min_time)
+        summary_max_times.append(max_time)
+        summary_avg_times.append(avg_time)
+        summary_attempts.append(len(attempts))
+        summary_successes.append(len(values))
+        summary_error_rates.append(outcomes.error_rate(attempts))
+        summary_goodputs.append(outcomes.goodput(attempts, wall_clock_time))
+        summary_latencies_by_outcome.append(outcomes.latency_by_outcome(attempts))
+        summary_cpu_per_request.append(profiling.cpu_per_request(attempts))
 
         generate_statistic_graph(name, thread_count, ["min/avg/max"],
                                  min_times, max_times, avg_times)
@@ -277,6 +354,8 @@ def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to
     print(summary_min_times)
     print(summary_max_times)
     print(summary_avg_times)
+    print("goodput:", summary_goodputs)
+    print("error rate:", summary_error_rates)
 
     t = thread_counts
     graph.generate_timing_threads_statistic_graph("Duration for " + message,
@@ -286,11 +365,30 @@ def run_analysis_concurrent_benchmark(api, s3, message, name_prefix, function_to
                                                   summary_max_times,
                                                   summary_avg_times)
 
+    graph.generate_error_rate_graph("Goodput and error rate for " + message,
+                                    "{p}_error_rate".format(p=name_prefix),
+                                    outcomes.error_rate_timeline(all_attempts))
+
+    times, latencies = outcomes.successful_timeline(all_attempts)
+    graph.generate_latency_heatmap("Latency heatmap for " + message,
+                                   "{p}_heatmap".format(p=name_prefix),
+                                   "time (seconds)", times, latencies)
+
+    # the first five columns are read by the dashboard, so new columns are appended;
+    # timings of rounds without successful attempt are left empty, the dashboard skips them
     with open(name_prefix + ".csv", "w") as csvfile:
         csv_writer = csv.writer(csvfile)
         for i in range(0, len(thread_counts)):
             csv_writer.writerow([i, thread_counts[i],
-                                 summary_min_times[i], summary_max_times[i], summary_avg_times[i]])
+                                 timing_cell(summary_min_times[i]),
+                                 timing_cell(summary_max_times[i]),
+                                 timing_cell(summary_avg_times[i]),
+                                 summary_attempts[i], summary_successes[i],
+                                 summary_error_rates[i], summary_goodputs[i],
+                                 summary_cpu_per_request[i]])
+
+    outcomes.export_attempts_into_csv(name_prefix, all_attempts)
+    export_latency_by_outcome_into_csv(name_prefix, thread_counts, summary_latencies_by_outcome)
 
 
 def run_component_analysis_concurrent_calls_benchmark(jobs_api, s3):
@@ -668,6 +766,25 @@ def generate_statistic_graph(name_prefix, thread_count, x_axis_labels, min_times
                                           min_times, max_times, avg_times, 640, 480)
 
 
+def run_ab_comparison(core_api, cli_arguments):
+    """Compare the tested deployment with the second one specified by F8A_API_URL_B."""
+    check_environment_variable("F8A_API_URL_B")
+    check_environment_variable("RECOMMENDER_API_TOKEN_B")
+    core_api_b = CoreApi(os.environ.get('F8A_API_URL_B'),
+                         os.environ.get('RECOMMENDER_API_TOKEN_B'))
+
+    print("Checking: authorization token for the core API B")
+    if core_api_b.check_auth_token_validity():
+        print("    ok")
+    else:
+        sys.exit(1)
+
+    core_api_b.stack_analysis_manifest = core_api.stack_analysis_manifest
+    ab_comparison.run_ab_comparison(core_api, core_api_b, cli_arguments.ab_compare,
+                                    cli_arguments.ab_pairs, cli_arguments.ab_pause,
+                                    cli_arguments.seed)
+
+
 def main():
     """Entry point to the performance tests."""
     cli_arguments = cli_parser.parse_args()
@@ -684,12 +801,15 @@ def main():
     aws_secret_access_key = os.environ.get('AWS_SECRET_ACCESS_KEY')
     s3_region_name = os.environ.get('S3_REGION_NAME')
     deployment_prefix = os.environ.get('DEPLOYMENT_PREFIX', 'STAGE')
+    # optional, S3 compatible service to be used instead of AWS S3
+    s3_endpoint_url = os.environ.get('S3_ENDPOINT_URL') or None
 
     core_api = CoreApi(coreapi_url, recommender_api_token)
     jobs_api = JobsApi(jobs_api_url, job_api_token)
     gremlin_api = GremlinApi(gremlin_api_url)
 
-    s3 = S3Interface(aws_access_key_id, aws_secret_access_key, s3_region_name, deployment_prefix)
+    s3 = S3Interface(aws_access_key_id, aws_secret_access_key, s3_region_name, deployment_prefix,
+                     s3_endpoint_url)
 
     check_system(core_api, jobs_api, s3)
 
@@ -702,7 +822,43 @@ def main():
     # the appropriate attribute
     core_api.stack_analysis_manifest = cli_arguments.manifest
 
-    if cli_arguments.sla:
+    if cli_arguments.profile:
+        profiling.start_profiling(cli_arguments.profile_interval)
+
+    if cli_arguments.export_trace:
+        trace_export.run_trace_export(core_api, jobs_api, s3, cli_arguments.export_trace,
+                                      cli_arguments.trace_count)
+    elif cli_arguments.soak:
+        soak_test.run_soak_test({"core": core_api, "jobs": jobs_api, "gremlin": gremlin_api},
+                                cli_arguments.soak, cli_arguments.soak_duration,
+                                cli_arguments.soak_window, cli_arguments.soak_threads,
+                                cli_arguments.soak_pause)
+    elif cli_arguments.bulk_scheduling_benchmark:
+        batch_sizes = [int(b) for b in cli_arguments.bulk_batch_sizes.split(",")]
+        bulk_scheduling.run_bulk_scheduling_benchmark(jobs_api, s3, batch_sizes,
+                                                      cli_arguments.bulk_components,
+                                                      cli_arguments.bulk_s3_timeout)
+    elif cli_arguments.gremlin_fanout_benchmark:
+        fanout_benchmark.run_fanout_benchmark(gremlin_api,
+                                              cli_arguments.fanout_ecosystems.split(","),
+                                              SEQUENCED_BENCHMARKS_DEFAULT_COUNT,
+                                              cli_arguments.fanout_sample)
+    elif cli_arguments.suite:
+        suite.run_suite(cli_arguments.suite, {"core": core_api,
+                                              "jobs": jobs_api,
+                                              "gremlin": gremlin_api})
+    elif cli_arguments.ab_compare:
+        run_ab_comparison(core_api, cli_arguments)
+    elif cli_arguments.throughput_search:
+        throughput_search.run_throughput_search(core_api, cli_arguments.throughput_search,
+                                                cli_arguments.rate_min,
+                                                cli_arguments.rate_max,
+                                                cli_arguments.rate_precision,
+                                                cli_arguments.rate_window,
+                                                cli_arguments.rate_warmup,
+                                                cli_arguments.max_error_rate,
+                                                cli_arguments.sla_file)
+    elif cli_arguments.sla:
         run_benchmarks_sla(core_api, jobs_api, s3)
     else:
         run_benchmarks(core_api, jobs_api, gremlin_api, s3,
@@ -713,6 +869,14 @@ def main():
                        cli_arguments.parallel,
                        cli_arguments.thread_max)
 
+    if cli_arguments.profile:
+        profiling.stop_profiling(cli_arguments.profile)
+
+    # request rate, throughput, latency, and throttling of all S3 requests sent by this run
+    for line in s3_metrics.summary():
+        print(line)
+    s3_metrics.export_into_csv("s3_requests.csv")
+
 
 if __name__ == "__main__":
     # execute only if run as a script
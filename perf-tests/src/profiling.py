@@ -0,0 +1,129 @@
+"""Client side profiling of the benchmarks.
+
+The sampling profiler periodically reads stacks of all threads (sys._current_frames) and
+counts how many times each stack was seen. The result is stored in the "folded" format
+(one line "frame;frame;frame count" per stack) that can be rendered by flamegraph.pl or
+speedscope. Please note that stacks of threads waiting for I/O are sampled as well, so the
+flamegraph shows where the wall clock time is spent; CPU time consumed by the client is
+measured for each call separately (see benchmarks.measure).
+"""
+
+import collections
+import os
+import sys
+import threading
+
+DEFAULT_INTERVAL = 0.01
+DEFAULT_MAX_DEPTH = 64
+
+
+def frame_name(frame):
+    """Return name of the frame used in the folded stack."""
+    code = frame.f_code
+    return "{f} ({m}:{l})".format(f=code.co_name, m=os.path.basename(code.co_filename),
+                                  l=code.co_firstlineno)
+
+
+def folded_stack(frame, max_depth=DEFAULT_MAX_DEPTH):
+    """Return the stack of frames, the outermost frame first, separated by semicolons."""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Profiler that samples stacks of all threads in regular intervals."""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        """Initialize the profiler, interval is in seconds."""
+        self.interval = interval
+        self.samples = collections.Counter()
+        self.sample_count = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in the background thread."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample_loop(self):
+        """Sample stacks of all threads except the profiler itself until stopped."""
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.samples[folded_stack(frame)] += 1
+            self.sample_count += 1
+
+    def export_folded(self, filename):
+        """Write the samples in the folded format usable by flamegraph tools."""
+        with open(filename, "w") as fout:
+            for stack, count in self.samples.most_common():
+                fout.write("{s} {c}\n".format(s=stack, c=count))
+
+    def top_frames(self, count=20):
+        """Return the frames that were most often on the top of the stack."""
+        frames = collections.Counter()
+        for stack, samples in self.samples.items():
+            frames[stack.rsplit(";", 1)[-1]] += samples
+        return frames.most_common(count)
+
+    def print_top_frames(self, count=20):
+        """Print the frames that were most often on the top of the stack."""
+        total = sum(self.samples.values()) or 1
+        print("Client profile: {s} samples, interval {i} s".format(s=self.sample_count,
+                                                                   i=self.interval))
+        for frame, samples in self.top_frames(count):
+            print("    {p:6.2f} %    {f}".format(p=100.0 * samples / total, f=frame))
+
+
+def cpu_per_request(measurements):
+    """Return average client CPU time (in seconds) consumed by one call."""
+    cpu_times = [m["cpu_time"] for m in measurements if m.get("cpu_time") is not None]
+    if not cpu_times:
+        return float("nan")
+    return sum(cpu_times) / len(cpu_times)
+
+
+def cpu_utilization(measurements):
+    """Return ratio of client CPU time and wall clock time for all calls."""
+    cpu_time = sum(m.get("cpu_time") or 0.0 for m in measurements)
+    wall_time = sum(m["delta"] for m in measurements)
+    if wall_time == 0:
+        return float("nan")
+    return cpu_time / wall_time
+
+
+profiler = None
+
+
+def start_profiling(interval=DEFAULT_INTERVAL):
+    """Start the global sampling profiler."""
+    global profiler
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    return profiler
+
+
+def stop_profiling(name):
+    """Stop the global sampling profiler and export the samples into name.folded file."""
+    global profiler
+    if profiler is None:
+        return
+    profiler.stop()
+    profiler.print_top_frames()
+    profiler.export_folded(name + ".folded")
+    print("Flamegraph data stored into {n}.folded".format(n=name))
+    profiler = None
@@ -0,0 +1,115 @@
+"""Constant-memory streaming quantile sketch (KLL) used for long running measurements.
+
+The KLL sketch keeps a hierarchy of compactors. Items at level h represent 2^h original
+items. When the sketch is full, the first over-capacity level is sorted and every other item
+is promoted to the next level. Memory is bounded by O(k) items regardless of number of
+updates, the rank error is roughly 1.7 / k for k=200 (~1%).
+"""
+
+import math
+import random
+
+DEFAULT_K = 200
+CAPACITY_DECAY = 2.0 / 3.0
+
+
+class KLLSketch:
+    """Streaming quantile sketch with bounded memory."""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        """Initialize an empty sketch, k controls the accuracy and memory footprint."""
+        self.k = k
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self._random = random.Random(seed)
+        self._update_max_size()
+
+    def _capacity(self, level):
+        """Compute capacity of the compactor at given level (top levels are the largest)."""
+        depth = len(self.compactors) - level - 1
+        return max(int(math.ceil(self.k * CAPACITY_DECAY ** depth)), 2)
+
+    def _update_max_size(self):
+        """Recompute the number of items that triggers compaction."""
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, value):
+        """Add one value into the sketch."""
+        self.compactors[0].append(value)
+        self.size += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        """Compact the first over-capacity level, promoting half of its items."""
+        for level, compactor in enumerate(self.compactors):
+            if len(compactor) >= self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                    self._update_max_size()
+                compactor.sort()
+                # odd item stays at the current level
+                kept = [compactor.pop()] if len(compactor) % 2 else []
+                offset = self._random.randint(0, 1)
+                promoted = compactor[offset::2]
+                self.compactors[level + 1].extend(promoted)
+                self.size -= len(compactor) - len(promoted)
+                compactor[:] = kept
+                if self.size < self.max_size:
+                    break
+
+    def merge(self, other):
+        """Merge other sketch into this one."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.size = sum(len(compactor) for compactor in self.compactors)
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._update_max_size()
+        while self.size >= self.max_size:
+            self._compress()
+
+    def quantile(self, q):
+        """Return the estimated value at given quantile, 0 <= q <= 1."""
+        if self.count == 0:
+            return float("nan")
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        weighted = sorted((value, 2 ** level)
+                          for level, compactor in enumerate(self.compactors)
+                          for value in compactor)
+        total_weight = sum(weight for _, weight in weighted)
+        target = q * total_weight
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max
+
+    def mean(self):
+        """Return the exact mean of all values added into the sketch."""
+        if self.count == 0:
+            return float("nan")
+        return self.total / self.count
+
+    def __len__(self):
+        """Return number of items stored in the sketch (not the number of updates)."""
+        return self.size
@@ -0,0 +1,75 @@
+"""Render latency heatmap and downsampled timeline from the file with all attempts.
+
+Usage:
+    python3 render_latency.py name_attempts.csv [--title TITLE]
+
+The CSV file is generated by the concurrent benchmarks (see outcomes.export_attempts_into_csv)
+and can contain millions of attempts. Graphs name_timeline.png and name_heatmap.png are
+generated next to the input file.
+"""
+
+import argparse
+import csv
+
+import numpy as np
+
+import graph
+from outcomes import OUTCOME_SUCCESS
+
+STARTED_AT_COLUMN = 2
+DURATION_COLUMN = 4
+OUTCOME_COLUMN = 5
+
+
+def read_successful_attempts(filename):
+    """Read start times (in seconds from the first attempt) and durations of successful calls."""
+    started_at = []
+    durations = []
+    with open(filename) as csvfile:
+        reader = csv.reader(csvfile)
+        next(reader)
+        for row in reader:
+            if row[OUTCOME_COLUMN] == OUTCOME_SUCCESS:
+                started_at.append(row[STARTED_AT_COLUMN].replace(" ", "T"))
+                durations.append(row[DURATION_COLUMN])
+
+    # conversion of whole arrays is much faster than parsing value by value
+    started_at = np.array(started_at, dtype="datetime64[us]")
+    durations = np.array(durations, dtype=float)
+    if len(started_at) == 0:
+        return started_at.astype(float), durations
+    times = (started_at - started_at.min()) / np.timedelta64(1, "s")
+    order = np.argsort(times, kind="stable")
+    return times[order], durations[order]
+
+
+def render(filename, title):
+    """Render the timeline and heatmap graphs for attempts stored in the CSV file."""
+    name = filename[:-len(".csv")] if filename.endswith(".csv") else filename
+    if name.endswith("_attempts"):
+        name = name[:-len("_attempts")]
+
+    times, durations = read_successful_attempts(filename)
+    print("{c} successful attempts read from {f}".format(c=len(durations), f=filename))
+    if len(durations) == 0:
+        return
+
+    graph.generate_timeline_graph(title, name + "_timeline", "time (seconds)",
+                                  times, durations)
+    graph.generate_latency_heatmap(title, name + "_heatmap", "time (seconds)",
+                                   times, durations)
+
+
+def main():
+    """Entry point to the renderer."""
+    parser = argparse.ArgumentParser(description="Render latency heatmap and timeline "
+                                                 "from the CSV file with all attempts")
+    parser.add_argument("filename", help="CSV file with all attempts")
+    parser.add_argument("--title", help="title of the graphs", type=str, default="Latency")
+    arguments = parser.parse_args()
+    render(arguments.filename, arguments.title)
+
+
+if __name__ == "__main__":
+    # execute only if run as a script
+    main()
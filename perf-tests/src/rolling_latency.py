@@ -0,0 +1,145 @@
+"""Recorder of rolling latency statistic for long running (soak) tests in constant memory.
+
+Each measurement is added into the sketch for the current time window and into the overall
+sketch. When the window is closed, its statistic is passed to the callback (to be written
+into a file) and the window sketch is dropped. Drift against the baseline (the first windows)
+and the latency creep (slope of the median latency over time) are computed from a fixed
+number of accumulators, so the memory does not grow with the length of the run.
+"""
+
+import threading
+import time
+
+import outcomes
+from quantile_sketch import KLLSketch
+
+DEFAULT_WINDOW = 60
+DEFAULT_BASELINE_WINDOWS = 5
+DEFAULT_DRIFT_THRESHOLD = 1.5
+
+
+class RollingLatencyRecorder:
+    """Recorder of rolling latency statistic per scenario and time window."""
+
+    def __init__(self, scenario, window=DEFAULT_WINDOW, on_window=None,
+                 baseline_windows=DEFAULT_BASELINE_WINDOWS,
+                 drift_threshold=DEFAULT_DRIFT_THRESHOLD):
+        """Initialize the recorder, on_window is called with statistic of each closed window."""
+        self.scenario = scenario
+        self.window = window
+        self.on_window = on_window
+        self.baseline_windows = baseline_windows
+        self.drift_threshold = drift_threshold
+
+        self.started = time.time()
+        self.window_index = 0
+        self.window_sketch = KLLSketch()
+        self.window_errors = 0
+        self.overall = KLLSketch()
+        self.errors = 0
+        self.baseline = KLLSketch()
+        self.closed_windows = 0
+
+        # accumulators for least squares fit of window median over time
+        self._n = 0
+        self._sum_x = 0.0
+        self._sum_y = 0.0
+        self._sum_xx = 0.0
+        self._sum_xy = 0.0
+
+        self._lock = threading.Lock()
+
+    def record(self, measurement):
+        """Record one measurement (attempt) produced by benchmarks.measure()."""
+        with self._lock:
+            self._close_windows(time.time())
+            if outcomes.is_success(measurement):
+                self.window_sketch.update(measurement["delta"])
+                self.overall.update(measurement["delta"])
+            else:
+                self.window_errors += 1
+                self.errors += 1
+
+    def flush(self, now=None):
+        """Close all windows that already ended, to be called periodically."""
+        with self._lock:
+            self._close_windows(now or time.time())
+
+    def _close_windows(self, now):
+        """Close the current window (and empty ones after it) if its time elapsed."""
+        current = int((now - self.started) // self.window)
+        while self.window_index < current:
+            self._close_window()
+
+    def _close_window(self):
+        """Compute statistic for the current window and start the next one."""
+        sketch = self.window_sketch
+        statistic = {
+            "scenario": self.scenario,
+            "window": self.window_index,
+            "start": self.window_index * self.window,
+            "count": sketch.count,
+            "errors": self.window_errors,
+            "error_rate": self.window_errors / (sketch.count + self.window_errors)
+            if sketch.count + self.window_errors else 0.0,
+            "avg": sketch.mean(),
+            "p50": sketch.quantile(0.5),
+            "p99": sketch.quantile(0.99),
+            "max": sketch.max if sketch.count else float("nan")}
+
+        if sketch.count:
+            if self.closed_windows < self.baseline_windows:
+                self.baseline.merge(sketch)
+            self._add_to_trend(statistic["start"], statistic["p50"])
+        statistic.update(self._drift(statistic))
+        self.closed_windows += 1
+
+        if self.on_window is not None:
+            self.on_window(statistic)
+
+        self.window_index += 1
+        self.window_sketch = KLLSketch()
+        self.window_errors = 0
+
+    def _add_to_trend(self, x, y):
+        """Add one point (time, median latency) into the least squares accumulators."""
+        self._n += 1
+        self._sum_x += x
+        self._sum_y += y
+        self._sum_xx += x * x
+        self._sum_xy += x * y
+
+    def creep(self):
+        """Return slope of the median latency in seconds per hour (latency creep)."""
+        denominator = self._n * self._sum_xx - self._sum_x ** 2
+        if self._n < 2 or denominator == 0:
+            return 0.0
+        slope = (self._n * self._sum_xy - self._sum_x * self._sum_y) / denominator
+        return slope * 3600
+
+    def _drift(self, statistic):
+        """Compare the window with the baseline windows."""
+        if self.closed_windows < self.baseline_windows or self.baseline.count == 0 or \
+                statistic["count"] == 0:
+            return {"p50_drift": float("nan"), "p99_drift": float("nan"), "drift": False}
+        p50_drift = statistic["p50"] / self.baseline.quantile(0.5)
+        p99_drift = statistic["p99"] / self.baseline.quantile(0.99)
+        return {
+            "p50_drift": p50_drift,
+            "p99_drift": p99_drift,
+            "drift": p50_drift > self.drift_threshold or p99_drift > self.drift_threshold}
+
+    def summary(self):
+        """Return statistic for the whole run."""
+        with self._lock:
+            return {
+                "scenario": self.scenario,
+                "count": self.overall.count,
+                "errors": self.errors,
+                "avg": self.overall.mean(),
+                "p50": self.overall.quantile(0.5),
+                "p99": self.overall.quantile(0.99),
+                "max": self.overall.max if self.overall.count else float("nan"),
+                "baseline_p50": self.baseline.quantile(0.5),
+                "baseline_p99": self.baseline.quantile(0.99),
+                "creep_per_hour": self.creep()}
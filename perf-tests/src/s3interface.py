@@ -1,14 +1,30 @@
 """AWS S3 Interface used by tests."""
-import boto3
-import botocore
+from botocore.exceptions import ClientError
 import json
 
+from s3_client import shared_client
+
+# larger objects are not read into memory
+DEFAULT_MAX_OBJECT_SIZE = 50 * 1024 * 1024
+
+
+class ObjectTooLarge(Exception):
+    """Exception raised when the object exceeds the size limit."""
+
+    def __init__(self, key, size, limit):
+        """Construct the exception with clear message."""
+        super().__init__("Object {k} is too large: {s} bytes (limit {l} bytes)".format(
+            k=key, s=size, l=limit))
+        self.key = key
+        self.size = size
+        self.limit = limit
+
 
 class S3Interface():
     """Interface to the AWS S3 database."""
 
     def __init__(self, aws_access_key_id, aws_secret_access_key, s3_region_name,
-                 deployment_prefix):
+                 deployment_prefix, endpoint_url=None):
         """Create a new interface to the AWS S3.
 
         Remember the access key, secret access key, region, and deployment
@@ -18,10 +34,14 @@ class S3Interface():
         self.aws_secret_access_key = aws_secret_access_key
         self.s3_region_name = s3_region_name
         self.deployment_prefix = deployment_prefix
+        # optional, S3 compatible service (moto server, MinIO...) to be used instead of AWS
+        self.endpoint_url = endpoint_url
+
+        # objects larger than this limit are not read
+        self.max_object_size = DEFAULT_MAX_OBJECT_SIZE
 
         # to be set up by the connect() method
-        self.s3_resource = None
-        self.s3_session = None
+        self.s3_client = None
 
     def connect(self):
         """Connect to the AWS S3 database."""
@@ -30,32 +50,18 @@ class S3Interface():
         assert self.s3_region_name is not None
 
         # we are already connected -> let's use this connection
-        if self.s3_resource is not None:
+        if self.s3_client is not None:
             return
 
-        # create the session used to communicate with the S3 database
-        # and check if the operation was successful
-        self.s3_session = boto3.session.Session(
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key,
-            region_name=self.s3_region_name)
+        # the low-level client is shared by all interfaces (and threads) in the process
+        self.s3_client = shared_client(self.aws_access_key_id, self.aws_secret_access_key,
+                                       self.s3_region_name, self.endpoint_url)
 
-        assert self.s3_session is not None
-
-        use_ssl = True
-        endpoint_url = None
-
-        # retrieve the bucket resource and check if the operation was successful
-        self.s3_resource = self.s3_session.resource(
-            's3',
-            config=botocore.client.Config(signature_version='s3v4'),
-            use_ssl=use_ssl, endpoint_url=endpoint_url)
-
-        assert self.s3_resource is not None
+        assert self.s3_client is not None
 
     def read_all_buckets(self):
         """Read all available buckets from the AWS S3 database."""
-        return self.s3_resource.buckets.all()
+        return self.s3_client.list_buckets()["Buckets"]
 
     def full_bucket_name(self, bucket_name):
         """Insert deployment prefix to the given bucket name."""
@@ -103,23 +109,30 @@ class S3Interface():
         by current AWS S3 database user.
         """
         try:
-            s3 = self.s3_resource
+            s3 = self.s3_client
             assert s3 is not None
-            s3.meta.client.head_bucket(Bucket=self.full_bucket_name(bucket_name))
+            s3.head_bucket(Bucket=self.full_bucket_name(bucket_name))
             return True
         except ClientError:
             return False
 
     def read_object(self, bucket_name, key):
-        """Read byte stream from the S3 database, decode it into string, and parse as JSON."""
-        s3 = self.s3_resource
+        """Read byte stream from the S3 database and parse it as JSON.
+
+        ObjectTooLarge is raised for objects larger than max_object_size, they are not read.
+        """
+        s3 = self.s3_client
         assert s3 is not None
-        data = s3.Object(self.full_bucket_name(bucket_name), key).get()['Body'].read().decode()
-        return json.loads(data)
+        response = s3.get_object(Bucket=self.full_bucket_name(bucket_name), Key=key)
+        size = response.get('ContentLength')
+        if size is not None and size > self.max_object_size:
+            response['Body'].close()
+            raise ObjectTooLarge(key, size, self.max_object_size)
+        return json.loads(response['Body'].read())
 
     def read_object_metadata(self, bucket_name, key, attribute):
-        """Read byte stream from the S3 database, decode it into string, and parse as JSON."""
-        s3 = self.s3_resource
+        """Read the attribute of the object (LastModified, ETag...) by the HEAD request."""
+        s3 = self.s3_client
         assert s3 is not None
-        data = s3.Object(self.full_bucket_name(bucket_name), key).get()[attribute]
+        data = s3.head_object(Bucket=self.full_bucket_name(bucket_name), Key=key)[attribute]
         return data
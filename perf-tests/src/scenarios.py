@@ -0,0 +1,47 @@
+"""Scenarios (function to call + check function) that can be used by the load generators."""
+
+# scenario name -> service (API) to be called + SLA table keys + function to call +
+# check function
+SCENARIOS = {
+    "core-api": {
+        "service": "core",
+        "sla": None,
+        "call": lambda core_api, i: core_api.get(),
+        "check": lambda retval: retval.status_code == 200},
+    "jobs-api": {
+        "service": "jobs",
+        "sla": None,
+        "call": lambda jobs_api, i: jobs_api.get(),
+        "check": lambda retval: retval.status_code == 200},
+    "component-analysis-known": {
+        "service": "core",
+        "sla": ("component analysis", "parallel_calls_known_component"),
+        "call": lambda core_api, i: core_api.component_analysis(None, i, "pypi", "clojure_py",
+                                                                "0.2.4"),
+        "check": lambda retval: retval["result"] == 200},
+    "component-analysis-unknown": {
+        "service": "core",
+        "sla": ("component analysis", "parallel_calls_unknown_component"),
+        "call": lambda core_api, i: core_api.component_analysis(None, i, "pypi",
+                                                                "non_existing_component",
+                                                                "9.8.7"),
+        "check": lambda retval: retval["result"] == 404},
+    "stack-analysis": {
+        "service": "core",
+        "sla": ("stack analysis", "parallel_calls"),
+        "call": lambda core_api, i: core_api.stack_analysis(None, i),
+        "check": lambda retval: retval["result"].status_code == 200},
+    "gremlin-package-query": {
+        "service": "gremlin",
+        "sla": None,
+        "call": lambda gremlin_api, i: gremlin_api.package_query(i),
+        "check": lambda retval: retval.status_code == 200},
+    "gremlin-package-version-query": {
+        "service": "gremlin",
+        "sla": None,
+        "call": lambda gremlin_api, i: gremlin_api.package_version_query(i),
+        "check": lambda retval: retval.status_code == 200},
+}
+
+# scenarios with thresholds defined in the SLA table
+SLA_SCENARIOS = sorted(name for name, scenario in SCENARIOS.items() if scenario["sla"])
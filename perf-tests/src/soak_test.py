@@ -0,0 +1,91 @@
+"""Long running (soak) test of one scenario with rolling latency statistic.
+
+Latencies are not stored, they are summarized by quantile sketches per time window, and the
+statistic for each window is written into the CSV file as soon as the window is closed. The
+test can therefore run for arbitrary long time in constant memory.
+"""
+
+import csv
+import threading
+import time
+
+from benchmarks import measure
+from rolling_latency import RollingLatencyRecorder
+from scenarios import SCENARIOS
+
+WINDOW_COLUMNS = ["window", "start", "count", "errors", "error_rate", "avg", "p50", "p99", "max",
+                  "p50_drift", "p99_drift", "drift"]
+
+
+def soak_thread(call, check, pause, thread_id, deadline, recorder):
+    """Call the scenario repeatedly until the deadline, pass all attempts to the recorder."""
+    while time.time() < deadline:
+        measure(call, check, 1, pause, thread_id, recorder=recorder)
+
+
+def window_writer(csv_writer, csvfile):
+    """Return callback that writes statistic of one window into the CSV file."""
+    def on_window(statistic):
+        row = [statistic[column] for column in WINDOW_COLUMNS]
+        # the dashboard expects numeric values only
+        row[-1] = int(row[-1])
+        csv_writer.writerow(row)
+        csvfile.flush()
+        print("Window #{w}: {c} calls, {e} errors, p50 {p50} s, p99 {p99} s{d}".format(
+            w=statistic["window"], c=statistic["count"], e=statistic["errors"],
+            p50=statistic["p50"], p99=statistic["p99"],
+            d="    DRIFT" if statistic["drift"] else ""))
+    return on_window
+
+
+def export_soak_summary_into_csv(name, summary):
+    """Export statistic for the whole soak test into the CSV file."""
+    with open(name + "_summary.csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Calls", "Errors", "Avg", "P50", "P99", "Max", "Baseline p50",
+                             "Baseline p99", "Creep per hour"])
+        csv_writer.writerow([summary["count"], summary["errors"], summary["avg"],
+                             summary["p50"], summary["p99"], summary["max"],
+                             summary["baseline_p50"], summary["baseline_p99"],
+                             summary["creep_per_hour"]])
+
+
+def run_soak_test(apis, scenario_name, duration, window, thread_count, pause):
+    """Run the soak test of the scenario for given duration (in seconds)."""
+    scenario = SCENARIOS[scenario_name]
+    api = apis[scenario["service"]]
+    name = "soak_{s}".format(s=scenario_name)
+    print("Soak test of {s}: {t} threads, {d} s, window {w} s".format(s=scenario_name,
+                                                                      t=thread_count,
+                                                                      d=duration, w=window))
+
+    with open(name + ".csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(WINDOW_COLUMNS)
+        recorder = RollingLatencyRecorder(scenario_name, window,
+                                          on_window=window_writer(csv_writer, csvfile))
+
+        deadline = time.time() + duration
+        threads = []
+        for thread_id in range(thread_count):
+            t = threading.Thread(target=soak_thread,
+                                 args=(lambda i: scenario["call"](api, i), scenario["check"],
+                                       pause, thread_id, deadline, recorder))
+            t.start()
+            threads.append(t)
+
+        # windows needs to be closed even when no call finishes in them
+        while any(t.is_alive() for t in threads):
+            recorder.flush()
+            time.sleep(1)
+        for t in threads:
+            t.join()
+        recorder.flush(recorder.started + (recorder.window_index + 1) * window)
+
+    summary = recorder.summary()
+    export_soak_summary_into_csv(name, summary)
+    print("Soak test finished: {c} calls, {e} errors, p50 {p50} s, p99 {p99} s, "
+          "creep {r} s/hour".format(c=summary["count"], e=summary["errors"],
+                                    p50=summary["p50"], p99=summary["p99"],
+                                    r=summary["creep_per_hour"]))
+    return summary
@@ -0,0 +1,227 @@
+"""Declarative benchmark suites.
+
+Suite is described in YAML or TOML file. Each entry in the 'benchmarks' list specifies
+scenario and lists of thread counts, pauses, manifests, counts, and durations (scalar
+values are lists with one item). Entries are expanded into a run matrix with one cell
+for each combination. Example:
+
+    suite: nightly
+    parallel: true
+    defaults:
+      count: 10
+      pauses: [0]
+    benchmarks:
+      - scenario: component-analysis-known
+        threads: [1, 2, 4, 8]
+      - scenario: stack-analysis
+        threads: [1, 2]
+        manifests: [requirements_click_6_star.txt, springboot.xml]
+        duration: [60, 600]
+      - scenario: gremlin-package-query
+        threads: [1, 10]
+
+Cell runs the scenario in selected number of threads, each thread calls it 'count' times
+or repeatedly until 'duration' (in seconds) elapses. When the suite is marked as parallel,
+cells that target different services are run concurrently.
+"""
+
+import copy
+import csv
+import itertools
+import threading
+import time
+
+import yaml
+
+import latency_stats
+import outcomes
+import profiling
+from benchmarks import measure
+from scenarios import SCENARIOS
+
+DEFAULTS = {
+    "threads": [1],
+    "pauses": [0],
+    "manifests": [None],
+    "count": 10,
+    "duration": None,
+    "breathe": 5
+}
+
+
+def load_suite(filename):
+    """Load the suite definition from YAML or TOML file."""
+    if filename.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            # the same API is provided by the tomli package for Python < 3.11
+            import tomli as tomllib
+        with open(filename, "rb") as fin:
+            return tomllib.load(fin)
+    with open(filename) as fin:
+        return yaml.safe_load(fin)
+
+
+def as_list(value):
+    """Convert scalar value into a list, lists are returned as is."""
+    return value if isinstance(value, list) else [value]
+
+
+def expand_suite(suite):
+    """Expand the suite definition into list of cells (run matrix)."""
+    defaults = dict(DEFAULTS)
+    defaults.update(suite.get("defaults", {}))
+
+    cells = []
+    for benchmark in suite.get("benchmarks", []):
+        settings = dict(defaults)
+        settings.update(benchmark)
+
+        scenario = settings.get("scenario")
+        if scenario not in SCENARIOS:
+            raise Exception("Unknown scenario '{s}', known scenarios: {k}".format(
+                s=scenario, k=", ".join(sorted(SCENARIOS))))
+
+        for threads, pause, manifest, count, duration in itertools.product(
+                as_list(settings["threads"]), as_list(settings["pauses"]),
+                as_list(settings["manifests"]), as_list(settings["count"]),
+                as_list(settings["duration"])):
+            cells.append({
+                "id": len(cells),
+                "scenario": scenario,
+                "service": SCENARIOS[scenario]["service"],
+                "threads": threads,
+                "pause": pause,
+                "manifest": manifest,
+                "count": count,
+                "duration": duration,
+                "breathe": settings["breathe"]})
+    return cells
+
+
+def cell_name(suite_name, cell):
+    """Construct name for the cell that is used for output files."""
+    name = "suite_{s}_{i}_{c}_{t}_threads_{p}_pause".format(s=suite_name, i=cell["id"],
+                                                            c=cell["scenario"],
+                                                            t=cell["threads"],
+                                                            p=cell["pause"])
+    return name.replace("-", "_")
+
+
+def api_for_cell(cell, apis):
+    """Get the API object for the cell, the object is copied when manifest needs to be set."""
+    api = apis[cell["service"]]
+    if cell["manifest"] is not None:
+        api = copy.copy(api)
+        api.stack_analysis_manifest = cell["manifest"]
+    return api
+
+
+def cell_thread(call, check, cell, thread_id, results):
+    """Call the scenario in one thread, by count or until the cell duration elapses."""
+    if cell["duration"] is None:
+        attempts, _ = measure(call, check, cell["count"], cell["pause"], thread_id)
+    else:
+        attempts = []
+        deadline = time.time() + cell["duration"]
+        while time.time() < deadline:
+            measurements, _ = measure(call, check, 1, cell["pause"], thread_id,
+                                      first_measurement=len(attempts))
+            attempts.extend(measurements)
+    results[thread_id] = attempts
+
+
+def run_cell(cell, apis):
+    """Run one cell of the run matrix and return list of all attempts and wall clock time."""
+    api = api_for_cell(cell, apis)
+    scenario = SCENARIOS[cell["scenario"]]
+    results = {}
+
+    started = time.time()
+    threads = []
+    for thread_id in range(cell["threads"]):
+        t = threading.Thread(target=cell_thread,
+                             args=(lambda i: scenario["call"](api, i), scenario["check"],
+                                   cell, thread_id, results))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    wall_clock_time = time.time() - started
+
+    attempts = sum((results.get(thread_id, []) for thread_id in range(cell["threads"])), [])
+    return attempts, wall_clock_time
+
+
+def cell_summary(cell, attempts, wall_clock_time):
+    """Compute summary for one cell."""
+    summary = dict(cell)
+    summary.update(latency_stats.latency_statistic(outcomes.successful_deltas(attempts)))
+    summary["attempts"] = len(attempts)
+    summary["error_rate"] = outcomes.error_rate(attempts)
+    summary["goodput"] = outcomes.goodput(attempts, wall_clock_time)
+    summary["wall_clock_time"] = wall_clock_time
+    summary["cpu_per_request"] = profiling.cpu_per_request(attempts)
+    return summary
+
+
+def run_service_cells(suite_name, cells, apis, summaries):
+    """Run all cells for one service sequentially."""
+    for cell in cells:
+        print("Suite {s}, cell #{i}: {c}, {t} thread(s), {p} s pause, manifest {m}, "
+              "count {n}, duration {d}".format(
+                  s=suite_name, i=cell["id"], c=cell["scenario"], t=cell["threads"],
+                  p=cell["pause"], m=cell["manifest"], n=cell["count"], d=cell["duration"]))
+        attempts, wall_clock_time = run_cell(cell, apis)
+        outcomes.export_attempts_into_csv(cell_name(suite_name, cell), attempts)
+        summaries[cell["id"]] = cell_summary(cell, attempts, wall_clock_time)
+        print("Breathe...")
+        time.sleep(cell["breathe"])
+
+
+def schedule_cells(cells, parallel):
+    """Split cells into groups that can run concurrently (one group per service)."""
+    if not parallel:
+        return [cells]
+    groups = {}
+    for cell in cells:
+        groups.setdefault(cell["service"], []).append(cell)
+    return list(groups.values())
+
+
+def export_suite_summary_into_csv(suite_name, summaries):
+    """Export summary for all cells into the CSV file."""
+    with open("suite_{s}.csv".format(s=suite_name), "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Cell", "Scenario", "Service", "Threads", "Pause", "Manifest",
+                             "Count", "Duration", "Attempts", "Goodput", "Error rate", "Min",
+                             "Avg", "P50", "P90", "P99", "Max", "Client CPU per call"])
+        for s in summaries:
+            csv_writer.writerow([s["id"], s["scenario"], s["service"], s["threads"], s["pause"],
+                                 s["manifest"], s["count"], s["duration"], s["attempts"],
+                                 s["goodput"], s["error_rate"], s["min"], s["avg"], s["p50"],
+                                 s["p90"], s["p99"], s["max"], s["cpu_per_request"]])
+
+
+def run_suite(filename, apis):
+    """Load the suite, expand it into run matrix and run all cells."""
+    suite = load_suite(filename)
+    suite_name = suite.get("suite", "suite")
+    cells = expand_suite(suite)
+    groups = schedule_cells(cells, suite.get("parallel", False))
+    print("Suite {s}: {c} cells in {g} group(s)".format(s=suite_name, c=len(cells),
+                                                        g=len(groups)))
+
+    summaries = {}
+    threads = []
+    for group in groups:
+        t = threading.Thread(target=run_service_cells, args=(suite_name, group, apis, summaries))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+
+    summaries = [summaries[cell_id] for cell_id in sorted(summaries)]
+    export_suite_summary_into_csv(suite_name, summaries)
+    return summaries
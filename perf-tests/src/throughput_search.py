@@ -0,0 +1,143 @@
+"""Search for the maximum sustainable throughput that still satisfies the SLA thresholds.
+
+The arrival rate of the open-loop load generator is binary-searched. Each rate is held
+for a steady-state window and the p99 and average latencies measured in this window
+are compared with the thresholds from the dashboard SLA table.
+"""
+
+import csv
+import importlib.util
+import os.path
+
+import graph
+import latency_stats
+import outcomes
+from open_loop import run_open_loop
+from scenarios import SCENARIOS
+
+DEFAULT_SLA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "..", "dashboard", "src", "sla.py")
+
+
+def load_sla_thresholds(sla_file=None):
+    """Load the SLA table from the dashboard module, so the thresholds are defined just once."""
+    spec = importlib.util.spec_from_file_location("sla", sla_file or DEFAULT_SLA_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.SLA
+
+
+def thresholds_for_scenario(sla, scenario):
+    """Get the SLA thresholds for the selected scenario."""
+    analysis, name = SCENARIOS[scenario]["sla"]
+    return sla[analysis][name]
+
+
+def compute_rate_statistic(rate, measurements, window):
+    """Compute statistic for calls performed with the given rate (warmup calls are ignored)."""
+    steady_state = [m for m in measurements if not m["warmup"]]
+    successful = outcomes.successful_deltas(steady_state)
+    statistic = latency_stats.latency_statistic(successful)
+    statistic["rate"] = rate
+    statistic["attempts"] = len(steady_state)
+    statistic["error_rate"] = outcomes.error_rate(steady_state)
+    statistic["throughput"] = outcomes.goodput(steady_state, window)
+    return statistic
+
+
+def check_sla(statistic, thresholds, max_error_rate):
+    """Check if the statistic measured for one rate satisfies the SLA.
+
+    The p99 latency is compared with the SLA 'max' threshold, the average latency with the
+    SLA 'avg' threshold. Rates with too many errors or without any successful call fail.
+    """
+    return statistic["count"] > 0 and \
+        statistic["error_rate"] <= max_error_rate and \
+        statistic["p99"] <= thresholds["max"] and \
+        statistic["avg"] <= thresholds["avg"]
+
+
+def binary_search_rate(evaluate, rate_min, rate_max, precision):
+    """Find the highest rate in [rate_min, rate_max] for which evaluate(rate) returns True.
+
+    Return the highest passing rate (or None if even rate_min fails) and list of all
+    evaluated (rate, passed) pairs in order of evaluation.
+    """
+    evaluated = []
+
+    def check(rate):
+        passed = evaluate(rate)
+        evaluated.append((rate, passed))
+        return passed
+
+    if not check(rate_min):
+        return None, evaluated
+    if check(rate_max):
+        return rate_max, evaluated
+
+    low, high = rate_min, rate_max
+    while high - low > precision:
+        middle = (low + high) / 2.0
+        if check(middle):
+            low = middle
+        else:
+            high = middle
+    return low, evaluated
+
+
+def export_rate_statistic_into_csv(name, statistics):
+    """Export statistic for all evaluated rates into the CSV file."""
+    with open(name + ".csv", "w") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["Rate", "Attempts", "Throughput", "Error rate", "Min", "Avg",
+                             "P50", "P90", "P99", "Max", "Passed"])
+        for s in statistics:
+            csv_writer.writerow([s["rate"], s["attempts"], s["throughput"], s["error_rate"],
+                                 s["min"], s["avg"], s["p50"], s["p90"], s["p99"], s["max"],
+                                 int(s["passed"])])
+
+
+def run_throughput_search(core_api, scenario, rate_min, rate_max, precision, window, warmup,
+                          max_error_rate, sla_file=None):
+    """Search the maximum sustainable throughput for the selected scenario."""
+    thresholds = thresholds_for_scenario(load_sla_thresholds(sla_file), scenario)
+    call = SCENARIOS[scenario]["call"]
+    check = SCENARIOS[scenario]["check"]
+    print("Throughput search for {s}".format(s=scenario))
+    print("SLA thresholds: p99 <= {m} s, avg <= {a} s".format(m=thresholds["max"],
+                                                              a=thresholds["avg"]))
+
+    statistics = []
+
+    def evaluate(rate):
+        print("  rate {r} calls/s held for {w} seconds".format(r=rate, w=window))
+        measurements = run_open_loop(lambda i: call(core_api, i), check, rate,
+                                     warmup + window, warmup)
+        statistic = compute_rate_statistic(rate, measurements, window)
+        statistic["passed"] = check_sla(statistic, thresholds, max_error_rate)
+        print("    avg {a}  p99 {p}  error rate {e}  -> {r}".format(
+            a=statistic["avg"], p=statistic["p99"], e=statistic["error_rate"],
+            r="pass" if statistic["passed"] else "fail"))
+        statistics.append(statistic)
+        return statistic["passed"]
+
+    best_rate, _ = binary_search_rate(evaluate, rate_min, rate_max, precision)
+
+    if best_rate is None:
+        print("Even the minimal rate {r} calls/s does not satisfy the SLA".format(r=rate_min))
+    else:
+        print("Maximum sustainable rate: {r} calls/s".format(r=best_rate))
+
+    name = "throughput_search_{s}".format(s=scenario.replace("-", "_"))
+    statistics.sort(key=lambda s: s["rate"])
+    export_rate_statistic_into_csv(name, statistics)
+
+    # latency curve up to the highest passing rate
+    curve = [s for s in statistics if best_rate is not None and s["rate"] <= best_rate]
+    if curve:
+        graph.generate_latency_curve_graph("Latency curve for " + scenario, name,
+                                           [s["rate"] for s in curve],
+                                           [s["avg"] for s in curve],
+                                           [s["p50"] for s in curve],
+                                           [s["p99"] for s in curve])
+    return best_rate, statistics
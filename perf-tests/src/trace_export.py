@@ -0,0 +1,217 @@
+"""Export of end-to-end traces that combine client, API, and worker timings.
+
+Each measured request is stored as one process in the Chrome trace-event JSON format
+(it can be opened in chrome://tracing or https://ui.perfetto.dev). The client call,
+stack analysis tasks read from the _debug endpoint, and durations of analyses read from
+the _audit nodes in S3 are displayed on separate rows of the same timeline.
+
+Server timestamps are converted to the client clock. The offset between both clocks is
+estimated from HTTP Date headers: the header has one second resolution, but the server
+time when the response was created must lie between the time the request was sent and
+the time the response was received. Intersection of these bounds for several probes
+gives the offset with an uncertainty close to the round trip time. Workers and the API
+are expected to share the same clock.
+"""
+
+import datetime
+import email.utils
+import json
+import time
+
+import requests
+
+from benchmarks import measure
+from duration import Duration
+import measurements
+
+CLIENT_TID = 0
+FIRST_SERVER_TID = 1
+
+
+class ClockOffsetEstimator:
+    """Estimate the offset between the server and client clocks from HTTP Date headers."""
+
+    def __init__(self):
+        """Initialize the estimator with unbounded interval."""
+        self.low = float("-inf")
+        self.high = float("inf")
+        self.samples = 0
+
+    def add(self, sent, received, date_header):
+        """Add one probe, sent and received are client timestamps in seconds (UNIX time)."""
+        server_time = email.utils.parsedate_to_datetime(date_header).timestamp()
+        # the server clock was in [server_time, server_time + 1) when the response was created
+        self.low = max(self.low, server_time - received)
+        self.high = min(self.high, server_time + 1.0 - sent)
+        self.samples += 1
+
+    @property
+    def consistent(self):
+        """Check if all probes lead to the same interval."""
+        return self.samples > 0 and self.low <= self.high
+
+    @property
+    def offset(self):
+        """Return the estimated difference of server and client clocks in seconds."""
+        if not self.consistent:
+            return 0.0
+        return (self.low + self.high) / 2.0
+
+    @property
+    def uncertainty(self):
+        """Return the maximal error of the estimated offset in seconds."""
+        if not self.consistent:
+            return float("nan")
+        return (self.high - self.low) / 2.0
+
+
+def estimate_clock_offset(url, probes=20, pause=0.1):
+    """Send probes to the server and estimate the clock offset from the Date headers.
+
+    Pause between probes is chosen so the probes cross the second boundary of the server
+    clock, which is the moment that narrows the interval.
+    """
+    estimator = ClockOffsetEstimator()
+    for _ in range(probes):
+        sent = time.time()
+        response = requests.get(url)
+        received = time.time()
+        date_header = response.headers.get("Date")
+        if date_header:
+            estimator.add(sent, received, date_header)
+        time.sleep(pause)
+    return estimator
+
+
+def to_microseconds(timestamp):
+    """Convert the (naive UTC) datetime into microseconds since the epoch."""
+    return timestamp.replace(tzinfo=datetime.timezone.utc).timestamp() * 1e6
+
+
+class TraceBuilder:
+    """Builder of the trace in Chrome trace-event JSON format."""
+
+    def __init__(self, clock_offset=0.0, clock_offset_uncertainty=float("nan")):
+        """Initialize the builder, clock offset is server clock - client clock in seconds."""
+        self.clock_offset = clock_offset
+        self.clock_offset_uncertainty = clock_offset_uncertainty
+        self.events = []
+        self.requests = 0
+
+    def server_to_client(self, timestamp):
+        """Convert the timestamp taken from the server into the client clock."""
+        return timestamp - datetime.timedelta(seconds=self.clock_offset)
+
+    def add_metadata(self, pid, tid, name, kind):
+        """Add name of the process (request) or thread (row in the timeline)."""
+        event = {"name": kind, "ph": "M", "pid": pid, "args": {"name": name}}
+        if tid is not None:
+            event["tid"] = tid
+        self.events.append(event)
+
+    def add_span(self, pid, tid, name, category, started_at, finished_at, args=None):
+        """Add one complete event (span), timestamps are naive UTC datetimes."""
+        start = to_microseconds(started_at)
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "pid": pid,
+            "tid": tid,
+            "ts": start,
+            "dur": max(to_microseconds(finished_at) - start, 0),
+            "args": args or {}})
+
+    def add_request(self, name, measurement):
+        """Add process for one request with the span measured by the client, return its ID."""
+        self.requests += 1
+        pid = self.requests
+        self.add_metadata(pid, None, name, "process_name")
+        self.add_metadata(pid, CLIENT_TID, "client", "thread_name")
+        self.add_span(pid, CLIENT_TID, name, "client",
+                      measurement["started_at"], measurement["finished_at"],
+                      {"outcome": measurement["outcome"],
+                       "status_code": measurement["status_code"]})
+        return pid
+
+    def add_server_spans(self, pid, category, spans):
+        """Add spans (name, started_at, finished_at, args) measured by the server."""
+        for tid, (name, started_at, finished_at, args) in enumerate(spans, FIRST_SERVER_TID):
+            self.add_metadata(pid, tid, "{c}: {n}".format(c=category, n=name), "thread_name")
+            self.add_span(pid, tid, name, category, self.server_to_client(started_at),
+                          self.server_to_client(finished_at), args)
+
+    def export(self, filename):
+        """Store the trace into the JSON file."""
+        with open(filename, "w") as fout:
+            json.dump({"traceEvents": self.events,
+                       "displayTimeUnit": "ms",
+                       "otherData": {
+                           "clock_offset": self.clock_offset,
+                           "clock_offset_uncertainty": self.clock_offset_uncertainty}},
+                      fout)
+
+
+def stack_analysis_task_spans(debug):
+    """Read spans for all tasks from the stack analysis _debug response."""
+    spans = []
+    for task in debug.json()["tasks"]:
+        if task.get("started_at") and task.get("ended_at"):
+            spans.append((task["task_name"],
+                          Duration.parse_timestamp(task["started_at"]),
+                          Duration.parse_timestamp(task["ended_at"]),
+                          {"error": task.get("error")}))
+    return sorted(spans, key=lambda span: span[1])
+
+
+def audit_spans(durations):
+    """Convert durations read from S3 (see measurements.py) into spans."""
+    spans = []
+    for bucket, analyses in sorted(durations.items()):
+        for analysis, duration in sorted(analyses.items()):
+            spans.append(("{b}/{a}".format(b=bucket, a=analysis), duration.started_at,
+                          duration.finished_at, {"seconds": duration.duration_seconds}))
+    return sorted(spans, key=lambda span: span[1])
+
+
+def trace_stack_analyses(builder, core_api, count, pause):
+    """Run stack analyses and add their client and worker timings into the trace."""
+    attempts, debug = measure(lambda i: core_api.stack_analysis(None, i),
+                              lambda retval: retval["result"].status_code == 200,
+                              count, pause, None)
+    for i, (attempt, debug_response) in enumerate(zip(attempts, debug)):
+        pid = builder.add_request("stack analysis #{i}".format(i=i + 1), attempt)
+        builder.add_server_spans(pid, "task", stack_analysis_task_spans(debug_response))
+
+
+def trace_component_analyses(builder, jobs_api, s3, count, pause):
+    """Run component analyses and add client timings and S3 audit durations into the trace."""
+    for i in range(count):
+        ecosystem, component, version = next(jobs_api.componentGeneratorForPypi)
+        attempts, _ = measure(lambda i, s3: jobs_api.component_analysis(i, s3, None, ecosystem,
+                                                                        component, version),
+                              lambda retval: retval is True, 1, pause, None, s3)
+        durations = measurements.read_component_analysis_audit_duration(s3, ecosystem,
+                                                                        component, version)
+        pid = builder.add_request("component analysis {e}/{c}/{v}".format(
+            e=ecosystem, c=component, v=version), attempts[0])
+        builder.add_server_spans(pid, "audit", audit_spans(durations))
+
+
+def run_trace_export(core_api, jobs_api, s3, name, count=5, pause=10):
+    """Measure stack and component analyses and export the end-to-end trace."""
+    print("End-to-end trace export")
+    estimator = estimate_clock_offset(core_api.url)
+    print("Clock offset: {o} s +- {u} s ({s} probes)".format(o=estimator.offset,
+                                                             u=estimator.uncertainty,
+                                                             s=estimator.samples))
+    if not estimator.consistent:
+        print("Warning: clock offset could not be estimated, server times are not shifted")
+
+    builder = TraceBuilder(estimator.offset, estimator.uncertainty)
+    trace_stack_analyses(builder, core_api, count, pause)
+    trace_component_analyses(builder, jobs_api, s3, count, pause)
+
+    builder.export(name + ".json")
+    print("Trace stored into {n}.json".format(n=name))
+    return builder